@@ -0,0 +1,12 @@
+"""Benchmark suite for the pricing hot paths
+
+Run from the repository root,
+
+    python -m benchmarks run -o .benchmarks/latest.json
+    python -m benchmarks run -k bsm. --compare .benchmarks/baseline.json
+    python -m benchmarks compare .benchmarks/baseline.json .benchmarks/latest.json --threshold 0.1
+
+Every benchmark lives in a bench_*.py module and is registered with benchmarks.harness.benchmark. Inputs are
+drawn from a fixed seed, so runs on the same machine time the same work. `compare` (and `run --compare`) exits
+with status 1 when any benchmark got slower than the threshold allows.
+"""
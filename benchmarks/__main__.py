@@ -0,0 +1,63 @@
+"""Command line entry point, see the benchmarks package docstring"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional
+
+from benchmarks import harness
+
+
+def _report_comparison(baseline_path, current, threshold: float, output: Optional[str]) -> int:
+    rows = harness.compare(harness.load(baseline_path), current, threshold=threshold)
+    print(harness.format_comparison(rows))
+    if output:
+        with open(output, "w") as f:
+            json.dump(harness.comparison_records(rows), f, indent=2)
+    regressions = [row.name for row in rows if row.status == harness.REGRESSION]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) past {threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="time the benchmarks")
+    run.add_argument("-k", "--filter", action="append", default=[], help="only names containing this, repeatable")
+    run.add_argument("-o", "--output", help="write results JSON here")
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--min-time", type=float, default=0.05, help="seconds per repeat, at least")
+    run.add_argument("--compare", metavar="BASELINE", help="compare against a results JSON afterwards")
+    run.add_argument("--threshold", type=float, default=harness.DEFAULT_THRESHOLD)
+    run.add_argument("--list", action="store_true", help="list the benchmark names and exit")
+
+    compare = commands.add_parser("compare", help="compare two results JSON files")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=harness.DEFAULT_THRESHOLD)
+    compare.add_argument("-o", "--output", help="write the comparison JSON here")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        return _report_comparison(args.baseline, harness.load(args.current), args.threshold, args.output)
+
+    benchmarks = [b for b in harness.discover() if not args.filter or any(k in b.name for k in args.filter)]
+    if args.list:
+        print("\n".join(b.name for b in benchmarks))
+        return 0
+
+    results = harness.run(benchmarks, repeat=args.repeat, min_time=args.min_time, report=print)
+    if args.output:
+        harness.save(results, args.output)
+    if args.compare:
+        print()
+        return _report_comparison(args.compare, results, args.threshold, None)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""Contract level pricing: import time, bsm kernels, Option, implied vol, straddle IV, american models and the cache"""
+
+import dataclasses
+import subprocess
+import sys
+
+import numpy as np
+
+import finx_option_pricer.bsm as bsm
+from benchmarks.harness import SkipBenchmark, benchmark
+from finx_option_pricer import american, lattice
+from finx_option_pricer.cache import enable_cache
+from finx_option_pricer.calcs import calc_straddle_iv, calc_straddle_iv_chain
+from finx_option_pricer.option import FrozenOption, Option
+
+BACKENDS = [bsm.NUMPY, bsm.NUMBA]
+SIZES = [1, 1_000, 100_000]
+
+
+def use_backend(backend: str) -> None:
+    """Switch the bsm backend for a benchmark, the harness restores the previous one afterwards"""
+    if backend == bsm.NUMBA and not bsm.HAS_NUMBA:
+        raise SkipBenchmark("numba is not installed")
+    bsm.set_backend(backend)
+
+
+def contracts(rng, n):
+    """n contracts around S = 100, a mix of calls and puts"""
+    return dict(
+        S=rng.uniform(80, 120, n),
+        K=rng.uniform(80, 120, n),
+        T=rng.uniform(5, 120, n) / 252,
+        r=0.02,
+        sigma=rng.uniform(0.1, 0.6, n),
+        option_type=rng.choice(["c", "p"], n),
+    )
+
+
+# -----------------------------------------------------------------------------
+# cold start, a fresh interpreter per call so nothing is already imported
+
+
+@benchmark("import", module=["numpy", *(f"finx_option_pricer.{m}" for m in ("option", "option_plot", "calcs"))])
+def cold_import(module):
+    command = [sys.executable, "-c", f"import {module}"]
+    return lambda: subprocess.run(command, check=True)
+
+
+@benchmark("import", backend=BACKENDS)
+def cold_option_iv(backend):
+    use_backend(backend)
+    code = (
+        "import finx_option_pricer.bsm as bsm; from finx_option_pricer.option import Option; "
+        f"bsm.set_backend({backend!r}); Option(S=100.0, K=105.0, T=0.1, r=0.02, sigma=0.25).iv(2.0)"
+    )
+    return lambda: subprocess.run([sys.executable, "-c", code], check=True)
+
+
+# -----------------------------------------------------------------------------
+# bsm
+
+
+@benchmark("bsm", fn=["bs_call_value", "d1", "delta_call", "gamma", "vega", "theta_call", "rho_call"])
+def scalar(fn):
+    func = getattr(bsm, fn)
+    return lambda: func(100.0, 105.0, 0.1, 0.02, 0.25)
+
+
+@benchmark("bsm", backend=BACKENDS, n=SIZES)
+def bs_value(rng, backend, n):
+    use_backend(backend)
+    c = contracts(rng, n)
+    return lambda: bsm.bs_value(**c)
+
+
+@benchmark("bsm", backend=BACKENDS, n=SIZES)
+def bs_greeks(rng, backend, n):
+    use_backend(backend)
+    c = contracts(rng, n)
+    return lambda: bsm.bs_greeks(**c)
+
+
+@benchmark("bsm", backend=BACKENDS, n=SIZES)
+def implied_vol(rng, backend, n):
+    use_backend(backend)
+    c = contracts(rng, n)
+    price = bsm.bs_value(**c)
+    c.pop("sigma")
+    return lambda: bsm.implied_vol(price, **c)
+
+
+@benchmark("bsm", fn=["implied_vol_call", "implied_vol_put"])
+def implied_vol_scalar(fn):
+    option_type = "c" if fn.endswith("call") else "p"
+    price = float(bsm.bs_value(100.0, 105.0, 0.1, 0.02, 0.25, option_type))
+    func = getattr(bsm, fn)
+    return lambda: func(price, 100.0, 105.0, 0.1, 0.02)
+
+
+# -----------------------------------------------------------------------------
+# Option
+
+
+@benchmark("option", prop=["value", "delta", "greeks", "iv", "break_even_value"])
+def option_property(prop):
+    option = Option(S=100.0, K=105.0, T=0.1, r=0.02, sigma=0.25, option_type="p")
+    if prop == "greeks":
+        return option.greeks
+    if prop == "iv":
+        price = option.value
+        return lambda: option.iv(price)
+    return lambda: getattr(option, prop)
+
+
+# Option vs the slotted, cached FrozenOption: building many (peak_bytes is what 10k of them hold), pricing a fresh
+# contract, re-reading a priced one and bumping spot
+
+
+@benchmark("option", cls=["Option", "FrozenOption"], n=[10_000])
+def build_contracts(rng, cls, n):
+    make = Option if cls == "Option" else FrozenOption
+    terms = list(zip(rng.uniform(80, 120, n).tolist(), rng.uniform(80, 120, n).tolist()))
+    return lambda: [make(S=S, K=K, T=0.1, r=0.02, sigma=0.25) for S, K in terms]
+
+
+@benchmark("option", cls=["Option", "FrozenOption"], op=["first_value", "value", "greeks", "bump_spot"])
+def contract(cls, op):
+    make = Option if cls == "Option" else FrozenOption
+    option = make(S=100.0, K=105.0, T=0.1, r=0.02, sigma=0.25, option_type="p")
+    if op == "first_value":
+        return lambda: make(S=100.0, K=105.0, T=0.1, r=0.02, sigma=0.25, option_type="p").value
+    if op == "value":
+        return lambda: option.value
+    if op == "greeks":
+        return option.greeks
+    if cls == "Option":
+        return lambda: dataclasses.replace(option, S=101.0).value
+    option.value
+    return lambda: option.replace(S=101.0).value
+
+
+# -----------------------------------------------------------------------------
+# straddle IV
+
+
+@benchmark("calcs")
+def straddle_iv():
+    return lambda: calc_straddle_iv(S=100.0, K=100.0, call_price=2.4, put_price=2.6, time_days=20)
+
+
+@benchmark("calcs", n=[10, 200])
+def straddle_iv_chain(n):
+    K = np.linspace(80, 120, n)
+    T = 20 / 252
+    call = bsm.bs_value(100.0, K, T, 0.0, 0.25, "c")
+    put = bsm.bs_value(100.0, K, T, 0.0, 0.25, "p")
+    return lambda: calc_straddle_iv_chain(100.0, K, call, put, 20)
+
+
+# -----------------------------------------------------------------------------
+# american models vs the lattice
+
+
+@benchmark("american", model=["baw", "bs2002", "crr"], n=[1, 1_000])
+def american_value(rng, model, n):
+    c = contracts(rng, n)
+    if model == "crr":
+        return lambda: lattice.lattice_value(**c, steps=200)
+    func = american.baw_value if model == "baw" else american.bs2002_value
+    return lambda: func(**c)
+
+
+@benchmark("american", method=["crr", "lr"], func=["value", "greeks"])
+def lattice_chain(method, func):
+    # one expiry of 1,000 strikes, CRR prices it from a single lattice in units of the strike
+    K = np.linspace(50, 150, 1_000)
+    kernel = lattice.lattice_value if func == "value" else lattice.lattice_greeks
+    steps = 200 if method == "crr" else 101
+    return lambda: kernel(100.0, K, 0.5, 0.03, 0.25, "p", steps=steps, method=method)
+
+
+# -----------------------------------------------------------------------------
+# cache
+
+
+@benchmark("cache", lookup=["hit", "miss"])
+def option_value_cached(lookup):
+    pricing_cache = enable_cache(maxsize=10_000)
+    option = Option(S=100.0, K=105.0, T=0.1, r=0.02, sigma=0.25)
+    if lookup == "hit":
+        return lambda: option.value
+
+    def miss():
+        pricing_cache.clear()
+        return option.value
+
+    return miss
@@ -0,0 +1,221 @@
+"""Structure level paths: OptionsPlot grids, dash apps, sweeps, vol surfaces, profiling, books, stress, optimizer"""
+
+import itertools
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+import finx_option_pricer.bsm as bsm
+from benchmarks.bench_pricing import use_backend
+from benchmarks.harness import benchmark
+from finx_option_pricer.cache import enable_cache
+from finx_option_pricer.optimizer import Lognormal, optimize
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_plot import OptionPosition, OptionsPlot
+from finx_option_pricer.option_structures import gen_calendar, gen_strangle
+from finx_option_pricer.pipeline import enrich
+from finx_option_pricer.portfolio import DOLLAR, Portfolio
+from finx_option_pricer.profiling import profile
+from finx_option_pricer.repricer import Repricer
+from finx_option_pricer.stress import stress_cube
+from finx_option_pricer.sweep import sweep
+from finx_option_pricer.vol_surface import SSVI, VolSurface
+
+# (spot range, strike interval, days): 41 x 11, 401 x 31 and 4001 x 61 grids
+GRID_SIZES = {
+    "small": ([90, 110], 0.5, 10),
+    "medium": ([80, 120], 0.1, 30),
+    "large": ([60, 140], 0.02, 60),
+}
+
+
+def strangle(days: int = 30):
+    return gen_strangle(spot_price=100.0, strike_price=105.0, days=days, vol_initial=0.25, vol_final=0.2)
+
+
+def calendar():
+    return gen_calendar(
+        spot_price=100.0,
+        strike_price=100.0,
+        front_days=20,
+        front_vol=0.3,
+        front_vol_final=0.25,
+        back_days=50,
+        back_vol=0.28,
+        back_vol_final=0.26,
+    )
+
+
+# -----------------------------------------------------------------------------
+# OptionsPlot
+
+
+@benchmark("options_plot", size=list(GRID_SIZES), structure=["strangle", "calendar"])
+def value_grid(size, structure):
+    spot_range, strike_interval, days = GRID_SIZES[size]
+    positions = strangle(days=max(days, 30)) if structure == "strangle" else calendar()
+    op_plot = OptionsPlot(option_positions=positions, spot_range=spot_range, strike_interval=strike_interval)
+    days = min(days, 20) if structure == "calendar" else days
+    return lambda: op_plot.value_grid(days)
+
+
+@benchmark("options_plot", size=list(GRID_SIZES))
+def greek_grid(size):
+    spot_range, strike_interval, days = GRID_SIZES[size]
+    op_plot = OptionsPlot(option_positions=strangle(days=days), spot_range=spot_range, strike_interval=strike_interval)
+    return lambda: op_plot.greek_grid(days)
+
+
+@benchmark("options_plot", size=list(GRID_SIZES))
+def gen_value_df(size):
+    spot_range, strike_interval, days = GRID_SIZES[size]
+    op_plot = OptionsPlot(option_positions=strangle(days=days), spot_range=spot_range, strike_interval=strike_interval)
+    return lambda: op_plot.gen_value_df_timeincrementing(days)
+
+
+# -----------------------------------------------------------------------------
+# dash apps, the callbacks' data prep without dash itself
+
+
+def dash_frame(positions, spot_range: List, days: int) -> pd.DataFrame:
+    """What helper_gen_strangle / gen_calendar_df do per callback: build, value and relabel the grid"""
+    op_plot = OptionsPlot(option_positions=positions, strike_interval=5, spot_range=spot_range)
+    df = op_plot.gen_value_df_timeincrementing(days, 1).set_index("strikes")
+    columns = [f"t{i}" for i, _ in enumerate(df.columns)]
+    columns[-1] = "tf"
+    df.columns = columns
+    return df
+
+
+@benchmark("dash", structure=["strangle", "calendar"], cache=["off", "hit"])
+def callback(structure, cache):
+    if cache == "hit":
+        enable_cache(maxsize=256)
+    if structure == "strangle":
+        return lambda: dash_frame(strangle(), [50, 150], 30)
+    return lambda: dash_frame(calendar(), [50, 150], 20)
+
+
+# -----------------------------------------------------------------------------
+# sweep
+
+
+@benchmark("sweep", processes=[1])
+def strangle_sweep(processes):
+    grid = dict(strike_price=np.arange(95.0, 115.0, 1.0), days=[10, 20, 30], vol_initial=[0.2, 0.3], vol_final=[0.2])
+    return lambda: sweep(
+        gen_strangle, grid, base=dict(spot_price=100.0), spot_range=[80, 120], days=10, processes=processes
+    )
+
+
+# -----------------------------------------------------------------------------
+# vol surface
+
+
+@benchmark("vol_surface", backend=[bsm.NUMPY, bsm.NUMBA], n=[1_000, 1_000_000])
+def sigma_lookup(rng, backend, n):
+    use_backend(backend)
+    K, T = np.meshgrid(np.linspace(70, 130, 41), np.array([10, 30, 60, 120]) / 252)
+    iv = 0.25 - 0.1 * np.log(K / 100.0)
+    surface = VolSurface.fit(K, T, iv, spot=100.0, method=SSVI)
+    K, T = rng.uniform(60, 140, n), rng.uniform(0, 1, n)
+    return lambda: surface.sigma(K, T)
+
+
+# -----------------------------------------------------------------------------
+# profiling, the cost of the instrumentation hooks with and without an active profile
+
+
+@benchmark("profiling", active=[False, True])
+def instrumented_grid(active):
+    op_plot = OptionsPlot(option_positions=strangle(days=10), spot_range=[90, 110])
+    if not active:
+        return lambda: op_plot.gen_value_df_timeincrementing(10)
+
+    def run():
+        with profile():
+            return op_plot.gen_value_df_timeincrementing(10)
+
+    return run
+
+
+# -----------------------------------------------------------------------------
+# chain enrichment
+
+
+@benchmark("pipeline", n=[100_000])
+def enrich_chunk(rng, n):
+    S = 100.0
+    K = rng.uniform(70, 130, n)
+    T = rng.uniform(5, 120, n) / 252
+    option_type = np.where(K >= S, "c", "p")
+    value = bsm.bs_value(S, K, T, 0.02, rng.uniform(0.15, 0.5, n), option_type)
+    chunk = pd.DataFrame(dict(S=S, K=K, T=T, option_type=option_type, bid=value * 0.99, ask=value * 1.01))
+    return lambda: enrich(chunk, r=0.02)
+
+
+# -----------------------------------------------------------------------------
+# portfolio and tick repricing
+
+
+def book_positions(legs: int) -> List[OptionPosition]:
+    K = np.linspace(80.0, 120.0, legs)
+    return [
+        OptionPosition(option=Option(S=100.0, K=k, T=(10 + i % 60) / 252, r=0.01, sigma=0.25), quantity=1 - 2 * (i % 2))
+        for i, k in enumerate(K)
+    ]
+
+
+def portfolio(legs_per_underlying: int, underlyings: int = 4) -> Portfolio:
+    positions = book_positions(legs_per_underlying)
+    return Portfolio.from_positions({f"U{i}": positions for i in range(underlyings)}, multiplier=100)
+
+
+@benchmark("portfolio", legs=[10, 1_000])
+def underlying_tick(legs):
+    book = portfolio(legs)
+    spots = itertools.cycle([100.0, 100.5])
+
+    def tick():
+        book.update("U0", S=next(spots))
+        return book.greeks(DOLLAR)
+
+    return tick
+
+
+@benchmark("repricer", path=["taylor", "full"], legs=[10, 1_000])
+def on_tick(path, legs):
+    repricer = Repricer(portfolio(legs), units=DOLLAR, max_spot_move=0.01)
+    # 2% moves go past max_spot_move every tick
+    spots = itertools.cycle([100.0, 100.5] if path == "taylor" else [102.0, 100.0])
+    return lambda: repricer.on_tick("U0", next(spots))
+
+
+# -----------------------------------------------------------------------------
+# stress cube
+
+
+@benchmark("stress", legs=[4, 10])
+def cube(legs):
+    positions = book_positions(legs)
+    spot_shocks, vol_shocks = np.linspace(-0.2, 0.2, 200), np.linspace(-0.1, 0.1, 50)
+    return lambda: stress_cube(positions, spot_shocks, vol_shocks, days=range(60))
+
+
+# -----------------------------------------------------------------------------
+# structure optimizer
+
+
+@benchmark("optimizer", candidates=[1_000, 5_000])
+def strangles(candidates):
+    # 25 call strikes x 25 put strikes x 4 expiries x 2 put ratios = 5,000
+    calls = 25 if candidates == 5_000 else 5
+    grid = dict(
+        strike_price=np.linspace(100, 125, calls),
+        put_strike_price=np.linspace(75, 100, 25),
+        days=[10, 20, 30, 45],
+        put_ratio=[1, 2],
+    )
+    base = dict(spot_price=100.0, vol_initial=0.25, vol_final=0.22)
+    return lambda: optimize(gen_strangle, grid, Lognormal(sigma=0.18), base=base, max_loss=20.0)
@@ -0,0 +1,279 @@
+"""Registry, timer, JSON results and regression comparison for the benchmark suite"""
+
+import importlib
+import itertools
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+SEED = 20220101
+
+# ratio of new to baseline time past which a benchmark is flagged
+DEFAULT_THRESHOLD = 0.10
+
+REGRESSION = "regression"
+IMPROVED = "improved"
+OK = "ok"
+NEW = "new"
+MISSING = "missing"
+
+
+class SkipBenchmark(Exception):
+    """Raised by a setup function when the benchmark can't run here, e.g. an optional dependency is missing"""
+
+
+@dataclass
+class Benchmark:
+    name: str
+    group: str
+    setup: Callable[..., Callable[[], object]]  # returns the zero argument callable that is timed
+    params: Dict
+
+
+_registry: List[Benchmark] = []
+
+
+def benchmark(group: str, name: Optional[str] = None, **params):
+    """Register a setup function, called once per combination of params, that returns the callable to time
+
+    Only the returned callable is timed, so building inputs stays out of the measurement. Setup functions get
+    a fresh np.random.default_rng(SEED) as rng when they accept one.
+
+        @benchmark("bsm", n=[1, 10_000])
+        def bs_value(rng, n):
+            S = rng.uniform(80, 120, n)
+            return lambda: bsm.bs_value(S, 100.0, 0.1, 0.0, 0.2)
+    """
+
+    def register(setup):
+        names = list(params)
+        for values in itertools.product(*params.values()):
+            combo = dict(zip(names, values))
+            label = name or setup.__name__
+            if combo:
+                label += "[" + ",".join(f"{k}={v}" for k, v in combo.items()) + "]"
+            _registry.append(Benchmark(name=f"{group}.{label}", group=group, setup=setup, params=combo))
+        return setup
+
+    return register
+
+
+def discover() -> List[Benchmark]:
+    """Import every benchmarks/bench_*.py module and return the registered benchmarks"""
+    for path in sorted(Path(__file__).parent.glob("bench_*.py")):
+        importlib.import_module(f"{__package__}.{path.stem}")
+    return list(_registry)
+
+
+@dataclass
+class Timing:
+    name: str
+    loops: int  # calls per repeat
+    times: List[float]  # seconds per call, one entry per repeat
+
+    @property
+    def min(self) -> float:
+        return min(self.times)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+
+def time_callable(func: Callable[[], object], repeat: int = 5, min_time: float = 0.05) -> Timing:
+    """Per call seconds of func over `repeat` repeats, each looping until at least min_time has elapsed
+
+    The loop count is found the way timeit.Timer.autorange does (1, 2, 5, 10, 20, ...) after one warm up call,
+    which also triggers any JIT compilation or cache population outside the measurement.
+    """
+    func()
+    loops = 1
+    for multiplier in itertools.cycle((2, 2.5, 2)):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= min_time:
+            break
+        loops = int(loops * multiplier)
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        times.append((time.perf_counter() - start) / loops)
+    return Timing(name="", loops=loops, times=times)
+
+
+def _call_setup(bench: Benchmark) -> Callable[[], object]:
+    kwargs = dict(bench.params)
+    if "rng" in bench.setup.__code__.co_varnames[: bench.setup.__code__.co_argcount]:
+        kwargs["rng"] = np.random.default_rng(SEED)
+    return bench.setup(**kwargs)
+
+
+def run(
+    benchmarks: List[Benchmark],
+    repeat: int = 5,
+    min_time: float = 0.05,
+    report: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Dict]:
+    """Time each benchmark, returning {name: {"min", "median", "loops", "times", "peak_bytes"}}
+
+    Times are seconds per call. peak_bytes is the peak memory traced (tracemalloc, which NumPy reports to) during
+    one extra, untimed call. Benchmarks whose setup raises SkipBenchmark are left out.
+    """
+    import finx_option_pricer.bsm as bsm
+    from finx_option_pricer import cache
+
+    results = {}
+    for bench in benchmarks:
+        # setups may switch the bsm backend or enable the pricing cache, both are put back afterwards
+        backend, pricing_cache = bsm.get_backend(), cache.get_cache()
+        try:
+            func = _call_setup(bench)
+            timing = time_callable(func, repeat=repeat, min_time=min_time)
+            peak = peak_memory(func)
+        except SkipBenchmark as e:
+            if report:
+                report(f"{bench.name:<60} skipped ({e})")
+            continue
+        finally:
+            bsm.set_backend(backend)
+            cache._cache = pricing_cache
+        results[bench.name] = dict(
+            min=timing.min, median=timing.median, loops=timing.loops, times=timing.times, peak_bytes=peak
+        )
+        if report:
+            report(
+                f"{bench.name:<60} {format_seconds(timing.min):>10} (median {format_seconds(timing.median)}, "
+                f"peak {format_bytes(peak)})"
+            )
+    return results
+
+
+def peak_memory(func: Callable[[], object]) -> int:
+    """Peak bytes allocated while calling func once, including its result"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def format_bytes(n: int) -> str:
+    for unit, scale in (("GB", 2 ** 30), ("MB", 2 ** 20), ("KB", 2 ** 10)):
+        if n >= scale:
+            return f"{n / scale:.3g} {unit}"
+    return f"{n} B"
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+# -----------------------------------------------------------------------------
+# results files
+
+
+def environment() -> Dict:
+    """What the results were measured on, stored next to them"""
+    import finx_option_pricer.bsm as bsm
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return dict(
+        commit=commit,
+        python=sys.version.split()[0],
+        numpy=np.__version__,
+        platform=platform.platform(),
+        processor=platform.processor() or platform.machine(),
+        bsm_backend=bsm.get_backend(),
+        seed=SEED,
+        timestamp=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    )
+
+
+def save(results: Dict[str, Dict], path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(dict(environment=environment(), results=results), indent=2) + "\n")
+
+
+def load(path) -> Dict[str, Dict]:
+    return json.loads(Path(path).read_text())["results"]
+
+
+# -----------------------------------------------------------------------------
+# comparison
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline: Optional[float]
+    current: Optional[float]
+    status: str
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if self.baseline is None or self.current is None:
+            return None
+        return self.current / self.baseline
+
+
+def compare(
+    baseline: Dict[str, Dict], current: Dict[str, Dict], threshold: float = DEFAULT_THRESHOLD, stat: str = "min"
+) -> List[Comparison]:
+    """Compare two result sets benchmark by benchmark
+
+    A benchmark is a REGRESSION when current / baseline > 1 + threshold and IMPROVED when it's below
+    1 / (1 + threshold). Benchmarks only in current are NEW, only in baseline MISSING.
+    """
+    rows = []
+    for name in list(baseline) + [n for n in current if n not in baseline]:
+        base = baseline[name][stat] if name in baseline else None
+        cur = current[name][stat] if name in current else None
+        if base is None:
+            status = NEW
+        elif cur is None:
+            status = MISSING
+        elif cur > base * (1 + threshold):
+            status = REGRESSION
+        elif cur < base / (1 + threshold):
+            status = IMPROVED
+        else:
+            status = OK
+        rows.append(Comparison(name=name, baseline=base, current=cur, status=status))
+    return rows
+
+
+def format_comparison(rows: List[Comparison]) -> str:
+    lines = [f"{'benchmark':<60} {'baseline':>10} {'current':>10} {'ratio':>7}  status"]
+    for row in rows:
+        base = format_seconds(row.baseline) if row.baseline is not None else "-"
+        cur = format_seconds(row.current) if row.current is not None else "-"
+        ratio = f"{row.ratio:.2f}" if row.ratio is not None else "-"
+        lines.append(f"{row.name:<60} {base:>10} {cur:>10} {ratio:>7}  {row.status}")
+    return "\n".join(lines)
+
+
+def comparison_records(rows: List[Comparison]) -> List[Dict]:
+    return [dict(asdict(row), ratio=row.ratio) for row in rows]
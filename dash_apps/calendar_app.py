@@ -7,9 +7,13 @@ import plotly.express as px
 import math
 
 from dash_apps.utils import calc_max_profit, calc_max_loss, calc_max_loss_strike
+from finx_option_pricer.cache import enable_cache
 from finx_option_pricer.option_structures import gen_calendar
 from finx_option_pricer.option_plot import OptionsPlot
 
+# callbacks re-run on every input change, keep grids so only the inputs that moved cost a reprice
+enable_cache(maxsize=256)
+
 
 ###############################################################################
 # data prep helpers
@@ -7,10 +7,14 @@ import plotly.express as px
 from dash import dcc, html
 from dash.dependencies import Input, Output
 
+from finx_option_pricer.cache import enable_cache
 from finx_option_pricer.option_plot import OptionsPlot
 from finx_option_pricer.option_structures import gen_strangle
 from dash_apps.utils import calc_max_profit, calc_max_loss, calc_max_loss_strike
 
+# callbacks re-run on every input change, keep grids so only the inputs that moved cost a reprice
+enable_cache(maxsize=256)
+
 ###############################################################################
 # data prep helpers
 def helper_gen_strangle(
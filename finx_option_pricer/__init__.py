@@ -0,0 +1,7 @@
+def __getattr__(name):
+    # finx_option_pricer.profile loads the profiling module on first use, not with every submodule import
+    if name == "profile":
+        from finx_option_pricer.profiling import profile
+
+        return profile
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
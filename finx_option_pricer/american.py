@@ -0,0 +1,376 @@
+"""Closed-form approximations for American options
+
+Barone-Adesi-Whaley (1987) and Bjerksund-Stensland (2002), written as vectorized array functions in the style
+of bsm. Formulas follow Haug, The Complete Guide to Option Pricing Formulas (2nd ed.), with b the cost of carry.
+"""
+from functools import partial
+
+import numpy as np
+
+import finx_option_pricer.bsm as bsm
+from finx_option_pricer import profiling
+from finx_option_pricer.bsm import N, N_prime
+from finx_option_pricer.iv_solver import IVResult, solve_implied_vol
+from finx_option_pricer.models import PricingModel, register_model
+
+# Gauss-Legendre nodes and weights (n=20) on [0, 2], for the bivariate normal CDF
+_GL_W = np.array(
+    [
+        0.01761400713915212,
+        0.04060142980038694,
+        0.06267204833410906,
+        0.08327674157670475,
+        0.1019301198172404,
+        0.1181945319615184,
+        0.1316886384491766,
+        0.1420961093183821,
+        0.1491729864726037,
+        0.1527533871307259,
+    ]
+)
+_GL_X = np.array(
+    [
+        0.9931285991850949,
+        0.9639719272779138,
+        0.9122344282513259,
+        0.8391169718222188,
+        0.7463319064601508,
+        0.6360536807265150,
+        0.5108670019508271,
+        0.3737060887154196,
+        0.2277858511416451,
+        0.07652652113349733,
+    ]
+)
+_GL_W = np.concatenate([_GL_W, _GL_W])
+_GL_X = np.concatenate([1 - _GL_X, 1 + _GL_X])
+
+
+def bivariate_normal_cdf(a, b, rho) -> np.ndarray:
+    """P(X < a, Y < b) for standard normals with correlation rho, vectorized (Genz 2004 algorithm)"""
+    h, k, rho = [np.asarray(x, dtype=float) for x in np.broadcast_arrays(-np.asarray(a), -np.asarray(b), rho)]
+    shape = h.shape
+    h, k, rho = h.ravel(), k.ravel(), rho.ravel()
+    two_pi = 2 * np.pi
+    hk = h * k
+    bvn = np.empty(h.size)
+
+    # |rho| < 0.925, integrate over asin(rho)
+    low = np.abs(rho) < 0.925
+    if low.any():
+        hl, kl, hkl = h[low], k[low], hk[low]
+        hs = (hl * hl + kl * kl) / 2
+        asr = np.arcsin(rho[low]) / 2
+        sn = np.sin(asr[:, None] * _GL_X)
+        integral = np.exp((sn * hkl[:, None] - hs[:, None]) / (1 - sn ** 2)) @ _GL_W
+        bvn[low] = integral * asr / two_pi + N(-hl) * N(-kl)
+
+    # |rho| >= 0.925, integrate over sqrt(1 - rho^2) instead
+    high = ~low
+    if high.any():
+        r = rho[high]
+        hh = h[high]
+        kh = np.where(r < 0, -k[high], k[high])
+        hkh = np.where(r < 0, -hk[high], hk[high])
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            as_ = 1 - r ** 2
+            a_ = np.sqrt(as_)
+            bs = (hh - kh) ** 2
+            asr = -(bs / as_ + hkh) / 2
+            c = (4 - hkh) / 8
+            d = (12 - hkh) / 16
+            series = 1 - c * (bs - as_) * (1 - d * bs / 5) / 3 + c * d * as_ ** 2 / 5
+            part = np.where(asr > -100, a_ * np.exp(asr) * series, 0)
+            b_ = np.sqrt(bs)
+            sp = np.sqrt(two_pi) * N(-b_ / a_)
+            part = part - np.where(hkh > -100, np.exp(-hkh / 2) * sp * b_ * (1 - c * bs * (1 - d * bs / 5) / 3), 0)
+            a_ = a_ / 2
+            xs = (a_[:, None] * _GL_X) ** 2
+            asr_x = -(bs[:, None] / xs + hkh[:, None]) / 2
+            sp_x = 1 + c[:, None] * xs * (1 + d[:, None] * xs)
+            rs = np.sqrt(1 - xs)
+            ep = np.exp(-(hkh[:, None] / 2) * xs / (1 + rs) ** 2) / rs
+            integral = np.where(asr_x > -100, np.exp(asr_x) * (sp_x - ep), 0) @ _GL_W
+            part = np.where(np.abs(r) < 1, (a_ * integral - part) / two_pi, 0.0)
+
+        lower = np.where(hh < 0, N(kh) - N(hh), N(-hh) - N(-kh))
+        bvn[high] = np.where(r > 0, part + N(-np.maximum(hh, kh)), np.where(hh >= kh, -part, lower - part))
+
+    return np.clip(bvn, 0.0, 1.0).reshape(shape)
+
+
+def _generalized_bs(S, K, T, r, b, sigma, is_call):
+    """European value with cost of carry b"""
+    sig_sqrt_T = sigma * np.sqrt(T)
+    d1 = (np.log(S / K) + (b + sigma ** 2 / 2) * T) / sig_sqrt_T
+    d2 = d1 - sig_sqrt_T
+    sign = np.where(is_call, 1.0, -1.0)
+    return sign * (S * np.exp((b - r) * T) * N(sign * d1) - K * np.exp(-r * T) * N(sign * d2))
+
+
+def _broadcast(S, K, T, r, q, sigma, option_type):
+    arrays = np.broadcast_arrays(S, K, T, r, q, sigma, bsm.call_mask(option_type))
+    flat = [np.asarray(a, dtype=float).ravel() for a in arrays[:6]]
+    return (arrays[0].shape, *flat, arrays[6].ravel())
+
+
+# -----------------------------------------------------------------------------
+# Barone-Adesi-Whaley
+
+
+def _baw_critical_price(K, T, r, b, sigma, is_call, tol=1e-8, max_iter=100):
+    """Critical spot price above (calls) / below (puts) which immediate exercise is optimal"""
+    sign = np.where(is_call, 1.0, -1.0)
+    sig_sqrt_T = sigma * np.sqrt(T)
+    M = 2 * r / sigma ** 2
+    N_ = 2 * b / sigma ** 2
+    Kt = 1 - np.exp(-r * T)
+    q = (-(N_ - 1) + sign * np.sqrt((N_ - 1) ** 2 + 4 * M / Kt)) / 2
+    q_inf = (-(N_ - 1) + sign * np.sqrt((N_ - 1) ** 2 + 4 * M)) / 2
+
+    # seed from the perpetual option's boundary
+    s_inf = K / (1 - 1 / q_inf)
+    h = -sign * (b * T + sign * 2 * sig_sqrt_T) * K / (sign * (s_inf - K))
+    Si = np.where(is_call, K + (s_inf - K) * (1 - np.exp(h)), s_inf + (K - s_inf) * np.exp(h))
+
+    carry = np.exp((b - r) * T)
+    active = np.ones(K.size, dtype=bool)
+    for _ in range(max_iter):
+        d1 = (np.log(Si / K) + (b + sigma ** 2 / 2) * T) / sig_sqrt_T
+        euro = _generalized_bs(Si, K, T, r, b, sigma, is_call)
+        tail = 1 - carry * N(sign * d1)
+        lhs = sign * (Si - K)
+        rhs = euro + sign * tail * Si / q
+        slope = sign * carry * N(sign * d1) * (1 - 1 / q) + sign * (1 - sign * carry * N_prime(d1) / sig_sqrt_T) / q
+        active = np.abs(lhs - rhs) / K > tol
+        if not active.any():
+            break
+        step = np.where(is_call, (K + rhs - slope * Si) / (1 - slope), (K - rhs + slope * Si) / (1 + slope))
+        Si = np.where(active, step, Si)
+    return Si, q, carry
+
+
+def baw_value(S, K, T, r, sigma, option_type="c", q=0.0) -> np.ndarray:
+    """Barone-Adesi-Whaley approximation of the American option value
+
+    Args:
+        S, K, T, r, sigma: contract terms, scalars or broadcastable arrays
+        option_type: "c"/"p" or array of them (or booleans, True => call). Defaults to "c".
+        q: continuous dividend yield, the cost of carry is b = r - q. Defaults to 0.0
+
+    Returns:
+        np.ndarray: option values in the broadcast shape of the inputs
+    """
+    shape, S, K, T, r, q, sigma, is_call = _broadcast(S, K, T, r, q, sigma, option_type)
+    return _baw(S, K, T, r, r - q, sigma, is_call).reshape(shape)
+
+
+def _baw(S, K, T, r, b, sigma, is_call):
+    sign = np.where(is_call, 1.0, -1.0)
+    value = np.maximum(sign * (S - K), 0.0)
+    live = T > 0
+    value[live] = _generalized_bs(S[live], K[live], T[live], r[live], b[live], sigma[live], is_call[live])
+
+    # calls with b >= r are never exercised early, and puts aren't when r <= 0
+    early = live & np.where(is_call, b < r, r > 0)
+    if early.any():
+        S_, K_, T_, r_, b_, v_, c_ = [x[early] for x in (S, K, T, r, b, sigma, is_call)]
+        s_ = sign[early]
+        Si, q, carry = _baw_critical_price(K_, T_, r_, b_, v_, c_)
+        d1 = (np.log(Si / K_) + (b_ + v_ ** 2 / 2) * T_) / (v_ * np.sqrt(T_))
+        A = s_ * (Si / q) * (1 - carry * N(s_ * d1))
+        euro = value[early]
+        exercise = s_ * (S_ - Si) >= 0
+        value[early] = np.where(exercise, s_ * (S_ - K_), euro + A * (S_ / Si) ** q)
+    return value
+
+
+# -----------------------------------------------------------------------------
+# Bjerksund-Stensland 2002
+
+
+def _phi(S, T, gamma, h, i, r, b, sigma):
+    sig_sqrt_T = sigma * np.sqrt(T)
+    lam = (-r + gamma * b + 0.5 * gamma * (gamma - 1) * sigma ** 2) * T
+    d = -(np.log(S / h) + (b + (gamma - 0.5) * sigma ** 2) * T) / sig_sqrt_T
+    kappa = 2 * b / sigma ** 2 + (2 * gamma - 1)
+    return np.exp(lam) * S ** gamma * (N(d) - (i / S) ** kappa * N(d - 2 * np.log(i / S) / sig_sqrt_T))
+
+
+def _ksi(S, T2, gamma, h, I2, I1, t1, r, b, sigma):
+    drift = b + (gamma - 0.5) * sigma ** 2
+    sig_sqrt_t1 = sigma * np.sqrt(t1)
+    sig_sqrt_T2 = sigma * np.sqrt(T2)
+    e1 = (np.log(S / I1) + drift * t1) / sig_sqrt_t1
+    e2 = (np.log(I2 ** 2 / (S * I1)) + drift * t1) / sig_sqrt_t1
+    e3 = (np.log(S / I1) - drift * t1) / sig_sqrt_t1
+    e4 = (np.log(I2 ** 2 / (S * I1)) - drift * t1) / sig_sqrt_t1
+    f1 = (np.log(S / h) + drift * T2) / sig_sqrt_T2
+    f2 = (np.log(I2 ** 2 / (S * h)) + drift * T2) / sig_sqrt_T2
+    f3 = (np.log(I1 ** 2 / (S * h)) + drift * T2) / sig_sqrt_T2
+    f4 = (np.log(S * I1 ** 2 / (h * I2 ** 2)) + drift * T2) / sig_sqrt_T2
+    rho = np.sqrt(t1 / T2)
+    lam = -r + gamma * b + 0.5 * gamma * (gamma - 1) * sigma ** 2
+    kappa = 2 * b / sigma ** 2 + (2 * gamma - 1)
+    M = bivariate_normal_cdf
+    terms = M(-e1, -f1, rho) - (I2 / S) ** kappa * M(-e2, -f2, rho)
+    terms -= (I1 / S) ** kappa * M(-e3, -f3, -rho)
+    terms += (I1 / I2) ** kappa * M(-e4, -f4, -rho)
+    return np.exp(lam * T2) * S ** gamma * terms
+
+
+def _bs2002_call(S, K, T, r, b, sigma):
+    """Bjerksund-Stensland 2002 American call for live contracts with b < r"""
+    t1 = 0.5 * (np.sqrt(5) - 1) * T
+    beta = (0.5 - b / sigma ** 2) + np.sqrt((b / sigma ** 2 - 0.5) ** 2 + 2 * r / sigma ** 2)
+    b_inf = beta / (beta - 1) * K
+    with np.errstate(divide="ignore"):
+        b0 = np.where(r - b > 0, np.maximum(K, r / (r - b) * K), K)
+    ht1 = -(b * t1 + 2 * sigma * np.sqrt(t1)) * K ** 2 / ((b_inf - b0) * b0)
+    ht2 = -(b * T + 2 * sigma * np.sqrt(T)) * K ** 2 / ((b_inf - b0) * b0)
+    I1 = b0 + (b_inf - b0) * (1 - np.exp(ht1))
+    I2 = b0 + (b_inf - b0) * (1 - np.exp(ht2))
+    alfa1 = (I1 - K) * I1 ** -beta
+    alfa2 = (I2 - K) * I2 ** -beta
+
+    # evaluated below the exercise boundary only, immediate exercise above it
+    S_ = np.minimum(S, I2)
+    phi = partial(_phi, S_, t1, r=r, b=b, sigma=sigma)
+    ksi = partial(_ksi, S_, T, I2=I2, I1=I1, t1=t1, r=r, b=b, sigma=sigma)
+    value = alfa2 * S_ ** beta - alfa2 * phi(beta, I2, I2)
+    value += phi(1, I2, I2) - phi(1, I1, I2)
+    value += K * (phi(0, I1, I2) - phi(0, I2, I2))
+    value += alfa1 * (phi(beta, I1, I2) - ksi(beta, I1))
+    value += ksi(1, I1) - ksi(1, K)
+    value += K * (ksi(0, K) - ksi(0, I1))
+    return np.where(S >= I2, S - K, value)
+
+
+def bs2002_value(S, K, T, r, sigma, option_type="c", q=0.0) -> np.ndarray:
+    """Bjerksund-Stensland (2002) approximation of the American option value
+
+    Puts are priced through the put-call transformation P(S, K, T, r, b) = C(K, S, T, r - b, -b).
+
+    Args:
+        S, K, T, r, sigma: contract terms, scalars or broadcastable arrays
+        option_type: "c"/"p" or array of them (or booleans, True => call). Defaults to "c".
+        q: continuous dividend yield, the cost of carry is b = r - q. Defaults to 0.0
+
+    Returns:
+        np.ndarray: option values in the broadcast shape of the inputs
+    """
+    shape, S, K, T, r, q, sigma, is_call = _broadcast(S, K, T, r, q, sigma, option_type)
+    return _bs2002(S, K, T, r, r - q, sigma, is_call).reshape(shape)
+
+
+def _bs2002(S, K, T, r, b, sigma, is_call):
+    sign = np.where(is_call, 1.0, -1.0)
+    value = np.maximum(sign * (S - K), 0.0)
+    live = T > 0
+    value[live] = _generalized_bs(S[live], K[live], T[live], r[live], b[live], sigma[live], is_call[live])
+
+    # swap spot and strike for puts, then calls with b >= r are never exercised early
+    S_c, K_c = np.where(is_call, S, K), np.where(is_call, K, S)
+    r_c, b_c = np.where(is_call, r, r - b), np.where(is_call, b, -b)
+    early = live & (b_c < r_c)
+    if early.any():
+        # the approximation is a lower bound on the American value, which is never below the European one
+        approx = _bs2002_call(S_c[early], K_c[early], T[early], r_c[early], b_c[early], sigma[early])
+        value[early] = np.maximum(approx, value[early])
+    return value
+
+
+# -----------------------------------------------------------------------------
+# greeks and implied vol by bumping the analytic value
+
+
+def _bumped_greeks(value_func, S, K, T, r, sigma, option_type="c", q=0.0) -> bsm.Greeks:
+    """All greeks by central finite differences, with every bumped contract priced in one vectorized call"""
+    shape, S, K, T, r, q, sigma, is_call = _broadcast(S, K, T, r, q, sigma, option_type)
+    h_S = 1e-3 * S
+    h_sigma = 1e-3
+    h_r = 1e-4
+    h_T = np.minimum(1e-3, T / 2)
+    # (S, sigma, r, T) bumps, in units of the step sizes above
+    bumps = [
+        (0, 0, 0, 0),
+        (1, 0, 0, 0),
+        (-1, 0, 0, 0),
+        (0, 1, 0, 0),
+        (0, -1, 0, 0),
+        (0, 0, 1, 0),
+        (0, 0, -1, 0),
+        (0, 0, 0, 1),
+        (0, 0, 0, -1),
+        (1, 1, 0, 0),
+        (-1, 1, 0, 0),
+        (1, -1, 0, 0),
+        (-1, -1, 0, 0),
+        (1, 0, 0, -1),
+        (-1, 0, 0, -1),
+        (1, 0, 0, 1),
+        (-1, 0, 0, 1),
+    ]
+    stacked = [
+        np.concatenate([S + i * h_S for i, _, _, _ in bumps]),
+        np.tile(K, len(bumps)),
+        np.concatenate([T + i * h_T for _, _, _, i in bumps]),
+        np.concatenate([r + i * h_r for _, _, i, _ in bumps]),
+        np.concatenate([sigma + i * h_sigma for _, i, _, _ in bumps]),
+        np.tile(is_call, len(bumps)),
+        np.tile(q, len(bumps)),
+    ]
+    v = np.split(value_func(*stacked), len(bumps))
+
+    delta = (v[1] - v[2]) / (2 * h_S)
+    delta_vol_up = (v[9] - v[10]) / (2 * h_S)
+    delta_vol_down = (v[11] - v[12]) / (2 * h_S)
+    delta_later = (v[13] - v[14]) / (2 * h_S)
+    delta_earlier = (v[15] - v[16]) / (2 * h_S)
+    greeks = bsm.Greeks(
+        value=v[0],
+        delta=delta,
+        gamma=(v[1] - 2 * v[0] + v[2]) / h_S ** 2,
+        vega=(v[3] - v[4]) / (2 * h_sigma),
+        theta=-(v[7] - v[8]) / (2 * h_T),
+        rho=(v[5] - v[6]) / (2 * h_r),
+        vanna=(delta_vol_up - delta_vol_down) / (2 * h_sigma),
+        volga=(v[3] - 2 * v[0] + v[4]) / h_sigma ** 2,
+        charm=(delta_later - delta_earlier) / (2 * h_T),
+    )
+    return bsm.Greeks(*[x.reshape(shape) for x in greeks])
+
+
+def _bumped_implied_vol(value_func, opt_value, S, K, T, r, option_type="c", q=0.0, tol=1e-10) -> IVResult:
+    """Implied vol through the batched safeguarded Newton solver, vega from a bump priced in the same call"""
+    price = np.asarray(opt_value, dtype=float)
+    shape, S, K, T, r, q, _, is_call = _broadcast(S, K, T, r, q, np.zeros_like(price), option_type)
+    price = np.broadcast_to(price, shape).ravel()
+    h = 1e-5
+
+    upper = np.where(is_call, S, K)
+    lower = np.maximum(np.where(is_call, S - K, K - S), 0.0)
+    valid = (T > 0) & (price > lower) & (price < upper)
+    sigma0 = bsm.implied_vol(price, S, K, T, r, is_call, q).iv
+    sigma0 = np.where(np.isfinite(sigma0), sigma0, 0.3)
+
+    def value_vega(sigma, idx):
+        n = idx.size
+        args = [np.tile(x[idx], 2) for x in (S, K, T, r)]
+        values = value_func(*args, np.concatenate([sigma, sigma + h]), np.tile(is_call[idx], 2), np.tile(q[idx], 2))
+        return values[:n], (values[n:] - values[:n]) / h, None
+
+    res = solve_implied_vol(price, value_vega, sigma0, valid, tol=tol)
+    profiling.record_iterations("american.implied_vol", res.iterations)
+    return IVResult(*[x.reshape(shape) for x in res])
+
+
+baw_greeks = partial(_bumped_greeks, baw_value)
+baw_implied_vol = partial(_bumped_implied_vol, baw_value)
+bs2002_greeks = partial(_bumped_greeks, bs2002_value)
+bs2002_implied_vol = partial(_bumped_implied_vol, bs2002_value)
+
+BAW = PricingModel(name="baw", value=baw_value, greeks=baw_greeks, implied_vol=baw_implied_vol)
+BS2002 = PricingModel(name="bs2002", value=bs2002_value, greeks=bs2002_greeks, implied_vol=bs2002_implied_vol)
+register_model(BAW)
+register_model(BS2002)
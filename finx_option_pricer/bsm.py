@@ -2,12 +2,82 @@
 # pulled from codearmo.com
 # https://www.codearmo.com/python-tutorial/options-trading-greeks-black-scholes
 #
+import math
+from importlib.util import find_spec
+from typing import NamedTuple
+
 import numpy as np
-from scipy.optimize import minimize_scalar
-from scipy.stats import norm
 
-N = norm.cdf
-N_prime = norm.pdf
+from finx_option_pricer import profiling
+from finx_option_pricer.iv_solver import (
+    SIGMA_MAX,
+    SIGMA_MIN,
+    IVResult,
+    solve_implied_vol,
+)
+
+_SQRT_2 = math.sqrt(2.0)
+_SQRT_2PI = math.sqrt(2.0 * math.pi)
+
+
+def N(x):
+    """Standard normal CDF
+
+    Floats go through math.erfc. Arrays go through scipy.special.ndtr, imported on first use so importing bsm
+    doesn't load scipy.
+    """
+    if isinstance(x, float):
+        return 0.5 * math.erfc(-x / _SQRT_2)
+    from scipy.special import ndtr
+
+    return ndtr(x)
+
+
+def N_prime(x):
+    """Standard normal PDF"""
+    if isinstance(x, float):
+        return math.exp(-0.5 * x * x) / _SQRT_2PI
+    return np.exp(-0.5 * np.square(x)) / _SQRT_2PI
+
+
+NUMPY = "numpy"
+NUMBA = "numba"
+# numba (and with it bsm_numba) is only imported once the numba backend is first used
+HAS_NUMBA = find_spec("numba") is not None
+_backend = NUMBA if HAS_NUMBA else NUMPY
+# with the numba backend, batches smaller than this still run on the NumPy kernels, whose per call overhead is
+# lower, and a short-lived process pricing a few contracts doesn't pay for importing numba and loading kernels
+NUMBA_MIN_SIZE = 256
+
+
+def _numba_kernels():
+    import finx_option_pricer.bsm_numba as bsm_numba
+
+    return bsm_numba
+
+
+def _use_numba(*args) -> bool:
+    """True when the numba backend is selected and the batch has at least NUMBA_MIN_SIZE contracts"""
+    return _backend == NUMBA and max(np.size(a) for a in args) >= NUMBA_MIN_SIZE
+
+
+def set_backend(backend: str) -> None:
+    """Select the kernels behind bs_value, bs_greeks and implied_vol
+
+    "numba" (the default when numba is installed) runs the fused JIT kernels in bsm_numba, "numpy" the
+    vectorized NumPy ones below. Both give the same results to within float rounding. With numba, batches of
+    fewer than NUMBA_MIN_SIZE contracts still run on the NumPy kernels.
+    """
+    global _backend
+    if backend not in (NUMPY, NUMBA):
+        raise ValueError(f"Unknown backend={backend}. Use '{NUMPY}' or '{NUMBA}'")
+    if backend == NUMBA and not HAS_NUMBA:
+        raise ImportError("The numba backend needs numba installed, pip install numba")
+    _backend = backend
+
+
+def get_backend() -> str:
+    return _backend
 
 
 def bs_call_value(S, K, T, r, sigma):
@@ -37,7 +107,7 @@ def bs_putdiv_value(S, K, T, r, q, sigma):
 
 
 def d1(S, K, T, r, sigma):
-    return (np.log(S / K) + (r + sigma ** 2 / 2) * T) / sigma * np.sqrt(T)
+    return (np.log(S / K) + (r + sigma ** 2 / 2) * T) / (sigma * np.sqrt(T))
 
 
 def d2(S, K, T, r, sigma):
@@ -80,19 +150,193 @@ def rho_put(S, K, T, r, sigma):
     return -K * T * np.exp(-r * T) * N(-d2(S, K, T, r, sigma))
 
 
-def implied_vol_call(opt_value, S, K, T, r):
-    # https://www.codearmo.com/python-tutorial/calculating-volatility-smile
-    def call_obj(sigma):
-        return abs(bs_call_value(S, K, T, r, sigma) - opt_value)
-
-    res = minimize_scalar(call_obj, bounds=(0.01, 6), method="bounded")
-    return res.x
-
-
-def implied_vol_put(opt_value, S, K, T, r):
-    # https://www.codearmo.com/python-tutorial/calculating-volatility-smile
-    def put_obj(sigma):
-        return abs(bs_put_value(S, K, T, r, sigma) - opt_value)
-
-    res = minimize_scalar(put_obj, bounds=(0.01, 6), method="bounded")
-    return res.x
+def _carry(S, T, r, q):
+    """Cost of carry b = r - q, exp(-qT) and the dividend discounted spot
+
+    When every q is zero this returns (r, 1.0, S) untouched, so dividend-free batches don't pay for the yield.
+    """
+    if not np.any(q):
+        return r, 1.0, S
+    q_df = np.exp(-q * T)
+    return r - q, q_df, S * q_df
+
+
+def bs_value(S, K, T, r, sigma, option_type="c", q=0.0):
+    """Value of calls and puts (option_type may be mixed) in one vectorized pass, q is the continuous dividend
+    yield"""
+    if _use_numba(S, K, T, r, sigma, q):
+        profiling.count("bsm.bs_value[numba]", S, K, T, r, sigma, q)
+        return _numba_kernels().bs_value(S, K, T, r, sigma, call_mask(option_type), q)
+    profiling.count("bsm.bs_value[numpy]", S, K, T, r, sigma, q)
+    b, _, S_q = _carry(S, T, r, q)
+    sig_sqrt_T = sigma * np.sqrt(T)
+    d1_ = (np.log(S / K) + (b + sigma ** 2 / 2) * T) / sig_sqrt_T
+    d2_ = d1_ - sig_sqrt_T
+    sign = np.where(call_mask(option_type), 1.0, -1.0)
+    return sign * (S_q * N(sign * d1_) - K * np.exp(-r * T) * N(sign * d2_))
+
+
+class Greeks(NamedTuple):
+    value: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray
+    theta: np.ndarray
+    rho: np.ndarray
+    vanna: np.ndarray  # d(delta)/d(sigma)
+    volga: np.ndarray  # d(vega)/d(sigma)
+    charm: np.ndarray  # d(delta)/dt, as time passes
+
+
+def bs_greeks(S, K, T, r, sigma, option_type="c", q=0.0) -> Greeks:
+    """Price and all first and second order greeks in a single pass
+
+    log(S/K), sqrt(T), d1, d2, the discount factor and the CDF/PDF terms are computed once and shared by
+    every output. Inputs are scalars or arrays and broadcast against each other; option_type may be mixed.
+
+    Args:
+        S: spot prices
+        K: strike prices
+        T: time to maturity (in years)
+        r: risk free rates
+        sigma: volatilities
+        option_type: "c"/"p" or array of them (or booleans, True => call). Defaults to "c".
+        q: continuous dividend yield. Defaults to 0.0
+
+    Returns:
+        Greeks: (value, delta, gamma, vega, theta, rho, vanna, volga, charm). theta and charm are per year.
+    """
+    if _use_numba(S, K, T, r, sigma, q):
+        profiling.count("bsm.bs_greeks[numba]", S, K, T, r, sigma, q)
+        return Greeks(*_numba_kernels().bs_greeks(S, K, T, r, sigma, call_mask(option_type), q))
+    profiling.count("bsm.bs_greeks[numpy]", S, K, T, r, sigma, q)
+    b, q_df, S_q = _carry(S, T, r, q)
+    sqrt_T = np.sqrt(T)
+    sig_sqrt_T = sigma * sqrt_T
+    d1_ = (np.log(S / K) + (b + sigma ** 2 / 2) * T) / sig_sqrt_T
+    d2_ = d1_ - sig_sqrt_T
+
+    # +1 for calls, -1 for puts, lets calls and puts share one expression for each greek
+    sign = np.where(call_mask(option_type), 1.0, -1.0)
+    K_df = K * np.exp(-r * T)
+    N_d1 = N(sign * d1_)
+    N_d2 = N(sign * d2_)
+    n_d1 = N_prime(d1_)
+
+    vega_ = S_q * sqrt_T * n_d1
+    theta = -S_q * n_d1 * sigma / (2 * sqrt_T) - sign * r * K_df * N_d2
+    charm = -q_df * n_d1 * (2 * b * T - d2_ * sig_sqrt_T) / (2 * T * sig_sqrt_T)
+    if np.any(q):
+        theta = theta + sign * q * S_q * N_d1
+        charm = charm + sign * q * q_df * N_d1
+    return Greeks(
+        value=sign * (S_q * N_d1 - K_df * N_d2),
+        delta=sign * q_df * N_d1,
+        gamma=q_df * n_d1 / (S * sig_sqrt_T),
+        vega=vega_,
+        theta=theta,
+        rho=sign * K_df * T * N_d2,
+        vanna=-q_df * n_d1 * d2_ / sigma,
+        volga=vega_ * d1_ * d2_ / sigma,
+        charm=charm,
+    )
+
+
+def call_mask(option_type) -> np.ndarray:
+    """Boolean array, True for calls. Accepts "c"/"p" strings, arrays of them, or booleans (True => call)
+
+    Raises:
+        ValueError: for any other option type
+    """
+    option_type = np.asarray(option_type)
+    if option_type.dtype == bool:
+        return option_type
+    is_call = option_type == "c"
+    unknown = ~(is_call | (option_type == "p"))
+    if unknown.any():
+        unknown = np.unique(option_type[unknown]).tolist()
+        raise ValueError(f"option_type must be c or p (for call or put), got {unknown}")
+    return is_call
+
+
+def _bs_value_vega(S, K, T, b, S_q, K_df, sigma, is_call):
+    """Value, vega and volga of calls (is_call=True) and puts in one pass, used by the implied vol solver
+
+    Takes the cost of carry b, dividend discounted spot S_q and discounted strike K_df, which don't change
+    between solver iterations.
+    """
+    profiling.count("bsm.value_vega", S)
+    sqrt_T = np.sqrt(T)
+    sig_sqrt_T = sigma * sqrt_T
+    d1_ = (np.log(S / K) + (b + sigma ** 2 / 2) * T) / sig_sqrt_T
+    d2_ = d1_ - sig_sqrt_T
+    sign = np.where(is_call, 1.0, -1.0)
+    value = sign * (S_q * N(sign * d1_) - K_df * N(sign * d2_))
+    vega_ = S_q * sqrt_T * N_prime(d1_)
+    volga_ = vega_ * d1_ * d2_ / sigma
+    return value, vega_, volga_
+
+
+def implied_vol(
+    opt_value, S, K, T, r, option_type="c", q=0.0, tol: float = 1e-10, max_iter: int = 50
+) -> IVResult:
+    """Implied volatility for whole arrays of quotes at once
+
+    All inputs broadcast against each other. Quotes at or below intrinsic value, at or above the no-arbitrage
+    upper bound (dividend discounted S for calls, discounted K for puts) or with T <= 0 are not iterated on and
+    come back as nan with converged=False.
+
+    Args:
+        opt_value: option prices
+        S: spot prices
+        K: strike prices
+        T: time to maturity (in years)
+        r: risk free rates
+        option_type: "c"/"p" or array of them (or booleans, True => call). Defaults to "c".
+        q: continuous dividend yield. Defaults to 0.0
+        tol (float, optional): absolute price tolerance. Defaults to 1e-10.
+        max_iter (int, optional): maximum solver iterations. Defaults to 50.
+
+    Returns:
+        IVResult: (iv, converged, iterations) arrays in the broadcast shape of the inputs
+    """
+    if _use_numba(opt_value, S, K, T, r, q):
+        profiling.count("bsm.implied_vol[numba]", opt_value, S, K, T, r, q)
+        is_call = call_mask(option_type)
+        kernels = _numba_kernels()
+        res = IVResult(*kernels.implied_vol(opt_value, S, K, T, r, is_call, q, tol, max_iter, SIGMA_MIN, SIGMA_MAX))
+        profiling.record_iterations("bsm.implied_vol", res.iterations)
+        return res
+    profiling.count("bsm.implied_vol[numpy]", opt_value, S, K, T, r, q)
+    arrays = np.broadcast_arrays(opt_value, S, K, T, r, q, call_mask(option_type))
+    shape = arrays[0].shape
+    price, S, K, T, r, q = [np.asarray(a, dtype=float).ravel() for a in arrays[:6]]
+    is_call = arrays[6].ravel()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b, _, S_q = _carry(S, T, r, q)
+        discounted_K = K * np.exp(-r * T)
+        lower = np.where(is_call, np.maximum(S_q - discounted_K, 0.0), np.maximum(discounted_K - S_q, 0.0))
+        upper = np.where(is_call, S_q, discounted_K)
+        valid = (T > 0) & (price > lower) & (price < upper)
+
+        # start at the inflection point of vega wrt sigma (Manaster-Koehler), where Newton converges
+        # monotonically, or the Brenner-Subrahmanyam ATM approximation when the option is at the money forward
+        sigma0 = np.sqrt(2.0 * np.abs(np.log(S_q / discounted_K)) / T)
+        atm = ~(sigma0 > 1e-2)
+        sigma0[atm] = (np.sqrt(2.0 * np.pi / T) * price / S_q)[atm]
+
+    def value_vega(sigma, idx):
+        return _bs_value_vega(S[idx], K[idx], T[idx], b[idx], S_q[idx], discounted_K[idx], sigma, is_call[idx])
+
+    res = solve_implied_vol(price, value_vega, sigma0, valid, tol=tol, max_iter=max_iter)
+    profiling.record_iterations("bsm.implied_vol", res.iterations)
+    return IVResult(*[x.reshape(shape) for x in res])
+
+
+def implied_vol_call(opt_value, S, K, T, r, q=0.0):
+    return float(implied_vol(opt_value, S, K, T, r, option_type="c", q=q).iv)
+
+
+def implied_vol_put(opt_value, S, K, T, r, q=0.0):
+    return float(implied_vol(opt_value, S, K, T, r, option_type="p", q=q).iv)
@@ -0,0 +1,189 @@
+"""Numba JIT backend for the bsm kernels
+
+Fused, loop based versions of bsm.bs_value, bs_greeks and implied_vol. Each contract is priced in registers,
+so none of the d1/d2/discount temporaries the NumPy kernels allocate are needed and the normal CDF is a direct
+erfc call instead of a scipy ufunc dispatch. Kernels release the GIL (nogil), so they scale across threads,
+and batches of at least PARALLEL_THRESHOLD contracts run on the parallel (prange) versions.
+
+Importing this module requires numba. bsm uses it automatically when numba is installed, see
+bsm.set_backend. Kernels are compiled on first use and cached on disk (numba's cache=True, next to this module
+or in numba's user-wide cache directory), so later processes load them instead of compiling again.
+"""
+
+import math
+import types
+
+import numba
+import numpy as np
+
+# batches at least this large run on the multi-threaded (prange) kernels
+PARALLEL_THRESHOLD = 100_000
+
+_SQRT_2 = math.sqrt(2.0)
+_SQRT_2PI = math.sqrt(2.0 * math.pi)
+_EPS = np.finfo(float).eps
+
+_JIT_OPTIONS = dict(nogil=True, error_model="numpy", cache=True)
+
+
+@numba.njit(**_JIT_OPTIONS)
+def _N(x):
+    return 0.5 * math.erfc(-x / _SQRT_2)
+
+
+@numba.njit(**_JIT_OPTIONS)
+def _N_prime(x):
+    return math.exp(-0.5 * x * x) / _SQRT_2PI
+
+
+def _value_kernel(S, K, T, r, q, sigma, is_call, out):
+    for i in numba.prange(S.size):
+        sign = 1.0 if is_call[i] else -1.0
+        S_q = S[i] * math.exp(-q[i] * T[i]) if q[i] != 0.0 else S[i]
+        sig_sqrt_T = sigma[i] * math.sqrt(T[i])
+        d1 = (math.log(S[i] / K[i]) + (r[i] - q[i] + sigma[i] ** 2 / 2) * T[i]) / sig_sqrt_T
+        d2 = d1 - sig_sqrt_T
+        out[i] = sign * (S_q * _N(sign * d1) - K[i] * math.exp(-r[i] * T[i]) * _N(sign * d2))
+
+
+def _greeks_kernel(S, K, T, r, q, sigma, is_call, out):
+    for i in numba.prange(S.size):
+        sign = 1.0 if is_call[i] else -1.0
+        q_df = math.exp(-q[i] * T[i]) if q[i] != 0.0 else 1.0
+        S_q = S[i] * q_df
+        b = r[i] - q[i]
+        sqrt_T = math.sqrt(T[i])
+        sig_sqrt_T = sigma[i] * sqrt_T
+        d1 = (math.log(S[i] / K[i]) + (b + sigma[i] ** 2 / 2) * T[i]) / sig_sqrt_T
+        d2 = d1 - sig_sqrt_T
+
+        K_df = K[i] * math.exp(-r[i] * T[i])
+        N_d1 = _N(sign * d1)
+        N_d2 = _N(sign * d2)
+        n_d1 = _N_prime(d1)
+        vega = S_q * sqrt_T * n_d1
+
+        out[0, i] = sign * (S_q * N_d1 - K_df * N_d2)
+        out[1, i] = sign * q_df * N_d1
+        out[2, i] = q_df * n_d1 / (S[i] * sig_sqrt_T)
+        out[3, i] = vega
+        out[4, i] = -S_q * n_d1 * sigma[i] / (2 * sqrt_T) - sign * r[i] * K_df * N_d2 + sign * q[i] * S_q * N_d1
+        out[5, i] = sign * K_df * T[i] * N_d2
+        out[6, i] = -q_df * n_d1 * d2 / sigma[i]
+        out[7, i] = vega * d1 * d2 / sigma[i]
+        out[8, i] = (
+            -q_df * n_d1 * (2 * b * T[i] - d2 * sig_sqrt_T) / (2 * T[i] * sig_sqrt_T) + sign * q[i] * q_df * N_d1
+        )
+
+
+def _implied_vol_kernel(price, S, K, T, r, q, is_call, tol, max_iter, sigma_min, sigma_max, iv, converged, iters):
+    """Per contract version of iv_solver.solve_implied_vol, same seed, bracket, steps and stopping rules"""
+    for i in numba.prange(S.size):
+        iv[i] = np.nan
+        converged[i] = False
+        iters[i] = 0
+
+        sign = 1.0 if is_call[i] else -1.0
+        S_q = S[i] * math.exp(-q[i] * T[i]) if q[i] != 0.0 else S[i]
+        K_df = K[i] * math.exp(-r[i] * T[i])
+        lower = max(sign * (S_q - K_df), 0.0)
+        upper = S_q if is_call[i] else K_df
+        # quotes outside the no-arbitrage bounds get no iterations
+        n_iter = max_iter if T[i] > 0 and price[i] > lower and price[i] < upper else 0
+
+        # Manaster-Koehler start, Brenner-Subrahmanyam when at the money forward
+        sigma = math.sqrt(2.0 * abs(math.log(S_q / K_df)) / T[i])
+        if not sigma > 1e-2:
+            sigma = math.sqrt(2.0 * math.pi / T[i]) * price[i] / S_q
+        sigma = min(max(sigma, sigma_min), sigma_max)
+        lo = sigma_min
+        hi = sigma_max
+
+        sqrt_T = math.sqrt(T[i])
+        b = r[i] - q[i]
+        log_moneyness = math.log(S[i] / K[i])
+        for _ in range(n_iter):
+            iters[i] += 1
+            sig_sqrt_T = sigma * sqrt_T
+            d1 = (log_moneyness + (b + sigma ** 2 / 2) * T[i]) / sig_sqrt_T
+            d2 = d1 - sig_sqrt_T
+            value = sign * (S_q * _N(sign * d1) - K_df * _N(sign * d2))
+            vega = S_q * sqrt_T * _N_prime(d1)
+            volga = vega * d1 * d2 / sigma
+
+            diff = value - price[i]
+            if abs(diff) < tol:
+                iv[i] = sigma
+                converged[i] = True
+                break
+
+            if diff > 0:
+                hi = sigma
+            else:
+                lo = sigma
+
+            # Halley correction, dropped where it would flip the direction of the Newton step
+            step = diff / vega
+            denom = 1.0 - 0.5 * step * volga / vega
+            if denom > 0.5:
+                step = step / denom
+            new_sigma = sigma - step
+            if not math.isfinite(new_sigma) or new_sigma <= lo or new_sigma >= hi:
+                new_sigma = 0.5 * (lo + hi)
+
+            # bracket collapsed to float precision, solved only when the root is inside the vol bounds
+            if hi - lo <= 4 * _EPS * hi:
+                if lo > sigma_min and hi < sigma_max:
+                    iv[i] = sigma
+                    converged[i] = True
+                break
+            sigma = new_sigma
+
+
+def _renamed(f, suffix: str):
+    """Copy of f under another name. numba's on-disk cache is keyed by the function's name and code, not the
+    compile options, so the parallel kernels need their own names to not collide with the serial ones."""
+    g = types.FunctionType(f.__code__, f.__globals__, f.__name__ + suffix, f.__defaults__, f.__closure__)
+    g.__qualname__ = f.__qualname__ + suffix
+    return g
+
+
+_KERNELS = (_value_kernel, _greeks_kernel, _implied_vol_kernel)
+_serial = {f.__name__: numba.njit(**_JIT_OPTIONS)(f) for f in _KERNELS}
+_parallel = {f.__name__: numba.njit(parallel=True, **_JIT_OPTIONS)(_renamed(f, "_parallel")) for f in _KERNELS}
+
+
+def _kernel(name: str, n: int):
+    return (_parallel if n >= PARALLEL_THRESHOLD else _serial)[name]
+
+
+def _flatten(*terms):
+    """Broadcast terms against each other, returning (shape, flat contiguous arrays...). The last term is is_call"""
+    arrays = np.broadcast_arrays(*terms)
+    flat = [np.ascontiguousarray(a, dtype=float).ravel() for a in arrays[:-1]]
+    return (arrays[0].shape, *flat, np.ascontiguousarray(arrays[-1], dtype=bool).ravel())
+
+
+def bs_value(S, K, T, r, sigma, is_call, q=0.0) -> np.ndarray:
+    shape, S, K, T, r, q, sigma, is_call = _flatten(S, K, T, r, q, sigma, is_call)
+    out = np.empty(S.size)
+    _kernel("_value_kernel", S.size)(S, K, T, r, q, sigma, is_call, out)
+    return out.reshape(shape)[()]
+
+
+def bs_greeks(S, K, T, r, sigma, is_call, q=0.0) -> tuple:
+    """(value, delta, gamma, vega, theta, rho, vanna, volga, charm), in the order of bsm.Greeks"""
+    shape, S, K, T, r, q, sigma, is_call = _flatten(S, K, T, r, q, sigma, is_call)
+    out = np.empty((9, S.size))
+    _kernel("_greeks_kernel", S.size)(S, K, T, r, q, sigma, is_call, out)
+    return tuple(x.reshape(shape)[()] for x in out)
+
+
+def implied_vol(opt_value, S, K, T, r, is_call, q, tol, max_iter, sigma_min, sigma_max) -> tuple:
+    """(iv, converged, iterations), in the order of iv_solver.IVResult"""
+    shape, price, S, K, T, r, q, is_call = _flatten(opt_value, S, K, T, r, q, is_call)
+    n = S.size
+    iv, converged, iterations = np.empty(n), np.empty(n, dtype=bool), np.empty(n, dtype=int)
+    kernel = _kernel("_implied_vol_kernel", n)
+    kernel(price, S, K, T, r, q, is_call, tol, max_iter, sigma_min, sigma_max, iv, converged, iterations)
+    return iv.reshape(shape), converged.reshape(shape), iterations.reshape(shape)
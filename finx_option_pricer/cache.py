@@ -0,0 +1,163 @@
+"""Opt-in memoization of pricing results
+
+Dash callbacks and batch jobs tend to reprice the same contracts and grids over and over. When enabled, the
+module level cache is consulted by Option (value, greeks, iv) and OptionsPlot.value_grid. It is disabled by
+default so results are always freshly computed unless a caller asks otherwise.
+
+    from finx_option_pricer.cache import enable_cache
+
+    cache = enable_cache(maxsize=50_000, ttl=300)
+    ...
+    cache.stats()  # CacheStats(hits=..., misses=..., evictions=..., expirations=..., size=..., maxsize=50000)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional
+
+import numpy as np
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int  # entries dropped to stay within maxsize
+    expirations: int  # entries dropped because they outlived ttl
+    size: int
+    maxsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class PricingCache:
+    """Thread-safe LRU cache with an optional time to live
+
+    Keys are quantized (floats rounded to `decimals` places) so contracts that differ only by float noise, e.g.
+    T = 15 / 252 - 10 / 252 vs 5 / 252, share an entry.
+
+    Args:
+        maxsize (int, optional): maximum entries kept, least recently used are evicted first. Defaults to 10_000.
+        ttl (float, optional): seconds an entry stays valid, None to keep entries until evicted. Defaults to None.
+        decimals (int, optional): decimal places floats in keys are rounded to. Defaults to 8.
+        clock (Callable, optional): time source for ttl. Defaults to time.monotonic.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl: Optional[float] = None,
+        decimals: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be at least 1, maxsize={maxsize}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.decimals = decimals
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, *parts) -> tuple:
+        """Hashable key with floats (including inside nested tuples) rounded to self.decimals"""
+        return tuple(self._quantize(p) for p in parts)
+
+    def _quantize(self, x):
+        if isinstance(x, (float, np.floating)):
+            return round(float(x), self.decimals)
+        if isinstance(x, tuple):
+            return tuple(self._quantize(p) for p in x)
+        return x
+
+    def get(self, key: Hashable, default=None):
+        """Cached value for key, or default when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > self._clock():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return default
+
+    def put(self, key: Hashable, value) -> None:
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable):
+        """Cached value for key, calling compute() and storing its result on a miss
+
+        compute runs outside the lock, so concurrent misses on the same key may both compute; the last result
+        is kept.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Drop every entry and reset the stats"""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = self._expirations = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+            )
+
+
+_cache: Optional[PricingCache] = None
+
+
+def enable_cache(maxsize: int = 10_000, ttl: Optional[float] = None, decimals: int = 8) -> PricingCache:
+    """Turn on the module level cache used by Option and OptionsPlot, replacing any existing one"""
+    global _cache
+    _cache = PricingCache(maxsize=maxsize, ttl=ttl, decimals=decimals)
+    return _cache
+
+
+def disable_cache() -> None:
+    global _cache
+    _cache = None
+
+
+def get_cache() -> Optional[PricingCache]:
+    """The enabled cache, or None"""
+    return _cache
+
+
+def memoize(namespace: str, parts: tuple, compute: Callable):
+    """compute(), served from the module level cache under (namespace, *parts) when the cache is enabled"""
+    cache = _cache
+    if cache is None:
+        return compute()
+    return cache.get_or_compute((namespace,) + cache.key(*parts), compute)
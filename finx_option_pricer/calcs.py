@@ -1,38 +1,124 @@
+from typing import TYPE_CHECKING
+
 import numpy as np
-import pandas as pd
 
-from finx_option_pricer.option import CALL, PUT, Option
+import finx_option_pricer.bsm as bsm
+from finx_option_pricer import profiling
+from finx_option_pricer.option import CALL, PUT
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _straddle_ivs(S, K, T, r, call_price, put_price, adjustment):
+    """Call and put IVs after moving `adjustment` of premium from the call to the put (one batched solve)"""
+    adjustment = np.asarray(adjustment, dtype=float)
+    prices = np.stack([call_price - adjustment, put_price + adjustment])
+    option_type = np.array([CALL, PUT]).reshape((2,) + (1,) * adjustment.ndim)
+    res = bsm.implied_vol(prices, S, K, T, r, option_type)
+    return res.iv[0], res.iv[1]
 
 
 def calc_straddle_iv(
-    S: float = None, K: float = None, call_price: float = None, put_price: float = None, time_days: int = None
+    S: float = None,
+    K: float = None,
+    call_price: float = None,
+    put_price: float = None,
+    time_days: int = None,
+    r: float = 0.0,
 ):
     """Determine adjustment and Call/Put IV
 
+    The adjustment is the amount of premium moved from the call to the put so both legs imply the same vol. It
+    is found by a bracketed root find, so it is not limited to whole ticks.
+
     Inputs:
         S: Spot price
         K: Strike price
         call_price: executed call price
         put_price: executed put price
         time_days: DTE in (int) days
+        r: risk free rate. Defaults to 0.0
 
     Returns:
         Tuple: (price_adjustment, call_iv, put_iv)
+
+    Raises:
+        ValueError: if the call and put IVs don't cross for any feasible adjustment
+    """
+    T = time_days / 252.0
+    discounted_K = K * np.exp(-r * T)
+
+    # adjustments that keep both legs within their no-arbitrage bounds
+    lower = max(call_price - S, max(discounted_K - S, 0.0) - put_price)
+    upper = min(call_price - max(S - discounted_K, 0.0), discounted_K - put_price)
+    if not lower < upper:
+        raise ValueError(f"No feasible adjustment for call_price={call_price}, put_price={put_price}, S={S}, K={K}")
+
+    # coarse batched scan to bracket the crossing, then refine
+    with profiling.span("calcs.straddle_iv.scan"):
+        adjustments = np.linspace(lower, upper, 17)[1:-1]
+        civ, piv = _straddle_ivs(S, K, T, r, call_price, put_price, adjustments)
+    iv_diff = civ - piv
+    finite = np.isfinite(iv_diff)
+    adjustments, iv_diff = adjustments[finite], iv_diff[finite]
+    crossings = np.flatnonzero(np.sign(iv_diff[:-1]) != np.sign(iv_diff[1:]))
+    if crossings.size == 0:
+        raise ValueError(f"Call and put IVs do not cross for S={S}, K={K}, call={call_price}, put={put_price}")
+
+    def iv_diff_at(adjustment):
+        fciv, fpiv = _straddle_ivs(S, K, T, r, call_price, put_price, adjustment)
+        return fciv - fpiv
+
+    from scipy.optimize import brentq
+
+    i = crossings[0]
+    with profiling.span("calcs.straddle_iv.refine"):
+        pa = brentq(iv_diff_at, adjustments[i], adjustments[i + 1], xtol=1e-10)
+        fciv, fpiv = _straddle_ivs(S, K, T, r, call_price, put_price, pa)
+    return (pa, float(fciv), float(fpiv))
+
+
+def calc_straddle_iv_chain(S, K, call_price, put_price, time_days, r: float = 0.0) -> "pd.DataFrame":
+    """Vectorized calc_straddle_iv for every strike of a chain at once
+
+    Under put-call parity the call and put imply the same vol exactly when C - P = S - K * exp(-rT), so the
+    adjustment is solved directly from parity rather than searched for.
+
+    Inputs:
+        S: Spot price
+        K: Strike prices (array)
+        call_price: executed call prices (array)
+        put_price: executed put prices (array)
+        time_days: DTE in (int) days, scalar or per strike
+        r: risk free rate. Defaults to 0.0
+
+    Returns:
+        pd.DataFrame: columns [strike, adjustment, implied_forward, call_iv, put_iv], one row per strike
+
+    Raises:
+        ValueError: listing the strikes for which the call and put IVs don't cross
     """
-    fd = dict(T=time_days / 252.0, r=0.0, S=S, K=K, sigma=None)
-    fc = {**fd, **dict(option_type=CALL)}
-    fp = {**fd, **dict(option_type=PUT)}
-    fco = Option(**fc)
-    fpo = Option(**fp)
-    results = []
-    for i in range(0, 60):
-        civ = fco.iv(call_price - i)
-        piv = fpo.iv(put_price + i)
-        results.append((i, civ, piv))
-
-    df = pd.DataFrame(results, columns=["diff", "iv_call", "iv_put"]).set_index("diff")
-    df["iv_diff"] = df["iv_call"] - df["iv_put"]
-    pa = df[np.sign(df["iv_diff"]).diff().fillna(0).ne(0)].copy().index[0]
-    fciv = fco.iv(call_price - pa)
-    fpiv = fpo.iv(put_price + pa)
-    return (pa, fciv, fpiv)
+    S, K, call_price, put_price, time_days = np.broadcast_arrays(
+        *[np.asarray(x, dtype=float) for x in (S, K, call_price, put_price, time_days)]
+    )
+    T = time_days / 252.0
+    discounted_K = K * np.exp(-r * T)
+    adjustment = ((call_price - put_price) - (S - discounted_K)) / 2.0
+
+    civ, piv = _straddle_ivs(S, K, T, r, call_price, put_price, adjustment)
+    no_crossing = ~(np.isfinite(civ) & np.isfinite(piv))
+    if no_crossing.any():
+        raise ValueError(f"Call and put IVs do not cross for strikes {K[no_crossing].tolist()}")
+
+    import pandas as pd
+
+    return pd.DataFrame(
+        dict(
+            strike=K,
+            adjustment=adjustment,
+            implied_forward=K + (call_price - put_price) * np.exp(r * T),
+            call_iv=civ,
+            put_iv=piv,
+        )
+    )
@@ -0,0 +1,149 @@
+"""Client for the local pricing service, see finx_option_pricer.service
+
+Standard library only, so tools can talk to a running service without importing the pricing stack. Contract
+fields are scalars or lists (NumPy arrays are converted), broadcast against each other by the service.
+
+    from finx_option_pricer.client import PricingClient
+
+    client = PricingClient()  # or PricingClient(port=...), PricingClient(path="/tmp/finx.sock")
+    client.price(S=100.0, K=[95.0, 105.0], T=30 / 252, r=0.01, sigma=0.25, option_type=["p", "c"])
+    client.greeks(S=100.0, K=100.0, T=0.1, r=0.01, sigma=0.25)["delta"]
+    client.implied_vol(price=2.5, S=100.0, K=100.0, T=0.1, r=0.01)["iv"]
+    client.grid(positions=[dict(S=100, K=105, T=0.1, r=0.01, sigma=0.25, quantity=-1)], spot_range=[90, 110], days=10)
+"""
+
+import http.client
+import json
+import socket
+import time
+from typing import Dict, List, Optional
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8711
+
+
+class ServiceError(Exception):
+    """An error response from the service, status is its HTTP status (503 when it is overloaded)"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def _jsonable(x):
+    return x.tolist() if hasattr(x, "tolist") else x
+
+
+class PricingClient:
+    """Keeps one connection to the service open and reuses it across calls (not thread-safe, use one per thread)
+
+    Args:
+        host (str, optional): Defaults to DEFAULT_HOST.
+        port (int, optional): Defaults to DEFAULT_PORT.
+        path (str, optional): Unix socket path, used in place of host and port. Defaults to None.
+        timeout (float, optional): seconds. Defaults to 10.0.
+        retries (int, optional): times a 503 (overloaded) response is retried, after the Retry-After it carries.
+            Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        path: Optional[str] = None,
+        timeout: float = 10.0,
+        retries: int = 0,
+    ):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.timeout = timeout
+        self.retries = retries
+        self._connection: Optional[http.client.HTTPConnection] = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._connection is None:
+            if self.path is not None:
+                self._connection = _UnixConnection(self.path, self.timeout)
+            else:
+                self._connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __enter__(self) -> "PricingClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def request(self, method: str, endpoint: str, payload: Optional[Dict] = None) -> Dict:
+        """Send one request, returning the decoded JSON response. Raises ServiceError on an error status."""
+        body = None if payload is None else json.dumps({k: _jsonable(v) for k, v in payload.items()})
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(self.retries + 1):
+            response, data = self._send(method, endpoint, body, headers)
+            if response.status == 503 and attempt < self.retries:
+                time.sleep(float(response.getheader("Retry-After", "0.1")))
+                continue
+            if response.status != 200:
+                raise ServiceError(response.status, data.get("error", response.reason))
+            return data
+
+    def _send(self, method: str, endpoint: str, body: Optional[str], headers: Dict):
+        for retry in (False, True):
+            try:
+                connection = self._connect()
+                connection.request(method, endpoint, body=body, headers=headers)
+                response = connection.getresponse()
+                return response, json.loads(response.read() or b"{}")
+            except (ConnectionError, http.client.HTTPException):
+                # the service may have closed a kept-alive connection, reconnect once
+                self.close()
+                if retry:
+                    raise
+
+    # -------------------------------------------------------------------------
+    # endpoints
+
+    def price(self, **contracts) -> List[float]:
+        """Value per contract, contracts are S, K, T, r, sigma and optionally option_type, q and algo"""
+        return self.request("POST", "/price", contracts)["value"]
+
+    def greeks(self, **contracts) -> Dict[str, List[float]]:
+        """{field: per contract values} for every bsm.Greeks field"""
+        return self.request("POST", "/greeks", contracts)
+
+    def implied_vol(self, **quotes) -> Dict[str, List]:
+        """{"iv", "converged", "iterations"} per quote, quotes are price, S, K, T, r and optionally option_type and q"""
+        return self.request("POST", "/iv", quotes)
+
+    def grid(self, positions: List[Dict], spot_range: List, days: int, **kwargs) -> Dict[str, List]:
+        """OptionsPlot.value_grid as {"spots", "labels", "values"}
+
+        positions are dicts of option fields (S, K, T, r, sigma, option_type, algo, q) plus quantity and
+        optionally end_sigma. kwargs are strike_interval and the value_grid arguments (step, show_final,
+        market_days_year, value_relative).
+        """
+        return self.request("POST", "/grid", dict(positions=positions, spot_range=spot_range, days=days, **kwargs))
+
+    def stats(self) -> Dict:
+        return self.request("GET", "/stats")
+
+    def health(self) -> Dict:
+        return self.request("GET", "/health")
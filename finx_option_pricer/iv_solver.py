@@ -0,0 +1,93 @@
+from typing import Callable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+SIGMA_MIN = 1e-4
+SIGMA_MAX = 10.0
+
+
+class IVResult(NamedTuple):
+    iv: np.ndarray  # implied volatility, nan where the quote could not be solved
+    converged: np.ndarray  # bool, True where the solver met the tolerance
+    iterations: np.ndarray  # int, solver iterations spent on each element
+
+
+def solve_implied_vol(
+    price: np.ndarray,
+    value_vega: Callable[[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]],
+    sigma0: np.ndarray,
+    valid: np.ndarray,
+    tol: float = 1e-10,
+    max_iter: int = 50,
+    sigma_min: float = SIGMA_MIN,
+    sigma_max: float = SIGMA_MAX,
+) -> IVResult:
+    """Vectorized safeguarded Newton/Halley root find of model_value(sigma) - price = 0
+
+    Every element is solved at once. Each iteration only evaluates the elements that are still active, so
+    quotes that converge early (or were never valid) don't slow down the rest. Model value is increasing in
+    sigma, so each evaluation tightens a [lo, hi] bracket; Newton/Halley steps that leave the bracket fall
+    back to bisection.
+
+    Args:
+        price (np.ndarray): 1-d array of target option prices
+        value_vega (Callable): value_vega(sigma, idx) -> (value, vega, volga) for the elements price[idx].
+            volga may be None, in which case plain Newton steps are taken.
+        sigma0 (np.ndarray): 1-d array of starting vols
+        valid (np.ndarray): 1-d bool array, False for quotes that are known to have no solution
+        tol (float, optional): absolute price tolerance. Defaults to 1e-10.
+        max_iter (int, optional): maximum iterations per element. Defaults to 50.
+        sigma_min (float, optional): lower vol bound. Defaults to SIGMA_MIN.
+        sigma_max (float, optional): upper vol bound. Defaults to SIGMA_MAX.
+
+    Returns:
+        IVResult: (iv, converged, iterations) 1-d arrays
+    """
+    n = price.size
+    iv = np.full(n, np.nan)
+    converged = np.zeros(n, dtype=bool)
+    iterations = np.zeros(n, dtype=int)
+
+    idx = np.flatnonzero(valid)
+    sigma = np.clip(sigma0[idx], sigma_min, sigma_max)
+    lo = np.full(idx.size, sigma_min)
+    hi = np.full(idx.size, sigma_max)
+
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        iterations[idx] += 1
+
+        value, vega, volga = value_vega(sigma, idx)
+        diff = value - price[idx]
+
+        done = np.abs(diff) < tol
+        iv[idx[done]] = sigma[done]
+        converged[idx[done]] = True
+
+        # tighten the bracket around the root
+        over = diff > 0
+        hi = np.where(over, sigma, hi)
+        lo = np.where(over, lo, sigma)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = diff / vega
+            if volga is not None:
+                # Halley correction, dropped where it would flip the direction of the Newton step
+                denom = 1.0 - 0.5 * step * volga / vega
+                step = np.where(denom > 0.5, step / denom, step)
+            new_sigma = sigma - step
+        bisect = ~np.isfinite(new_sigma) | (new_sigma <= lo) | (new_sigma >= hi)
+        new_sigma = np.where(bisect, 0.5 * (lo + hi), new_sigma)
+
+        # the bracket has collapsed to float precision. Inside the vol bounds no closer sigma exists; against
+        # a bound the root lies outside [sigma_min, sigma_max] and the quote is left unsolved.
+        collapsed = ~done & (hi - lo <= 4 * np.finfo(float).eps * hi)
+        interior = collapsed & (lo > sigma_min) & (hi < sigma_max)
+        iv[idx[interior]] = sigma[interior]
+        converged[idx[interior]] = True
+
+        keep = ~(done | collapsed)
+        idx, sigma, lo, hi = idx[keep], new_sigma[keep], lo[keep], hi[keep]
+
+    return IVResult(iv=iv, converged=converged, iterations=iterations)
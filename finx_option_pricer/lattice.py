@@ -0,0 +1,443 @@
+"""American (and European) option pricing on recombining binomial lattices
+
+Cox-Ross-Rubinstein (CRR) and Leisen-Reimer (LR) trees are supported. Every kernel is vectorized across
+contracts: all contracts are rolled back through their trees together as one (contracts x nodes) block, so a
+full chain costs a single backward induction rather than one per contract. CRR factors do not depend on S or
+K, so CRR contracts sharing T, r, q, sigma and type are priced from one lattice in units of the strike and
+interpolated at each contract's moneyness, which keeps the block one row wide per expiry rather than one row
+per strike. LR trees are centered on each contract's S / K and still get a row each.
+"""
+
+from functools import lru_cache, partial
+
+import numpy as np
+
+import finx_option_pricer.bsm as bsm
+from finx_option_pricer import profiling
+from finx_option_pricer.iv_solver import IVResult, solve_implied_vol
+from finx_option_pricer.models import PricingModel, register_model
+
+CRR = "crr"
+LEISEN_REIMER = "lr"
+
+# contracts rolled back together per block, bounds memory at roughly CHUNK_SIZE * (steps + 1) * 8 bytes per array
+CHUNK_SIZE = 4096
+
+
+def _peizer_pratt(z, n):
+    """Peizer-Pratt method 2 inversion, maps a normal deviate to a binomial probability"""
+    x = z / (n + 1.0 / 3.0 + 0.1 / (n + 1.0))
+    return 0.5 + np.sign(z) * np.sqrt(0.25 - 0.25 * np.exp(-(x ** 2) * (n + 1.0 / 6.0)))
+
+
+def _tree_params(S, K, T, r, q, sigma, steps, method):
+    """Up/down factors and risk neutral up probability per contract, the underlying grows at r - q"""
+    dt = T / steps
+    growth = np.exp((r - q) * dt)
+    if method == CRR:
+        u = np.exp(sigma * np.sqrt(dt))
+        d = 1.0 / u
+        p = (growth - d) / (u - d)
+        # once |r - q| * sqrt(dt) outgrows sigma the CRR up probability leaves [0, 1], use LR trees for those
+        outside = (p < 0.0) | (p > 1.0)
+        if outside.any():
+            u_lr, d_lr, p_lr, _ = _tree_params(S, K, T, r, q, sigma, steps, LEISEN_REIMER)
+            u, d, p = [np.where(outside, lr, crr) for lr, crr in ((u_lr, u), (d_lr, d), (p_lr, p))]
+    elif method == LEISEN_REIMER:
+        sig_sqrt_T = sigma * np.sqrt(T)
+        d1 = (np.log(S / K) + (r - q + sigma ** 2 / 2) * T) / sig_sqrt_T
+        p = _peizer_pratt(d1 - sig_sqrt_T, steps)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            u = growth * _peizer_pratt(d1, steps) / p
+            d = (growth - p * u) / (1.0 - p)
+        # as sigma -> 0 the probability saturates at 0 or 1 and the tree collapses onto the forward
+        saturated = (p <= 0.0) | (p >= 1.0)
+        u = np.where(saturated, growth, u)
+        d = np.where(saturated, growth, d)
+    else:
+        raise ValueError(f"Unknown lattice method={method}. Use '{CRR}' or '{LEISEN_REIMER}'")
+    return u, d, p, np.exp(-r * dt)
+
+
+def _induct(S, K, T, r, q, sigma, is_call, steps, method, american, boundary=False):
+    """Backward induction for equal length 1-d arrays of live (T > 0) contracts
+
+    Returns:
+        Tuple: (value, nodes1, values1, nodes2, values2, exercise_boundary) where nodes/values1 and 2 are the
+            (n, 2) and (n, 3) spot prices and option values one and two steps into the tree, and
+            exercise_boundary is (n, steps) critical spot prices (nan where no node is exercised), or None.
+    """
+    u, d, p, disc = [x[:, None] for x in _tree_params(S, K, T, r, q, sigma, steps, method)]
+    pu, pd = disc * p, disc * (1.0 - p)
+    sign = np.where(is_call, 1.0, -1.0)[:, None]
+    K = K[:, None]
+
+    j = np.arange(steps + 1)
+    nodes = S[:, None] * u ** j * d ** (steps - j)
+    values = np.maximum(sign * (nodes - K), 0.0)
+    kept = {steps: (nodes, values)}
+    critical = np.full((S.size, steps), np.nan) if boundary else None
+
+    for i in range(steps - 1, -1, -1):
+        values = pu * values[:, 1:] + pd * values[:, :-1]
+        nodes = nodes[:, :-1] / d
+        if american:
+            exercise = sign * (nodes - K)
+            if boundary:
+                exercised = exercise > values
+                # puts are exercised below the boundary, calls above it
+                lowest = np.where(exercised, nodes, np.inf).min(axis=1)
+                highest = np.where(exercised, nodes, -np.inf).max(axis=1)
+                edge = np.where(sign[:, 0] > 0, lowest, highest)
+                critical[:, i] = np.where(np.isfinite(edge), edge, np.nan)
+            np.maximum(values, exercise, out=values)
+        if i <= 2:
+            kept[i] = (nodes, values)
+
+    return values[:, 0], kept[1][0], kept[1][1], kept[2][0], kept[2][1], critical
+
+
+# nodes kept past a row's outermost contracts, so the cubic stencils at steps 0, 1 and 2 stay on the lattice
+_PAD = 3
+
+
+def _crr_shared(S, K, T, r, q, sigma, steps):
+    """True where a contract can be priced on a shared CRR lattice in units of its strike"""
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        u = np.exp(sigma * np.sqrt(T / steps))
+        p = (np.exp((r - q) * T / steps) - 1.0 / u) / (u - 1.0 / u)
+        x = S / K
+    return (sigma > 0) & (p >= 0.0) & (p <= 1.0) & (x > 0) & np.isfinite(x)
+
+
+def _strike_lattice(S, K, T, r, q, sigma, is_call, steps, american, greeks=False):
+    """CRR value (and delta, gamma) of live contracts from lattices in units of the strike
+
+    Prices are homogeneous in (S, K) and CRR up/down factors depend on neither, so every contract sharing T, r,
+    q, sigma and type sits on one lattice of moneyness S / K rooted at 1, the lattice exercise_boundary reads.
+    Its step 0 nodes hold the CRR prices at those moneyness levels. Each contract is interpolated (cubic in log
+    moneyness) at its own S / K and scaled by K, so a chain costs one induction rather than one per strike.
+    Contracts are split into rows spanning at most `steps` nodes of moneyness and all rows roll back together.
+
+    Returns:
+        Tuple: (value, delta, gamma), delta and gamma are None unless greeks
+    """
+    n = S.size
+    step = sigma * np.sqrt(T / steps)  # log spacing of a tree's up and down moves
+    k = np.log(S / K) / (2.0 * step)  # moneyness in step 0 node units, node 0 at the money
+
+    _, group = np.unique(np.column_stack([T, r, q, sigma, is_call]), axis=0, return_inverse=True)
+    group = group.ravel()
+    k_min = np.full(group.max() + 1, np.inf)
+    np.minimum.at(k_min, group, k)
+    window = np.floor((k - k_min[group]) / steps)
+    _, row = np.unique(np.column_stack([group, window]), axis=0, return_inverse=True)
+    row = row.ravel()
+    n_rows = row.max() + 1
+
+    first = np.full(n_rows, n)
+    np.minimum.at(first, row, np.arange(n))
+    lo = np.full(n_rows, np.inf)
+    hi = np.full(n_rows, -np.inf)
+    np.minimum.at(lo, row, k)
+    np.maximum.at(hi, row, k)
+    k_lo = np.floor(lo) - _PAD
+    width = int((np.ceil(hi) + _PAD - k_lo).max()) + 1
+
+    layers = 3 if greeks else 1
+    kept = [np.empty((n_rows, width + i)) for i in range(layers)]
+    block = max(1, CHUNK_SIZE * (steps + 1) // (width + steps))
+    for start in range(0, n_rows, block):
+        rows = slice(start, start + block)
+        idx = first[rows]
+        sign = np.where(is_call[idx], 1.0, -1.0)
+        rolled = _roll_rows(T[idx], r[idx], q[idx], sigma[idx], sign, k_lo[rows], width, steps, american, layers)
+        for out, values in zip(kept, rolled):
+            out[rows] = values
+
+    s = k - k_lo[row]
+    value = K * _cubic(kept[0], row, s)
+    if not greeks:
+        return value, None, None
+    # as in _induct, delta and gamma come from the nodes one and two steps into each contract's own tree
+    x, u = S / K, np.exp(step)
+    delta = (_cubic(kept[1], row, s + 1) - _cubic(kept[1], row, s)) / (x * (u - 1.0 / u))
+    v0, v1, v2 = [_cubic(kept[2], row, s + i) for i in range(3)]
+    x0, x2 = x / u ** 2, x * u ** 2
+    gamma = ((v2 - v1) / (x2 - x) - (v1 - v0) / (x - x0)) / (0.5 * (x2 - x0)) / K
+    return value, delta, gamma
+
+
+def _roll_rows(T, r, q, sigma, sign, k_lo, width, steps, american, layers):
+    """Backward induction of strike unit CRR lattices, one per row, whose step 0 nodes are at moneyness
+    exp(2 * (k_lo + j) * sigma * sqrt(dt)) for j < width
+
+    Returns:
+        List: node values at steps 0 .. layers - 1, shaped (rows, width + step)
+    """
+    one = np.ones(T.size)
+    u, d, p, disc = [x[:, None] for x in _tree_params(one, one, T, r, q, sigma, steps, CRR)]
+    pu, pd = disc * p, disc * (1.0 - p)
+    sign = sign[:, None]
+
+    j = np.arange(width + steps)
+    nodes = np.exp((2.0 * (k_lo[:, None] + j) - steps) * np.log(u))
+    values = np.maximum(sign * (nodes - 1.0), 0.0)
+    kept = {steps: values}
+    for i in range(steps - 1, -1, -1):
+        values = pu * values[:, 1:] + pd * values[:, :-1]
+        nodes = nodes[:, :-1] / d
+        if american:
+            np.maximum(values, sign * (nodes - 1.0), out=values)
+        if i < layers:
+            kept[i] = values
+    return [kept[i] for i in range(layers)]
+
+
+def _cubic(values, row, s):
+    """Cubic Lagrange interpolation of values[row] at fractional node positions s"""
+    i = np.floor(s).astype(np.intp)
+    t = s - i
+    y0, y1, y2, y3 = [values[row, i + offset] for offset in (-1, 0, 1, 2)]
+    weights = -t * (t - 1) * (t - 2), 3 * (t + 1) * (t - 1) * (t - 2), -3 * (t + 1) * t * (t - 2), (t + 1) * t * (t - 1)
+    return sum(w * y for w, y in zip(weights, (y0, y1, y2, y3))) / 6
+
+
+def _broadcast(S, K, T, r, q, sigma, option_type):
+    """Broadcast contract terms against each other, returning (shape, flat float arrays..., flat is_call)"""
+    arrays = np.broadcast_arrays(S, K, T, r, q, sigma, bsm.call_mask(option_type))
+    flat = [np.asarray(a, dtype=float).ravel() for a in arrays[:6]]
+    return (arrays[0].shape, *flat, arrays[6].ravel())
+
+
+def _chunked_values(S, K, T, r, q, sigma, is_call, steps, method, american):
+    """Option values for flat arrays of contracts; expired contracts (T <= 0) are worth intrinsic value"""
+    sign = np.where(is_call, 1.0, -1.0)
+    value = np.maximum(sign * (S - K), 0.0)
+    live = np.flatnonzero(T > 0)
+    if method == CRR:
+        shared = _crr_shared(*[x[live] for x in (S, K, T, r, q, sigma)], steps)
+        idx = live[shared]
+        if idx.size:
+            args = [x[idx] for x in (S, K, T, r, q, sigma, is_call)]
+            value[idx] = _strike_lattice(*args, steps, american)[0]
+        live = live[~shared]
+    for start in range(0, live.size, CHUNK_SIZE):
+        idx = live[start:][:CHUNK_SIZE]
+        args = [x[idx] for x in (S, K, T, r, q, sigma, is_call)]
+        value[idx] = _induct(*args, steps, method, american)[0]
+    return value
+
+
+def lattice_value(
+    S, K, T, r, sigma, option_type="c", q=0.0, steps: int = 200, method: str = CRR, american: bool = True
+):
+    """Option value on a binomial lattice
+
+    Args:
+        S, K, T, r, sigma: contract terms, scalars or broadcastable arrays
+        option_type: "c"/"p" or array of them (or booleans, True => call). Defaults to "c".
+        q: continuous dividend yield. Defaults to 0.0
+        steps (int, optional): time steps in the tree (LR trees round up to an odd number). Defaults to 200.
+        method (str, optional): "crr" or "lr". Defaults to "crr".
+        american (bool, optional): allow early exercise. Defaults to True.
+
+    Returns:
+        np.ndarray: option values in the broadcast shape of the inputs
+    """
+    shape, S, K, T, r, q, sigma, is_call = _broadcast(S, K, T, r, q, sigma, option_type)
+    steps = _steps(steps, method)
+    return _chunked_values(S, K, T, r, q, sigma, is_call, steps, method, american).reshape(shape)
+
+
+def lattice_greeks(
+    S, K, T, r, sigma, option_type="c", q=0.0, steps: int = 200, method: str = CRR, american: bool = True
+) -> bsm.Greeks:
+    """Value and greeks from the lattice
+
+    delta and gamma are read off the first two steps of the tree. vega, rho, theta and the second order greeks
+    come from central bumps of sigma, r and T; the base and all six bumped contracts are rolled back together
+    in a single induction.
+
+    Returns:
+        bsm.Greeks: theta and charm are per year, as in bsm.bs_greeks
+    """
+    shape, S, K, T, r, q, sigma, is_call = _broadcast(S, K, T, r, q, sigma, option_type)
+    steps = _steps(steps, method)
+    n = S.size
+    sign = np.where(is_call, 1.0, -1.0)
+    itm = sign * (S - K) > 0
+
+    # expired contracts keep intrinsic value, a 0/1 delta and no other sensitivity
+    out = {name: np.zeros(n) for name in bsm.Greeks._fields}
+    out["value"] = np.maximum(sign * (S - K), 0.0)
+    out["delta"] = np.where(itm, sign, 0.0)
+
+    live = np.flatnonzero(T > 0)
+    # each contract is rolled back 7 times (base and bumps), keep blocks the same size as for values
+    for start in range(0, live.size, CHUNK_SIZE // 8):
+        idx = live[start:][: CHUNK_SIZE // 8]
+        greeks = _live_greeks(*[x[idx] for x in (S, K, T, r, q, sigma, is_call)], steps, method, american)
+        for name, x in zip(bsm.Greeks._fields, greeks):
+            out[name][idx] = x
+
+    return bsm.Greeks(**{name: x.reshape(shape) for name, x in out.items()})
+
+
+def _live_greeks(S, K, T, r, q, sigma, is_call, steps, method, american):
+    h_sigma = 1e-3
+    h_r = 1e-4
+    h_T = np.minimum(1.0 / 252.0, T / 2.0)
+    bumps = [
+        (0.0, 0.0, 0.0),
+        (h_sigma, 0.0, 0.0),
+        (-h_sigma, 0.0, 0.0),
+        (0.0, h_r, 0.0),
+        (0.0, -h_r, 0.0),
+        (0.0, 0.0, h_T),
+        (0.0, 0.0, -h_T),
+    ]
+    S, K, q, is_call = [np.tile(x, len(bumps)) for x in (S, K, q, is_call)]
+    sigmas = np.concatenate([sigma + b[0] for b in bumps])
+    rates = np.concatenate([r + b[1] for b in bumps])
+    times = np.concatenate([T + b[2] for b in bumps])
+    value, delta, gamma = _value_delta_gamma(S, K, times, rates, q, sigmas, is_call, steps, method, american)
+
+    value, vs_up, vs_down, vr_up, vr_down, vt_up, vt_down = np.split(value, len(bumps))
+    delta, ds_up, ds_down, _, _, dt_up, dt_down = np.split(delta, len(bumps))
+    gamma = np.split(gamma, len(bumps))[0]
+
+    return bsm.Greeks(
+        value=value,
+        delta=delta,
+        gamma=gamma,
+        vega=(vs_up - vs_down) / (2 * h_sigma),
+        theta=-(vt_up - vt_down) / (2 * h_T),
+        rho=(vr_up - vr_down) / (2 * h_r),
+        vanna=(ds_up - ds_down) / (2 * h_sigma),
+        volga=(vs_up - 2 * value + vs_down) / h_sigma ** 2,
+        charm=-(dt_up - dt_down) / (2 * h_T),
+    )
+
+
+def _value_delta_gamma(S, K, T, r, q, sigma, is_call, steps, method, american):
+    """Value, delta and gamma of live contracts, delta and gamma read off the first two steps of the tree"""
+    shared = _crr_shared(S, K, T, r, q, sigma, steps) if method == CRR else np.zeros(S.size, dtype=bool)
+    value, delta, gamma = np.empty(S.size), np.empty(S.size), np.empty(S.size)
+    idx = np.flatnonzero(shared)
+    if idx.size:
+        args = [x[idx] for x in (S, K, T, r, q, sigma, is_call)]
+        value[idx], delta[idx], gamma[idx] = _strike_lattice(*args, steps, american, greeks=True)
+    idx = np.flatnonzero(~shared)
+    if idx.size:
+        args = [x[idx] for x in (S, K, T, r, q, sigma, is_call)]
+        value[idx], n1, v1, n2, v2, _ = _induct(*args, steps, method, american)
+        delta[idx] = (v1[:, 1] - v1[:, 0]) / (n1[:, 1] - n1[:, 0])
+        gamma[idx] = ((v2[:, 2] - v2[:, 1]) / (n2[:, 2] - n2[:, 1]) - (v2[:, 1] - v2[:, 0]) / (n2[:, 1] - n2[:, 0])) / (
+            0.5 * (n2[:, 2] - n2[:, 0])
+        )
+    return value, delta, gamma
+
+
+def lattice_implied_vol(
+    opt_value,
+    S,
+    K,
+    T,
+    r,
+    option_type="c",
+    q=0.0,
+    steps: int = 200,
+    method: str = CRR,
+    american: bool = True,
+    tol=1e-8,
+) -> IVResult:
+    """Implied volatility under the lattice model, for whole arrays of quotes at once
+
+    Uses the same safeguarded Newton solver as bsm.implied_vol, with vega from a forward bump that is rolled
+    back in the same induction as the value. Quotes at or below intrinsic value or above S (calls) / K (puts)
+    are flagged as not converged.
+    """
+    price = np.asarray(opt_value, dtype=float)
+    shape, S, K, T, r, q, sigma, is_call = _broadcast(S, K, T, r, q, np.zeros_like(price), option_type)
+    price = np.broadcast_to(price, shape).ravel()
+    steps = _steps(steps, method)
+    h = 1e-4
+
+    upper = np.where(is_call, S if american else S * np.exp(-q * T), K if american else K * np.exp(-r * T))
+    lower = np.maximum(np.where(is_call, S - K, K - S), 0.0)
+    valid = (T > 0) & (price > lower) & (price < upper)
+
+    # the European implied vol of the same price is a close starting point
+    sigma0 = bsm.implied_vol(np.minimum(price, upper), S, K, T, r, is_call, q).iv
+    sigma0 = np.where(np.isfinite(sigma0), sigma0, 0.3)
+
+    def value_vega(sigma, idx):
+        n = idx.size
+        args = [np.tile(x[idx], 2) for x in (S, K, T, r, q)]
+        values = _chunked_values(
+            *args, np.concatenate([sigma, sigma + h]), np.tile(is_call[idx], 2), steps, method, american
+        )
+        return values[:n], (values[n:] - values[:n]) / h, None
+
+    res = solve_implied_vol(price, value_vega, sigma0, valid, tol=tol)
+    profiling.record_iterations("lattice.implied_vol", res.iterations)
+    return IVResult(*[x.reshape(shape) for x in res])
+
+
+def _steps(steps: int, method: str) -> int:
+    """LR trees need an odd number of steps"""
+    if steps < 2:
+        raise ValueError(f"Lattice needs at least 2 steps, steps={steps}")
+    if method == LEISEN_REIMER and steps % 2 == 0:
+        return steps + 1
+    return steps
+
+
+@lru_cache(maxsize=256)
+def _normalized_boundary(
+    T: float, r: float, q: float, sigma: float, is_call: bool, steps: int, method: str
+) -> np.ndarray:
+    one = np.ones(1)
+    terms = (one, one, one * T, one * r, one * q, one * sigma, np.array([is_call]))
+    critical = _induct(*terms, steps, method, True, True)[-1]
+    critical = critical[0]
+    critical.setflags(write=False)
+    return critical
+
+
+def exercise_boundary(
+    K, T: float, r: float, sigma: float, option_type="p", steps: int = 200, method: str = CRR, q: float = 0.0
+):
+    """Early exercise boundary (critical spot price per time step) for strikes sharing T, r, q and sigma
+
+    Prices are homogeneous in (S, K), so the critical spot in units of the strike is read once from an
+    at-the-money (S = K) tree, cached, and scaled by each strike. For CRR that tree is the strike unit lattice
+    lattice_value and lattice_greeks price the chain on, so the scaled boundary is the one they exercise at.
+    LR trees are centered on each contract's own S / K, so for other strikes it is an approximation of where
+    their trees exercise rather than a per-strike boundary.
+
+    Returns:
+        Tuple: (times, boundary) where times are the (n_steps,) times from now in years and boundary is
+            (len(K), n_steps), nan at steps where no node is exercised
+    """
+    steps = _steps(steps, method)
+    is_call = bool(bsm.call_mask(option_type))
+    normalized = _normalized_boundary(float(T), float(r), float(q), float(sigma), is_call, steps, method)
+    times = np.arange(steps) * (T / steps)
+    return times, np.multiply.outer(np.atleast_1d(np.asarray(K, dtype=float)), normalized)
+
+
+def _lattice_model(name: str, method: str, steps: int) -> PricingModel:
+    return PricingModel(
+        name=name,
+        value=partial(lattice_value, steps=steps, method=method),
+        greeks=partial(lattice_greeks, steps=steps, method=method),
+        implied_vol=partial(lattice_implied_vol, steps=steps, method=method),
+    )
+
+
+CRR_AMERICAN = _lattice_model("crr", CRR, 200)
+LR_AMERICAN = _lattice_model("lr", LEISEN_REIMER, 101)
+register_model(CRR_AMERICAN)
+register_model(LR_AMERICAN)
@@ -0,0 +1,119 @@
+import importlib
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+import finx_option_pricer.bsm as bsm
+
+
+@dataclass(frozen=True)
+class PricingModel:
+    """Vectorized kernels for one pricing algorithm
+
+    Every kernel takes broadcastable arrays and an option_type that may mix calls and puts ("c"/"p" strings or
+    booleans, True => call), so a whole batch is priced with a single call. q is the continuous dividend yield
+    (or, for futures options, q = r).
+
+    value(S, K, T, r, sigma, option_type, q=0.0) -> np.ndarray
+    greeks(S, K, T, r, sigma, option_type, q=0.0) -> bsm.Greeks
+    implied_vol(opt_value, S, K, T, r, option_type, q=0.0) -> iv_solver.IVResult
+    """
+
+    name: str
+    value: Callable
+    greeks: Callable
+    implied_vol: Callable
+
+
+_MODELS: List[PricingModel] = []
+_CODES: Dict[str, int] = {}
+
+# models shipped with the package, registered when their module is first imported
+_BUILTIN_MODULES = {
+    "crr": "finx_option_pricer.lattice",
+    "lr": "finx_option_pricer.lattice",
+    "baw": "finx_option_pricer.american",
+    "bs2002": "finx_option_pricer.american",
+}
+
+
+def register_model(model: PricingModel, overwrite: bool = False) -> int:
+    """Add a model to the registry so Option(algo=model.name) dispatches to it
+
+    Returns:
+        int: the model's code, as stored in OptionBook.algo_code
+    """
+    if model.name in _CODES:
+        if not overwrite:
+            raise ValueError(f"Pricing model '{model.name}' is already registered")
+        _MODELS[_CODES[model.name]] = model
+    else:
+        _CODES[model.name] = len(_MODELS)
+        _MODELS.append(model)
+    return _CODES[model.name]
+
+
+def get_model(algo: str) -> PricingModel:
+    return _MODELS[model_code(algo)]
+
+
+def model_name(code: int) -> str:
+    return _MODELS[code].name
+
+
+def model_code(algo: str) -> int:
+    if algo not in _CODES and algo in _BUILTIN_MODULES:
+        importlib.import_module(_BUILTIN_MODULES[algo])
+    try:
+        return _CODES[algo]
+    except KeyError:
+        raise ValueError(f"Unknown pricing model algo={algo}. Registered models: {available_models()}") from None
+
+
+def available_models() -> List[str]:
+    return list(_CODES)
+
+
+def by_model(algo_code: np.ndarray) -> Iterator[Tuple[PricingModel, object]]:
+    """Group a batch by model, yielding (model, index) once per model in the batch
+
+    When the whole batch uses one model the index is slice(None), so callers can apply it without copying.
+    """
+    codes = np.unique(algo_code)
+    if codes.size == 0:
+        return
+    if codes.size == 1:
+        yield _MODELS[codes[0]], slice(None)
+        return
+    for code in codes:
+        yield _MODELS[code], algo_code == code
+
+
+def evaluate(algo_code: np.ndarray, kernel: str, *args):
+    """Run the named kernel ("value", "greeks" or "implied_vol") over a batch of 1-d arrays that may mix models
+
+    Each model's kernel is called once with its slice of the batch and the results are scattered back into
+    batch order.
+    """
+    results = [(idx, getattr(model, kernel)(*[a[idx] for a in args])) for model, idx in by_model(algo_code)]
+    if len(results) == 1:
+        return results[0][1]
+
+    # outputs keep the dtype of the first model's, e.g. IVResult's bool converged and int iterations
+    n = len(algo_code)
+    if results and isinstance(results[0][1], tuple):
+        out = type(results[0][1])(*[np.empty(n, dtype=np.asarray(x).dtype) for x in results[0][1]])
+        for idx, res in results:
+            for o, x in zip(out, res):
+                o[idx] = x
+        return out
+
+    out = np.empty(n, dtype=np.asarray(results[0][1]).dtype if results else float)
+    for idx, res in results:
+        out[idx] = res
+    return out
+
+
+BSM = PricingModel(name="bsm", value=bsm.bs_value, greeks=bsm.bs_greeks, implied_vol=bsm.implied_vol)
+register_model(BSM)
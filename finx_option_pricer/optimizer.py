@@ -0,0 +1,289 @@
+"""Structure optimizer, searches generator parameters (strikes, DTE pairs, leg ratios) for the best P&L profiles
+
+Every candidate is a set of generator arguments (gen_strangle, gen_calendar or any picklable function returning
+List[OptionPosition]). Candidates are valued in batches, the legs of a whole batch in one broadcasted pass over a
+grid of spot moves at the horizon (by default each candidate's first expiry), and scored on
+
+    expected_pnl      P&L weighted by the distribution of the spot move at the horizon (Lognormal or Empirical)
+    max_loss          worst loss over the spot grid, as a positive number, also the margin of the structure
+    return_on_margin  expected_pnl / max_loss
+
+Candidates over the max_loss cap are dropped and every batch is cut down to its Pareto frontier as it finishes,
+so only non-dominated candidates are kept while the search runs.
+
+    from finx_option_pricer.optimizer import Lognormal, optimize
+    from finx_option_pricer.option_structures import gen_strangle
+
+    result = optimize(
+        gen_strangle,
+        grid=dict(strike_price=range(100, 121), put_strike_price=range(80, 101), days=[20, 30, 45], put_ratio=[1, 2]),
+        base=dict(spot_price=100.0, vol_initial=0.25, vol_final=0.2),
+        distribution=Lognormal(sigma=0.2),
+        max_loss=25.0,
+    )
+    result.frontier           # parameters and objectives of the Pareto optimal candidates
+    result.best("return_on_margin")
+"""
+
+import itertools
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from finx_option_pricer import profiling
+from finx_option_pricer.bsm import N
+from finx_option_pricer.option_book import OptionBook
+from finx_option_pricer.stress import _leg_values
+from finx_option_pricer.sweep import _context
+from finx_option_pricer.vol_surface import VolSurface
+
+EXPECTED_PNL = "expected_pnl"
+MAX_LOSS = "max_loss"
+RETURN_ON_MARGIN = "return_on_margin"
+
+# +1 when more is better, -1 when less is
+OBJECTIVES = {EXPECTED_PNL: 1.0, MAX_LOSS: -1.0, RETURN_ON_MARGIN: 1.0}
+
+# spot moves the candidates are valued over, -30% to +30% in 0.5% steps
+SPOT_SHOCKS = np.linspace(-0.3, 0.3, 121)
+
+
+def _edges(spot_shocks: np.ndarray) -> np.ndarray:
+    """Midpoints between the spot moves, each move stands for the outcomes between its edges"""
+    return (spot_shocks[1:] + spot_shocks[:-1]) / 2
+
+
+@dataclass(frozen=True)
+class Lognormal:
+    """Lognormal spot at the horizon, log(S_h / S0) ~ N((drift - sigma^2 / 2) t, sigma^2 t)
+
+    sigma is the vol expected to be realized, not necessarily the implied vol the legs are priced at.
+    """
+
+    sigma: float
+    drift: float = 0.0
+
+    def weights(self, spot_shocks: np.ndarray, years: np.ndarray) -> np.ndarray:
+        """Probability of each spot move, per candidate horizon, shape (len(years), len(spot_shocks))"""
+        years = np.asarray(years, dtype=float)[:, None]
+        mean = (self.drift - self.sigma ** 2 / 2) * years
+        std = np.maximum(self.sigma * np.sqrt(years), 1e-12)
+        # the tails beyond the grid fall on its first and last moves
+        cdf = N((np.log1p(_edges(spot_shocks)) - mean) / std)
+        n = years.shape[0]
+        return np.diff(np.hstack([np.zeros((n, 1)), cdf, np.ones((n, 1))]), axis=1)
+
+
+@dataclass(frozen=True)
+class Empirical:
+    """Observed relative spot moves over the horizon (e.g. historical returns), equally likely
+
+    The sample is used as is for every candidate, so it should match the horizon searched.
+    """
+
+    returns: Sequence[float]
+
+    def weights(self, spot_shocks: np.ndarray, years: np.ndarray) -> np.ndarray:
+        """Share of the sample nearest each spot move, the same for every candidate"""
+        nearest = np.searchsorted(_edges(spot_shocks), np.asarray(self.returns, dtype=float))
+        counts = np.bincount(nearest, minlength=spot_shocks.size).astype(float)
+        return np.broadcast_to(counts / counts.sum(), (len(years), spot_shocks.size))
+
+
+@dataclass
+class OptimizerResult:
+    frontier: pd.DataFrame  # parameters and objectives of the Pareto optimal candidates, by the first objective
+    evaluated: int  # candidates valued
+    feasible: int  # candidates within the max_loss cap
+    generator: Callable
+    base: Dict = field(default_factory=dict)
+
+    def best(self, objective: str = EXPECTED_PNL) -> pd.Series:
+        """The frontier candidate best on one objective"""
+        scores = self.frontier[objective] * OBJECTIVES[objective]
+        return self.frontier.loc[scores.idxmax()]
+
+    def positions(self, i: int) -> List:
+        """Option positions of the frontier's i-th candidate"""
+        params = self.frontier.drop(columns=list(OBJECTIVES)).to_dict("records")[i]
+        return self.generator(**self.base, **params)
+
+
+def pareto_mask(scores: np.ndarray) -> np.ndarray:
+    """True for the rows no other row dominates, scores shaped (n, n_objectives) with more better in every column"""
+    keep = np.ones(len(scores), dtype=bool)
+    # best first on the first objective, dominated rows are then dropped by the rows kept before them
+    for i in np.argsort(-scores[:, 0], kind="stable"):
+        if not keep[i]:
+            continue
+        dominated = (scores <= scores[i]).all(axis=1) & (scores < scores[i]).any(axis=1)
+        keep[dominated] = False
+    return keep
+
+
+@dataclass
+class _Job:
+    """Everything needed to value a batch of candidates, sent once per worker"""
+
+    generator: Callable
+    base: Dict
+    spot_shocks: np.ndarray
+    distribution: Union[Lognormal, Empirical]
+    horizon: Optional[float]
+    max_loss: Optional[float]
+    objectives: Tuple[str, ...]
+    market_days_year: int
+    vol_surface: Optional[VolSurface]
+
+    def scores(self, combos: List[Dict]) -> np.ndarray:
+        """(n, 3) expected_pnl, max_loss and return_on_margin of each candidate"""
+        positions = [self.generator(**self.base, **combo) for combo in combos]
+        counts = np.array([len(p) for p in positions])
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        legs = OptionBook.from_positions(list(itertools.chain.from_iterable(positions)))
+
+        # each candidate's legs are valued at its own horizon, legs expired by then are worth their payoff
+        if self.horizon is None:
+            years = np.minimum.reduceat(legs.T, starts)
+        else:
+            years = np.full(len(combos), self.horizon / self.market_days_year)
+        T = (legs.T - np.repeat(years, counts))[None, :]
+        S = (legs.S[:, None] * (1 + self.spot_shocks))[None, :, None, :]
+        zero = np.zeros(1)
+        values = _leg_values(legs, S, T, zero, zero, self.vol_surface)[0, :, 0, :]
+
+        initial_value = np.add.reduceat(legs.position_value, starts)
+        pnl = np.add.reduceat(values * legs.quantity[:, None], starts) - initial_value[:, None]
+        expected = (pnl * self.distribution.weights(self.spot_shocks, years)).sum(axis=1)
+        max_loss = np.maximum(-pnl.min(axis=1), 0.0)
+        # a candidate that can't lose has no margin, it's infinitely good (or bad) on return
+        rom = np.divide(expected, max_loss, out=np.copysign(np.full(len(combos), np.inf), expected), where=max_loss > 0)
+        return np.column_stack([expected, max_loss, rom])
+
+    def frontier(self, start: int, combos: List[Dict]) -> Tuple[np.ndarray, np.ndarray, int]:
+        """(candidate numbers, scores) of the batch's feasible Pareto frontier, and its count of feasible ones"""
+        with profiling.span("optimizer.batch"):
+            scores = self.scores(combos)
+        index = np.arange(start, start + len(combos))
+        if self.max_loss is not None:
+            feasible = scores[:, 1] <= self.max_loss
+            index, scores = index[feasible], scores[feasible]
+        keep = pareto_mask(self._oriented(scores))
+        return index[keep], scores[keep], len(index)
+
+    def _oriented(self, scores: np.ndarray) -> np.ndarray:
+        """The objectives' columns, signed so more is better"""
+        columns = [list(OBJECTIVES).index(name) for name in self.objectives]
+        return scores[:, columns] * np.array([OBJECTIVES[name] for name in self.objectives])
+
+
+# per worker state, set by _init_worker
+_worker = {}
+
+
+def _init_worker(job: _Job) -> None:
+    _worker["job"] = job
+
+
+def _run_batch(task: Tuple[int, List[Dict]]):
+    return _worker["job"].frontier(*task)
+
+
+def _candidates(grid: Union[Dict[str, Sequence], Sequence[Dict]]) -> List[Dict]:
+    """Every combination of a {name: values} grid, or an explicit list of candidates"""
+    if isinstance(grid, dict):
+        return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+    return [dict(combo) for combo in grid]
+
+
+def optimize(
+    generator: Callable,
+    grid: Union[Dict[str, Sequence], Sequence[Dict]],
+    distribution: Union[Lognormal, Empirical],
+    base: Optional[Dict] = None,
+    where: Optional[Callable[[Dict], bool]] = None,
+    max_loss: Optional[float] = None,
+    objectives: Sequence[str] = tuple(OBJECTIVES),
+    spot_shocks: Sequence[float] = SPOT_SHOCKS,
+    horizon: Optional[float] = None,
+    market_days_year: int = 252,
+    vol_surface: Optional[VolSurface] = None,
+    batch_size: int = 1024,
+    processes: int = 1,
+) -> OptimizerResult:
+    """Search generator arguments for the Pareto frontier of the objectives
+
+    Args:
+        generator (Callable): builds List[OptionPosition] from keyword arguments, e.g. gen_strangle
+        grid (Dict[str, Sequence] or Sequence[Dict]): generator arguments to search, every combination of a dict
+            of values (cartesian product) or a list of candidates
+        distribution (Lognormal or Empirical): spot move at the horizon, weights expected_pnl
+        base (Dict, optional): generator arguments held fixed across the search. Defaults to None.
+        where (Callable, optional): keeps the candidates it returns True for, e.g. lambda c: c["back_days"] >
+            c["front_days"] for calendars. Defaults to None.
+        max_loss (float, optional): candidates that can lose more are dropped. Defaults to None.
+        objectives (Sequence[str], optional): OBJECTIVES the frontier is over. Defaults to all three.
+        spot_shocks (Sequence[float], optional): relative spot moves valued, sorted. Defaults to SPOT_SHOCKS.
+        horizon (float, optional): days passed. Defaults to None, each candidate's first expiry.
+        market_days_year (int, optional): converts horizon to years. Defaults to 252.
+        vol_surface (VolSurface, optional): revalue the legs off the surface at the horizon, as OptionsPlot does.
+            Defaults to None, sigma (drifting to end_sigma).
+        batch_size (int, optional): candidates valued per pass. Defaults to 1024.
+        processes (int, optional): worker processes, 1 runs in this process. Defaults to 1.
+
+    Returns:
+        OptimizerResult
+    """
+    unknown = set(objectives) - set(OBJECTIVES)
+    if unknown or not objectives:
+        raise ValueError(f"objectives must be some of {list(OBJECTIVES)}, got {list(objectives)}")
+    base = base or {}
+    combos = [c for c in _candidates(grid) if where is None or where(c)]
+    job = _Job(
+        generator=generator,
+        base=base,
+        spot_shocks=np.asarray(spot_shocks, dtype=float),
+        distribution=distribution,
+        horizon=horizon,
+        max_loss=max_loss,
+        objectives=tuple(objectives),
+        market_days_year=market_days_year,
+        vol_surface=vol_surface,
+    )
+    tasks = [(start, combos[start:][:batch_size]) for start in range(0, len(combos), batch_size)]
+
+    with profiling.span("optimizer.optimize"):
+        index, scores, feasible = _search(job, tasks, processes)
+        # batches were each cut to their own frontier, merge them
+        keep = pareto_mask(job._oriented(scores))
+        index, scores = index[keep], scores[keep]
+
+    frontier = pd.DataFrame([combos[i] for i in index], columns=list(combos[0]) if combos else None)
+    for column, name in enumerate(OBJECTIVES):
+        frontier[name] = scores[:, column]
+    first = objectives[0]
+    frontier = frontier.sort_values(first, ascending=OBJECTIVES[first] < 0, kind="stable").reset_index(drop=True)
+    return OptimizerResult(frontier, evaluated=len(combos), feasible=feasible, generator=generator, base=base)
+
+
+def _search(job: _Job, tasks: List, processes: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Run the batches, in this process or on a pool, concatenating their frontiers"""
+    results = []
+    if processes == 1 or len(tasks) <= 1:
+        results = [job.frontier(*task) for task in tasks]
+    else:
+        pool = _context().Pool(min(processes, len(tasks)), initializer=_init_worker, initargs=(job,))
+        try:
+            results = list(pool.imap_unordered(_run_batch, tasks))
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    if not results:
+        return np.empty(0, dtype=int), np.empty((0, len(OBJECTIVES))), 0
+    index, scores, feasible = zip(*results)
+    return np.concatenate(index), np.concatenate(scores), int(sum(feasible))
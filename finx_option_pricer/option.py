@@ -1,21 +1,32 @@
+import math
 from dataclasses import dataclass
+from operator import attrgetter
+
+import numpy as np
 
 import finx_option_pricer.bsm as bsm
+from finx_option_pricer.cache import memoize
+from finx_option_pricer.models import PricingModel, get_model
 
 CALL = "c"
 PUT = "p"
 
 
+def _scalar(x) -> float:
+    """Model kernels return arrays, unwrap a single contract's result to a numpy float"""
+    return np.asarray(x, dtype=float)[()]
+
+
 @dataclass
 class Option:
     S: float  # current price
     K: float  # strike price
     T: float  # time to maturity (in years, 0.5 => 6 months)
     r: float  # risk free rate
-    # q: float # dividend rate
     sigma: float  # volatility
     option_type: str = "c"  # c or p
     algo: str = "bsm"
+    q: float = 0.0  # continuous dividend yield (q = r for options on futures)
 
     @property
     def _t_days(self) -> int:
@@ -29,21 +40,30 @@ class Option:
             self.K,
             self._t_days,
             self.r,
+            self.q,
             self.sigma,
             self.option_type,
             self.algo,
         ]
         return "-".join([str(x) for x in id_values])
 
+    @property
+    def cache_key(self) -> tuple:
+        """Full contract terms, used to key the pricing cache (see finx_option_pricer.cache)"""
+        return (self.S, self.K, self.T, self.r, self.q, self.sigma, self.option_type, self.algo)
+
+    @property
+    def model(self) -> PricingModel:
+        """Pricing model registered for self.algo"""
+        return get_model(self.algo)
+
     @property
     def value(self) -> float:
         """Option value wrt to algo"""
-        func = None
-        if self.option_type == "c":
-            func = bsm.bs_call_value
-        elif self.option_type == "p":
-            func = bsm.bs_put_value
-        return func(self.S, self.K, self.T, self.r, self.sigma)
+        return memoize("value", self.cache_key, self._value)
+
+    def _value(self) -> float:
+        return _scalar(self.model.value(self.S, self.K, self.T, self.r, self.sigma, self.option_type, self.q))
 
     def final_value(self, price: float) -> float:
         """Final value of option at expiration"""
@@ -54,12 +74,14 @@ class Option:
 
     def iv(self, opt_value: float) -> float:
         """Calculated Implied Volatility based on opt_price"""
-        if self.option_type == CALL:
-            return bsm.implied_vol_call(opt_value, self.S, self.K, self.T, self.r)
-        if self.option_type == PUT:
-            return bsm.implied_vol_put(opt_value, self.S, self.K, self.T, self.r)
+        if self.option_type in (CALL, PUT):
+            return memoize("iv", self.cache_key + (float(opt_value),), lambda: self._iv(opt_value))
         raise ValueError(f"Must select either c or p (for call or put). Presently, self.option_type={self.option_type}")
 
+    def _iv(self, opt_value: float) -> float:
+        iv = self.model.implied_vol(opt_value, self.S, self.K, self.T, self.r, self.option_type, self.q).iv
+        return _scalar(iv)
+
     @property
     def break_even_value(self) -> float:
         """Break even value for option
@@ -98,35 +120,269 @@ class Option:
 
     @property
     def delta(self) -> float:
-        func = None
-        if self.option_type == "c":
-            func = bsm.delta_call
-        elif self.option_type == "p":
-            func = bsm.delta_put
-        return func(self.S, self.K, self.T, self.r, self.sigma)
+        return _scalar(self.greeks().delta)
 
     @property
     def gamma(self) -> float:
-        return bsm.gamma(self.S, self.K, self.T, self.r, self.sigma)
+        return _scalar(self.greeks().gamma)
 
     @property
     def vega(self) -> float:
-        return bsm.vega(self.S, self.K, self.T, self.r, self.sigma)
+        return _scalar(self.greeks().vega)
 
     @property
     def theta(self) -> float:
-        func = None
-        if self.option_type == "c":
-            func = bsm.theta_call
-        elif self.option_type == "p":
-            func = bsm.theta_put
-        return func(self.S, self.K, self.T, self.r, self.sigma)
+        return _scalar(self.greeks().theta)
 
     @property
     def rho(self) -> float:
-        func = None
-        if self.option_type == "c":
-            func = bsm.rho_call
-        elif self.option_type == "p":
-            func = bsm.rho_put
-        return func(self.S, self.K, self.T, self.r, self.sigma)
+        return _scalar(self.greeks().rho)
+
+    def greeks(self) -> bsm.Greeks:
+        """Value and all greeks (delta, gamma, vega, theta, rho, vanna, volga, charm) from a single pricing pass"""
+        return memoize("greeks", self.cache_key, self._greeks)
+
+    def _greeks(self) -> bsm.Greeks:
+        return self.model.greeks(self.S, self.K, self.T, self.r, self.sigma, self.option_type, self.q)
+
+    def freeze(self) -> "FrozenOption":
+        """Immutable, cached copy, see FrozenOption"""
+        return FrozenOption(self.S, self.K, self.T, self.r, self.sigma, self.option_type, self.algo, self.q)
+
+
+_OPTION_FIELDS = ("S", "K", "T", "r", "sigma", "option_type", "algo", "q")
+# fields the time terms (sqrt(T), sigma * sqrt(T), discount factors) depend on
+_TIME_FIELDS = frozenset(("T", "r", "sigma", "q"))
+
+
+class FrozenOption:
+    """Immutable, slotted counterpart of Option for per contract work
+
+    Same fields, properties and methods as Option, and usable wherever an Option is (OptionPosition, OptionBook,
+    OptionsPlot). Fields are read-only properties over slots, so an instance is ~25% smaller than an Option and
+    costs about the same to build. Derived terms are computed on first access and kept: id and cache_key, sqrt(T)
+    and the discount factors, d1 and d2, the value and greeks. "bsm" contracts are priced straight from those
+    terms in scalar math rather than through the vectorized model kernels. replace() builds a bumped copy that
+    keeps the time terms when only S, K or option_type change.
+
+        option = FrozenOption(S=100.0, K=105.0, T=30 / 252, r=0.02, sigma=0.25)
+        option.value, option.delta
+        option.replace(S=101.0).value
+    """
+
+    __slots__ = tuple(f"_{f}" for f in _OPTION_FIELDS) + ("_id", "_cache_key", "_time_terms", "_d", "_value", "_greeks")
+
+    def __init__(
+        self,
+        S: float,
+        K: float,
+        T: float,
+        r: float,
+        sigma: float,
+        option_type: str = "c",
+        algo: str = "bsm",
+        q: float = 0.0,
+    ):
+        if option_type not in (CALL, PUT):
+            raise ValueError(f"option_type must be c or p (for call or put), got {option_type!r}")
+        self._S = S
+        self._K = K
+        self._T = T
+        self._r = r
+        self._sigma = sigma
+        self._option_type = option_type
+        self._algo = algo
+        self._q = q
+
+    S = property(attrgetter("_S"), doc="current price")
+    K = property(attrgetter("_K"), doc="strike price")
+    T = property(attrgetter("_T"), doc="time to maturity (in years, 0.5 => 6 months)")
+    r = property(attrgetter("_r"), doc="risk free rate")
+    sigma = property(attrgetter("_sigma"), doc="volatility")
+    option_type = property(attrgetter("_option_type"), doc="c or p")
+    algo = property(attrgetter("_algo"))
+    q = property(attrgetter("_q"), doc="continuous dividend yield (q = r for options on futures)")
+
+    def _fields(self) -> tuple:
+        return (self._S, self._K, self._T, self._r, self._sigma, self._option_type, self._algo, self._q)
+
+    def __reduce__(self):
+        return (FrozenOption, self._fields())
+
+    def __repr__(self) -> str:
+        terms = ", ".join(f"{f}={v!r}" for f, v in zip(_OPTION_FIELDS, self._fields()))
+        return f"FrozenOption({terms})"
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self) -> int:
+        return hash(self._fields())
+
+    @property
+    def id(self) -> str:
+        """Option.id, built on first access and kept"""
+        try:
+            return self._id
+        except AttributeError:
+            self._id = Option.id.fget(self)
+            return self._id
+
+    @property
+    def cache_key(self) -> tuple:
+        """Full contract terms, used to key the pricing cache (see finx_option_pricer.cache)"""
+        try:
+            return self._cache_key
+        except AttributeError:
+            self._cache_key = (self._S, self._K, self._T, self._r, self._q, self._sigma, self._option_type, self._algo)
+            return self._cache_key
+
+    def replace(self, **changes) -> "FrozenOption":
+        """Copy with some fields changed, e.g. option.replace(S=101.0, T=option.T - 1 / 252)"""
+        unknown = changes.keys() - _OPTION_FIELDS
+        if unknown:
+            raise TypeError(f"FrozenOption has no fields {sorted(unknown)}")
+        new = FrozenOption(*[changes.get(f, v) for f, v in zip(_OPTION_FIELDS, self._fields())])
+        if _TIME_FIELDS.isdisjoint(changes) and hasattr(self, "_time_terms"):
+            new._time_terms = self._time_terms
+        return new
+
+    def thaw(self) -> Option:
+        """Mutable Option with the same terms"""
+        return Option(*self._fields())
+
+    @property
+    def time_terms(self) -> tuple:
+        """(sqrt(T), sigma * sqrt(T), exp(-rT), exp(-qT)), none of which depend on S or K"""
+        try:
+            return self._time_terms
+        except AttributeError:
+            T = self._T
+            sqrt_T = math.sqrt(T) if T > 0 else 0.0
+            self._time_terms = (sqrt_T, self._sigma * sqrt_T, math.exp(-self._r * T), math.exp(-self._q * T))
+            return self._time_terms
+
+    @property
+    def discount_factor(self) -> float:
+        """exp(-rT)"""
+        return self.time_terms[2]
+
+    def _d1_d2(self) -> tuple:
+        try:
+            return self._d
+        except AttributeError:
+            _, sig_sqrt_T, _, _ = self.time_terms
+            S, K = self._S, self._K
+            if sig_sqrt_T > 0 and S > 0 and K > 0:
+                d1 = (math.log(S / K) + (self._r - self._q + self._sigma ** 2 / 2) * self._T) / sig_sqrt_T
+                self._d = (d1, d1 - sig_sqrt_T)
+            else:
+                self._d = (math.nan, math.nan)
+            return self._d
+
+    @property
+    def d1(self) -> float:
+        """Black-Scholes d1, nan when T, sigma, S or K isn't positive"""
+        return self._d1_d2()[0]
+
+    @property
+    def d2(self) -> float:
+        return self._d1_d2()[1]
+
+    @property
+    def _closed_form(self) -> bool:
+        """True when the contract is priced from the cached terms rather than through the model"""
+        return self._algo == "bsm" and not math.isnan(self._d1_d2()[0])
+
+    @property
+    def value(self) -> float:
+        """Option value wrt to algo"""
+        try:
+            return self._value
+        except AttributeError:
+            pass
+        if self._closed_form:
+            _, _, df, q_df = self._time_terms
+            d1, d2 = self._d
+            sign = 1.0 if self._option_type == CALL else -1.0
+            self._value = sign * (self._S * q_df * bsm.N(sign * d1) - self._K * df * bsm.N(sign * d2))
+        else:
+            self._value = float(memoize("value", self.cache_key, self._value_from_model))
+        return self._value
+
+    _value_from_model = Option._value
+
+    def greeks(self) -> bsm.Greeks:
+        """Value and all greeks (delta, gamma, vega, theta, rho, vanna, volga, charm), as floats"""
+        try:
+            return self._greeks
+        except AttributeError:
+            pass
+        if self._closed_form:
+            self._greeks = self._bsm_greeks()
+        else:
+            greeks = memoize("greeks", self.cache_key, self._greeks_from_model)
+            self._greeks = bsm.Greeks(*[float(x) for x in greeks])
+        return self._greeks
+
+    _greeks_from_model = Option._greeks
+
+    def _bsm_greeks(self) -> bsm.Greeks:
+        """Scalar bsm.bs_greeks from the cached terms"""
+        S, K, T, r, q, sigma = self._S, self._K, self._T, self._r, self._q, self._sigma
+        sqrt_T, sig_sqrt_T, df, q_df = self._time_terms
+        d1, d2 = self._d
+        sign = 1.0 if self._option_type == CALL else -1.0
+        S_q, K_df = S * q_df, K * df
+        N_d1, N_d2, n_d1 = bsm.N(sign * d1), bsm.N(sign * d2), bsm.N_prime(d1)
+
+        vega = S_q * sqrt_T * n_d1
+        theta = -S_q * n_d1 * sigma / (2 * sqrt_T) - sign * r * K_df * N_d2
+        charm = -q_df * n_d1 * (2 * (r - q) * T - d2 * sig_sqrt_T) / (2 * T * sig_sqrt_T)
+        if q:
+            theta += sign * q * S_q * N_d1
+            charm += sign * q * q_df * N_d1
+        return bsm.Greeks(
+            value=self.value,
+            delta=sign * q_df * N_d1,
+            gamma=q_df * n_d1 / (S * sig_sqrt_T),
+            vega=vega,
+            theta=theta,
+            rho=sign * K_df * T * N_d2,
+            vanna=-q_df * n_d1 * d2 / sigma,
+            volga=vega * d1 * d2 / sigma,
+            charm=charm,
+        )
+
+    @property
+    def delta(self) -> float:
+        return self.greeks().delta
+
+    @property
+    def gamma(self) -> float:
+        return self.greeks().gamma
+
+    @property
+    def vega(self) -> float:
+        return self.greeks().vega
+
+    @property
+    def theta(self) -> float:
+        return self.greeks().theta
+
+    @property
+    def rho(self) -> float:
+        return self.greeks().rho
+
+    # the rest only read fields and value, so they're shared with Option
+    _t_days = Option._t_days
+    model = Option.model
+    final_value = Option.final_value
+    iv = Option.iv
+    _iv = Option._iv
+    break_even_value = Option.break_even_value
+    extrinsic_value = Option.extrinsic_value
+    intrinsic_value = Option.intrinsic_value
+    time_value = Option.time_value
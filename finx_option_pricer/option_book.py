@@ -0,0 +1,186 @@
+from dataclasses import dataclass, fields
+from typing import TYPE_CHECKING, List
+
+import numpy as np
+
+import finx_option_pricer.bsm as bsm
+import finx_option_pricer.models as models
+from finx_option_pricer.option import CALL, PUT, Option
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class OptionBook:
+    """Struct-of-arrays container, one element per contract (or position) in each array
+
+    Every field is a contiguous 1-d NumPy array, so a contract costs 66 bytes (eight float64, one bool and one
+    uint8 model code) and every calculation is a single vectorized pass per pricing model in the book.
+
+    The arrays are read-only, as they may share memory with the caller's inputs (see from_frame). Change a field
+    by assigning a new array, e.g. book.S = np.full(len(book), 101.0).
+    """
+
+    S: np.ndarray  # current price
+    K: np.ndarray  # strike price
+    T: np.ndarray  # time to maturity (in years, 0.5 => 6 months)
+    r: np.ndarray  # risk free rate
+    sigma: np.ndarray  # volatility
+    is_call: np.ndarray  # True for calls, False for puts
+    quantity: np.ndarray = None  # defaults to 1
+    end_sigma: np.ndarray = None  # nan where the position has no end_sigma
+    algo_code: np.ndarray = None  # pricing model code, see models.model_code(). Defaults to bsm
+    q: np.ndarray = None  # continuous dividend yield, defaults to 0
+
+    def __post_init__(self):
+        n = np.broadcast(*[np.atleast_1d(f) for f in (self.S, self.K, self.T, self.r, self.sigma)]).shape[0]
+        if self.quantity is None:
+            self.quantity = 1.0
+        if self.end_sigma is None:
+            self.end_sigma = np.nan
+        if self.algo_code is None:
+            self.algo_code = models.model_code("bsm")
+        if self.q is None:
+            self.q = 0.0
+        dtypes = dict(is_call=bool, algo_code=np.uint8)
+        for f in fields(self):
+            dtype = dtypes.get(f.name, float)
+            value = np.ascontiguousarray(np.broadcast_to(np.asarray(getattr(self, f.name), dtype=dtype), (n,)))
+            # a view, so flagging it doesn't lock the caller's array
+            value = value.view()
+            value.setflags(write=False)
+            setattr(self, f.name, value)
+
+    def __len__(self) -> int:
+        return self.K.size
+
+    def __getitem__(self, item) -> "OptionBook":
+        """Subset of the book by index, slice or boolean mask"""
+        return OptionBook(**{f.name: getattr(self, f.name)[item] for f in fields(self)})
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, f.name).nbytes for f in fields(self))
+
+    @property
+    def option_type(self) -> np.ndarray:
+        return np.where(self.is_call, CALL, PUT)
+
+    @property
+    def algo(self) -> np.ndarray:
+        return np.array(models.available_models())[self.algo_code]
+
+    # -------------------------------------------------------------------------
+    # conversions
+
+    @classmethod
+    def from_options(cls, options: List[Option], quantity=1.0, end_sigma=None) -> "OptionBook":
+        return cls(
+            S=[o.S for o in options],
+            K=[o.K for o in options],
+            T=[o.T for o in options],
+            r=[o.r for o in options],
+            sigma=[o.sigma for o in options],
+            is_call=bsm.call_mask([o.option_type for o in options]),
+            quantity=quantity,
+            end_sigma=end_sigma,
+            algo_code=[models.model_code(o.algo) for o in options],
+            q=[o.q for o in options],
+        )
+
+    @classmethod
+    def from_positions(cls, option_positions: List) -> "OptionBook":
+        """Build from a list of OptionPosition"""
+        return cls.from_options(
+            [op.option for op in option_positions],
+            quantity=[op.quantity for op in option_positions],
+            end_sigma=[np.nan if op.end_sigma is None else op.end_sigma for op in option_positions],
+        )
+
+    def to_options(self) -> List[Option]:
+        return [
+            Option(S=S, K=K, T=T, r=r, sigma=sigma, option_type=option_type, algo=algo, q=q)
+            for S, K, T, r, sigma, option_type, algo, q in zip(
+                self.S.tolist(),
+                self.K.tolist(),
+                self.T.tolist(),
+                self.r.tolist(),
+                self.sigma.tolist(),
+                self.option_type.tolist(),
+                self.algo.tolist(),
+                self.q.tolist(),
+            )
+        ]
+
+    def to_positions(self) -> List:
+        """Convert to a list of OptionPosition, whole quantities come back as int and fractional ones as float"""
+        from finx_option_pricer.option_plot import OptionPosition
+
+        return [
+            OptionPosition(
+                option=option,
+                quantity=int(quantity) if quantity.is_integer() else quantity,
+                end_sigma=None if np.isnan(end) else end,
+            )
+            for option, quantity, end in zip(self.to_options(), self.quantity.tolist(), self.end_sigma.tolist())
+        ]
+
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame") -> "OptionBook":
+        """Build from a DataFrame with columns S, K, T, r, sigma, option_type (or is_call) and optionally
+        quantity, end_sigma, q and algo (or algo_code)
+
+        Float64 columns are used without copying.
+        """
+        columns = ["S", "K", "T", "r", "sigma", "quantity", "end_sigma", "algo_code", "q"]
+        kwargs = {c: df[c].to_numpy() for c in columns if c in df}
+        if "algo" in df:
+            kwargs["algo_code"] = [models.model_code(algo) for algo in df["algo"]]
+        is_call = df["is_call"].to_numpy() if "is_call" in df else bsm.call_mask(df["option_type"].to_numpy())
+        return cls(is_call=is_call, **kwargs)
+
+    def to_frame(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        return pd.DataFrame({f.name: getattr(self, f.name) for f in fields(self)}, copy=False)
+
+    # -------------------------------------------------------------------------
+    # calculations
+
+    def _evaluate(self, kernel: str):
+        """Run a model kernel over the book, one call per pricing model present"""
+        args = (self.S, self.K, self.T, self.r, self.sigma, self.is_call, self.q)
+        return models.evaluate(self.algo_code, kernel, *args)
+
+    @property
+    def value(self) -> np.ndarray:
+        """Option value per contract"""
+        return self._evaluate("value")
+
+    @property
+    def position_value(self) -> np.ndarray:
+        """Option value * quantity"""
+        return self.value * self.quantity
+
+    def greeks(self) -> bsm.Greeks:
+        """Value and all greeks per contract, see bsm.bs_greeks"""
+        return self._evaluate("greeks")
+
+    @property
+    def intrinsic_value(self) -> np.ndarray:
+        """Intrinsic value per contract, max(S - K, 0) for calls and max(K - S, 0) for puts"""
+        return self.final_value(self.S)
+
+    @property
+    def break_even_value(self) -> np.ndarray:
+        """Break even value per contract
+
+        Call, be_value = Strike + Call Value
+        Put, be_value = Strike - Put Value
+        """
+        return self.K + self.value * np.where(self.is_call, 1.0, -1.0)
+
+    def final_value(self, price) -> np.ndarray:
+        """Value of each contract at expiration given the underlying price (scalar or per contract)"""
+        return np.where(self.is_call, np.maximum(price - self.K, 0.0), np.maximum(self.K - price, 0.0))
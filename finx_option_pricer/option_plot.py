@@ -1,13 +1,28 @@
 from dataclasses import dataclass
-from typing import List
+from operator import attrgetter
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
-import pandas as pd
 
-from finx_option_pricer.option import Option
+import finx_option_pricer.bsm as bsm
+import finx_option_pricer.models as models
+from finx_option_pricer import profiling
+from finx_option_pricer.cache import memoize
+from finx_option_pricer.option import FrozenOption, Option
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from finx_option_pricer.option_book import OptionBook
+    from finx_option_pricer.vol_surface import VolSurface
 
 MARKET_DAYS_PER_YEAR = 252
 
+VALUE = "value"
+DELTA = "delta"
+# greek_grid surfaces by default
+GREEKS = ("delta", "gamma", "theta", "vega")
+
 
 @dataclass
 class OptionPosition:
@@ -33,12 +48,76 @@ class OptionPosition:
         assert self.end_sigma is not None, "end_sigma must be not None"
         return self.option.sigma - (self.option.sigma - self.end_sigma) * fraction
 
+    def freeze(self) -> "FrozenOptionPosition":
+        """Immutable, cached copy, see FrozenOptionPosition"""
+        return FrozenOptionPosition(self.option, self.quantity, self.end_sigma)
+
+
+class FrozenOptionPosition:
+    """Immutable, slotted counterpart of OptionPosition, holding a FrozenOption (an Option is frozen on the way in)
+
+    initial_value is computed once. replace() takes position fields and option fields alike, so a bump of the
+    underlying is position.replace(S=101.0).
+    """
+
+    __slots__ = ("_option", "_quantity", "_end_sigma", "_initial_value")
+
+    SHORT = OptionPosition.SHORT
+    LONG = OptionPosition.LONG
+
+    def __init__(self, option: Union[Option, FrozenOption], quantity: int, end_sigma: float = None):
+        self._option = option if isinstance(option, FrozenOption) else option.freeze()
+        self._quantity = quantity
+        self._end_sigma = end_sigma
+
+    option = property(attrgetter("_option"))
+    quantity = property(attrgetter("_quantity"))
+    end_sigma = property(attrgetter("_end_sigma"))
+
+    def __reduce__(self):
+        return (FrozenOptionPosition, (self._option, self._quantity, self._end_sigma))
+
+    def __repr__(self) -> str:
+        option, quantity, end_sigma = self.__reduce__()[1]
+        return f"FrozenOptionPosition(option={option!r}, quantity={quantity!r}, end_sigma={end_sigma!r})"
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.__reduce__()[1] == other.__reduce__()[1]
+
+    def __hash__(self) -> int:
+        return hash(self.__reduce__()[1])
+
+    def replace(self, **changes) -> "FrozenOptionPosition":
+        """Copy with position fields (option, quantity, end_sigma) and/or option fields (S, T, sigma, ...) changed"""
+        option = changes.pop("option", self._option)
+        quantity = changes.pop("quantity", self._quantity)
+        end_sigma = changes.pop("end_sigma", self._end_sigma)
+        return FrozenOptionPosition(option.replace(**changes) if changes else option, quantity, end_sigma)
+
+    def thaw(self) -> OptionPosition:
+        return OptionPosition(option=self._option.thaw(), quantity=self._quantity, end_sigma=self._end_sigma)
+
+    @property
+    def initial_value(self) -> float:
+        try:
+            return self._initial_value
+        except AttributeError:
+            self._initial_value = self._option.value * self._quantity
+            return self._initial_value
+
+    id = OptionPosition.id
+    interpolated_vol = OptionPosition.interpolated_vol
+
 
 @dataclass
 class OptionsPlot:
-    option_positions: List[OptionPosition]
+    option_positions: List[Union[OptionPosition, FrozenOptionPosition]]
     spot_range: List
     strike_interval: float = 0.5
+    # when set, every leg is revalued off the surface as time and spot move, in place of sigma / end_sigma
+    vol_surface: Optional["VolSurface"] = None
 
     @property
     def initial_value(self) -> float:
@@ -52,125 +131,287 @@ class OptionsPlot:
             total_value += op.option.value * op.quantity
         return total_value
 
-    # flake8: noqa: C901
-    # TODO - resolve C901 issue
-    def gen_value_df_timeincrementing(
-        self, days: int, step: int = 1, show_final: bool = True, market_days_year: int = 252, value_relative=True
-    ) -> pd.DataFrame:
-        """Generate value option positions as they decay with time.
+    @staticmethod
+    def _leg_grids(
+        spots: np.ndarray, legs: "OptionBook", T: np.ndarray, sigma: np.ndarray, fields: Tuple[str, ...] = (VALUE,)
+    ) -> Dict[str, np.ndarray]:
+        """Value (and greeks) of every (time step, leg, spot) cell in one broadcasted pass per pricing model
 
-        Example return,
+        The value alone goes through model.value. Any greek goes through model.greeks, which prices the value and
+        every greek off the same d1/d2.
 
-           strikes        10         5       0
-        0     85.0 -1.358147 -1.858064 -1.9741
-        1     85.5 -1.255539 -1.823718 -1.9741
-        2     86.0 -1.139727 -1.781053 -1.9741
-        3     86.5 -1.009635 -1.728572 -1.9741
+        Args:
+            spots (np.ndarray): underlying prices, shape (n_spots,)
+            legs (OptionBook): the option positions, one element per leg
+            T (np.ndarray): time to maturity per time step and leg, shape (n_steps, n_legs)
+            sigma (np.ndarray): vol per time step, leg and spot, shape (n_steps, n_legs, 1 or n_spots)
+            fields (Tuple[str, ...], optional): bsm.Greeks fields. Defaults to ("value",).
+
+        Returns:
+            Dict[str, np.ndarray]: per field, position values (per contract * quantity), shape
+                (n_steps, n_legs, n_spots)
+        """
+        S = spots[None, None, :]
+        grids = {field: np.empty((T.shape[0], T.shape[1], spots.size)) for field in fields}
+        for model, idx in models.by_model(legs.algo_code):
+            args = (
+                S,
+                legs.K[idx][None, :, None],
+                T[:, idx][:, :, None],
+                legs.r[idx][None, :, None],
+                sigma[:, idx],
+                legs.is_call[idx][None, :, None],
+                legs.q[idx][None, :, None],
+            )
+            if fields == (VALUE,):
+                grids[VALUE][:, idx, :] = model.value(*args)
+            else:
+                greeks = model.greeks(*args)
+                for field in fields:
+                    grids[field][:, idx, :] = getattr(greeks, field)
+        return {field: grid * legs.quantity[None, :, None] for field, grid in grids.items()}
+
+    def value_grid(
+        self, days: int, step: int = 1, show_final: bool = True, market_days_year: int = 252, value_relative=True
+    ) -> Tuple[np.ndarray, Tuple[int, ...], np.ndarray]:
+        """Vectorized engine behind gen_value_df_timeincrementing.
+
+        All (time step, position, spot) combinations are valued in a single NumPy evaluation rather than
+        constructing an Option per cell.
 
         Args:
             days (int): number days to increment over.
             step (int, optional): step or increment interval. Defaults to 1.
             show_final (bool, optional): option(s) value at expiration of nearest data option. Defaults to True.
             market_days_year(int): number of market days in a calendar year. Defaults to 252.
-            value_relative(boolean): value the options package with respect to initial value vs absolute value. Defaults to True.
+            value_relative(boolean): value the options package with respect to initial value vs absolute value.
+                Defaults to True.
 
         Returns:
-            (pd.DataFrame): DataFrame with columns [strikes, days-step1, days-step2, ..., expiration]
+            Tuple: (strike_range, labels, values) where labels are the remaining days to expiration for each
+                row of values, and values has shape (len(labels), len(strike_range)). The arrays are read-only,
+                since with the pricing cache enabled they are shared between calls.
         """
-        results = {"strikes": []}
+        args = (days, step, show_final, market_days_year, value_relative)
+        return memoize("value_grid", self.cache_key + args, lambda: self._value_grid(*args))
+
+    def greek_grid(
+        self,
+        days: int,
+        step: int = 1,
+        show_final: bool = True,
+        market_days_year: int = 252,
+        value_relative=True,
+        greeks: Sequence[str] = GREEKS,
+    ) -> Tuple[np.ndarray, Tuple[int, ...], Dict[str, np.ndarray]]:
+        """value_grid plus aggregate greek surfaces, all from the same pass over the (time step, position, spot) cells
 
-        # let's only call this once and store in private var
-        __initial_value = self.initial_value
+        Args:
+            days, step, show_final, market_days_year, value_relative: as value_grid, value_relative only applies
+                to the value surface.
+            greeks (Sequence[str], optional): bsm.Greeks fields. Greeks are raw sums of per contract greek *
+                quantity, theta and charm per year. Defaults to ("delta", "gamma", "theta", "vega").
 
-        # NOTE - only look as far as the shortest dated option
-        min_time = min([op.option.T for op in self.option_positions])
-        min_days = int(min_time * market_days_year)
+        Returns:
+            Tuple: (strike_range, labels, surfaces) where surfaces maps "value" and each greek to an array in the
+                value_grid layout, shape (len(labels), len(strike_range)). At expiration delta is the
+                quantity in the money and the other greeks are 0.
+        """
+        unknown = set(greeks) - set(bsm.Greeks._fields)
+        if unknown:
+            raise ValueError(f"unknown greeks {sorted(unknown)}, expected bsm.Greeks fields")
+        fields = (VALUE,) + tuple(g for g in greeks if g != VALUE)
+        args = (days, step, show_final, market_days_year, value_relative)
+        return memoize("greek_grid", self.cache_key + args + fields, lambda: self._grids(*args, fields))
 
-        _start = self.spot_range[0]
-        _end = self.spot_range[1] + self.strike_interval
-        strike_range = np.arange(_start, _end, self.strike_interval)
+    @property
+    def cache_key(self) -> tuple:
+        """Positions and plot settings, used to key the pricing cache (see finx_option_pricer.cache)"""
+        positions = tuple((op.option.cache_key, op.quantity, op.end_sigma) for op in self.option_positions)
+        surface = None if self.vol_surface is None else self.vol_surface.cache_key
+        return (positions, tuple(self.spot_range), self.strike_interval, surface)
 
-        for price in strike_range:
-            results["strikes"].append(price)
+    def _surface_sigma(self, legs: "OptionBook", T: np.ndarray, spots: np.ndarray) -> np.ndarray:
+        """self.vol_surface vol per (time step, leg, spot), shape (n_steps, n_legs, 1 or n_spots)"""
+        return self.vol_surface.sigma(legs.K[None, :, None], T[:, :, None], spots[None, None, :])
 
-        # determine aggregate value as time passes
-        for day in range(0, days + 1, step):
-            if day >= min_days:
-                continue
+    def _value_grid(self, days, step, show_final, market_days_year, value_relative):
+        strike_range, labels, grids = self._grids(days, step, show_final, market_days_year, value_relative)
+        return strike_range, labels, grids[VALUE]
+
+    def _grids(self, days, step, show_final, market_days_year, value_relative, fields=(VALUE,)):
+        from finx_option_pricer.option_book import OptionBook
+
+        results = {}
 
-            annualized_days = day / market_days_year
+        with profiling.span("options_plot.legs"):
+            legs = OptionBook.from_positions(self.option_positions)
 
-            #
-            # TODO - This could use a good refactoring. Too much going on at once
-            #
-            aggregate_position_value_wrt_strikes = []
-            for option_position in self.option_positions:
-                newT = option_position.option.T - annualized_days
+        # same as self.initial_value, but one vectorized pass instead of pricing the positions one by one
+        __initial_value = legs.position_value.sum() if value_relative is True else 0.0
 
-                newDays = int(newT * market_days_year)
+        _start = self.spot_range[0]
+        _end = self.spot_range[1] + self.strike_interval
+        strike_range = np.arange(_start, _end, self.strike_interval)
+
+        # determine aggregate value as time passes
+        results.update(self._step_rows(legs, strike_range, days, step, market_days_year, fields))
 
+        # determine final value at expiration of nearest dated option
+        if show_final:
+            results[0] = self._final_row(legs, strike_range, market_days_year, fields)
+
+        labels = tuple(results.keys())
+        grids = {}
+        for field in fields:
+            rows = [row[field] for row in results.values()]
+            grid = np.array(rows) if rows else np.empty((0, strike_range.size))
+            if field == VALUE and value_relative is True:
+                grid -= __initial_value
+            grid.setflags(write=False)
+            grids[field] = grid
+        strike_range.setflags(write=False)
+        return strike_range, labels, grids
+
+    def _step_rows(self, legs, strike_range, days, step, market_days_year, fields) -> Dict[int, Dict[str, np.ndarray]]:
+        """{remaining days: {field: row}} for each time step before the shortest dated option expires"""
+        # NOTE - only look as far as the shortest dated option
+        min_days = int(legs.T.min() * market_days_year)
+        day_steps = [day for day in range(0, days + 1, step) if day < min_days]
+        if not day_steps:
+            return {}
+
+        annualized_days = np.array(day_steps) / market_days_year
+        newT = legs.T[None, :] - annualized_days[:, None]
+
+        with profiling.span("options_plot.sigma"):
+            if self.vol_surface is not None:
+                sigma = self._surface_sigma(legs, newT, strike_range)
+            else:
                 # if the "option_position" has an end_sigma non None value, this means the option's sigma/vol
                 # is expected to linearly change as the option progresses to expiration. For example,
                 # consider SPY options that at 45dte (IV ~ 16-22 vol) compared to 7dte (IV ~ 10-14 vol)
-                # The adjustments in vol are calculated within OptionPosition.interpolated_vol()
-                sigma = option_position.option.sigma
-                if option_position.end_sigma is not None:
-                    fraction_to_dte = (option_position.option.T - newT) / option_position.option.T
-                    sigma = option_position.interpolated_vol(fraction_to_dte)
-
-                option_position_strike_values = []
-                for price in strike_range:
-                    x = Option(
-                        S=price,
-                        K=option_position.option.K,
-                        T=newT,
-                        r=option_position.option.r,
-                        sigma=sigma,
-                        option_type=option_position.option.option_type,
-                    )
-                    value = x.value * option_position.quantity
-                    option_position_strike_values.append(value)
-
-                aggregate_position_value_wrt_strikes.append(option_position_strike_values)
-
-            agg_value_sum = np.sum(aggregate_position_value_wrt_strikes, axis=0)
-            results[newDays] = agg_value_sum - __initial_value if value_relative is True else agg_value_sum
+                # The adjustments mirror OptionPosition.interpolated_vol()
+                fraction_to_dte = (legs.T - newT) / legs.T
+                interpolated = legs.sigma - (legs.sigma - legs.end_sigma) * fraction_to_dte
+                sigma = np.where(np.isnan(legs.end_sigma), legs.sigma, interpolated)[:, :, None]
+
+        with profiling.span("options_plot.price"):
+            grids = self._leg_grids(strike_range, legs, newT, sigma, fields)
+            sums = {field: grid.sum(axis=1) for field, grid in grids.items()}
+
+        # columns are labeled by the remaining days of the last position
+        newDays = (newT[:, -1] * market_days_year).astype(int)
+        return {int(label): {field: sums[field][i] for field in fields} for i, label in enumerate(newDays)}
+
+    def _final_row(self, legs, strike_range, market_days_year, fields) -> Dict[str, np.ndarray]:
+        """{field: row} as the shortest dated option expires"""
+        newT = legs.T - legs.T.min()
+        expired = newT <= 1 / market_days_year
+
+        grids = {field: np.empty((legs.T.size, strike_range.size)) for field in fields}
+        if (~expired).any():
+            # option has not expired - determine pre-expiration value
+            live = legs[~expired]
+            live_T = newT[~expired][None, :]
+            with profiling.span("options_plot.sigma"):
+                if self.vol_surface is not None:
+                    sigma = self._surface_sigma(live, live_T, strike_range)
+                else:
+                    sigma = live.sigma[None, :, None]
+            with profiling.span("options_plot.price"):
+                for field, grid in self._leg_grids(strike_range, live, live_T, sigma, fields).items():
+                    grids[field][~expired] = grid[0]
+        if expired.any():
+            # option has expired - determine final value
+            with profiling.span("options_plot.payoff"):
+                K = legs.K[expired][:, None]
+                is_call = legs.is_call[expired][:, None]
+                quantity = legs.quantity[expired][:, None]
+                payoff = np.where(is_call, np.maximum(strike_range - K, 0.0), np.maximum(K - strike_range, 0.0))
+                for field in fields:
+                    grids[field][expired] = 0.0
+                grids[VALUE][expired] = payoff * quantity
+                if DELTA in grids:
+                    itm = np.where(is_call, strike_range > K, strike_range < K)
+                    grids[DELTA][expired] = np.where(is_call, 1.0, -1.0) * itm * quantity
+
+        return {field: grid.sum(axis=0) for field, grid in grids.items()}
+
+    def stress_cube(self, spot_shocks, vol_shocks=(0.0,), days=(0,), **kwargs):
+        """Spot x vol x horizon P&L cube of the positions, see finx_option_pricer.stress.stress_cube
+
+        Legs are revalued off self.vol_surface when it is set.
+        """
+        from finx_option_pricer.stress import stress_cube
 
-        # determine final value at expiration of nearest dated option
-        #
-        # TODO - This could use a good refactoring. Too much going on at once
-        #
-        if show_final:
-            option_positions_values = []
-
-            for option_position in self.option_positions:
-                newT = option_position.option.T - min_time
-
-                option_position_strike_values = []
-                for price in strike_range:
-                    value = None
-                    if newT <= 1 / market_days_year:
-                        # option has expired - determine final value
-                        value = option_position.option.final_value(price) * option_position.quantity
-
-                    else:
-                        # option has not expired - determine pre-expiration value
-                        x = Option(
-                            S=price,
-                            K=option_position.option.K,
-                            T=newT,
-                            r=option_position.option.r,
-                            sigma=option_position.option.sigma,
-                            option_type=option_position.option.option_type,
-                        )
-                        value = x.value * option_position.quantity
-                    # append the value
-                    option_position_strike_values.append(value)
-
-                option_positions_values.append(option_position_strike_values)
-
-            agg_value_sum = list(np.sum(option_positions_values, axis=0))
-            results[0] = agg_value_sum - __initial_value if value_relative is True else agg_value_sum
-
-        # return values as DataFrame
-        return pd.DataFrame(results)
+        kwargs.setdefault("vol_surface", self.vol_surface)
+        return stress_cube(self.option_positions, spot_shocks, vol_shocks, days, **kwargs)
+
+    def gen_value_df_timeincrementing(
+        self, days: int, step: int = 1, show_final: bool = True, market_days_year: int = 252, value_relative=True
+    ) -> "pd.DataFrame":
+        """Generate value option positions as they decay with time.
+
+        Example return,
+
+           strikes        10         5       0
+        0     85.0 -1.358147 -1.858064 -1.9741
+        1     85.5 -1.255539 -1.823718 -1.9741
+        2     86.0 -1.139727 -1.781053 -1.9741
+        3     86.5 -1.009635 -1.728572 -1.9741
+
+        Args:
+            days (int): number days to increment over.
+            step (int, optional): step or increment interval. Defaults to 1.
+            show_final (bool, optional): option(s) value at expiration of nearest data option. Defaults to True.
+            market_days_year(int): number of market days in a calendar year. Defaults to 252.
+            value_relative(boolean): value the options package with respect to initial value vs absolute value.
+                Defaults to True.
+
+        Returns:
+            (pd.DataFrame): DataFrame with columns [strikes, days-step1, days-step2, ..., expiration]
+        """
+        with profiling.span("options_plot.value_grid"):
+            strike_range, labels, values = self.value_grid(days, step, show_final, market_days_year, value_relative)
+
+        with profiling.span("options_plot.dataframe"):
+            import pandas as pd
+
+            results = {"strikes": strike_range}
+            for label, row in zip(labels, values):
+                results[label] = row
+
+            # return values as DataFrame
+            return pd.DataFrame(results)
+
+    def gen_greek_dfs_timeincrementing(
+        self,
+        days: int,
+        step: int = 1,
+        show_final: bool = True,
+        market_days_year: int = 252,
+        value_relative=True,
+        greeks: Sequence[str] = GREEKS,
+    ) -> Dict[str, "pd.DataFrame"]:
+        """gen_value_df_timeincrementing plus a DataFrame per greek in the same layout, from one pass, see greek_grid
+
+        Returns:
+            Dict[str, pd.DataFrame]: "value" and each greek, DataFrames with columns
+                [strikes, days-step1, days-step2, ..., expiration]
+        """
+        with profiling.span("options_plot.greek_grid"):
+            strike_range, labels, surfaces = self.greek_grid(
+                days, step, show_final, market_days_year, value_relative, greeks
+            )
+
+        with profiling.span("options_plot.dataframe"):
+            import pandas as pd
+
+            frames = {}
+            for name, values in surfaces.items():
+                results = {"strikes": strike_range}
+                for label, row in zip(labels, values):
+                    results[label] = row
+                frames[name] = pd.DataFrame(results)
+            return frames
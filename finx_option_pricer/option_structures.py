@@ -1,7 +1,8 @@
-from typing import List
+from typing import List, Optional, Tuple
 
 from finx_option_pricer.option import Option
 from finx_option_pricer.option_plot import OptionPosition
+from finx_option_pricer.vol_surface import VolSurface
 
 MARKET_DAYS_PER_YEAR = 252
 RATE_ZERO = 0.0
@@ -12,6 +13,15 @@ def annualized_days(days: int) -> float:
     return days / MARKET_DAYS_PER_YEAR
 
 
+def _leg_vols(
+    vol_surface: Optional[VolSurface], spot_price: float, strike_price: float, days: int, vol: float, vol_final: float
+) -> Tuple[float, Optional[float]]:
+    """(sigma, end_sigma) of a leg, read off vol_surface (with no end_sigma) when one is given"""
+    if vol_surface is None:
+        return vol, vol_final
+    return float(vol_surface.sigma(strike_price, annualized_days(days), S=spot_price)), None
+
+
 def gen_calendar(
     spot_price: float,
     strike_price: float,
@@ -22,6 +32,10 @@ def gen_calendar(
     back_vol: float,
     back_vol_final: float,
     option_type: str = "c",
+    algo: str = "bsm",
+    q: float = 0.0,
+    vol_surface: Optional[VolSurface] = None,
+    back_ratio: int = 1,
 ) -> List[OptionPosition]:
     """
     Generate a calendar structure
@@ -29,26 +43,44 @@ def gen_calendar(
     Assumes
     - interest rate is 0.0
 
+    algo selects the registered pricing model for both legs (see finx_option_pricer.models)
+    q is the underlying's continuous dividend yield, shared by both legs
+    vol_surface, when given, sets each leg's vol in place of the *_vol / *_vol_final arguments (which may be
+    None); pass the same surface to OptionsPlot to reprice off it as time and spot move
+    back_ratio is the number of back month options bought per front month option sold
+
     Returns: List[OptionPosition]
     """
-    fs = front_vol
-    fsf = front_vol_final
-    bs = back_vol
-    bsf = back_vol_final
+    fs, fsf = _leg_vols(vol_surface, spot_price, strike_price, front_days, front_vol, front_vol_final)
+    bs, bsf = _leg_vols(vol_surface, spot_price, strike_price, back_days, back_vol, back_vol_final)
 
     front = OptionPosition(
         quantity=-1,
         end_sigma=fsf,
         option=Option(
-            S=spot_price, K=strike_price, T=annualized_days(front_days), r=RATE_ZERO, sigma=fs, option_type=option_type
+            S=spot_price,
+            K=strike_price,
+            T=annualized_days(front_days),
+            r=RATE_ZERO,
+            sigma=fs,
+            option_type=option_type,
+            algo=algo,
+            q=q,
         ),
     )
 
     back = OptionPosition(
-        quantity=+1,
+        quantity=+back_ratio,
         end_sigma=bsf,
         option=Option(
-            S=spot_price, K=strike_price, T=annualized_days(back_days), r=RATE_ZERO, sigma=bs, option_type=option_type
+            S=spot_price,
+            K=strike_price,
+            T=annualized_days(back_days),
+            r=RATE_ZERO,
+            sigma=bs,
+            option_type=option_type,
+            algo=algo,
+            q=q,
         ),
     )
 
@@ -61,6 +93,11 @@ def gen_strangle(
     days: int,
     vol_initial: float,
     vol_final: float,
+    algo: str = "bsm",
+    q: float = 0.0,
+    vol_surface: Optional[VolSurface] = None,
+    put_strike_price: Optional[float] = None,
+    put_ratio: int = 1,
 ) -> List[OptionPosition]:
     """
     Generate strangle
@@ -68,32 +105,46 @@ def gen_strangle(
     Assumes
     - interest rate is 0.0
 
+    algo selects the registered pricing model for both legs (see finx_option_pricer.models)
+    q is the underlying's continuous dividend yield, shared by both legs
+    vol_surface, when given, sets the legs' vol in place of vol_initial / vol_final (which may be None); pass
+    the same surface to OptionsPlot to reprice off it as time and spot move
+    put_strike_price is the short put's strike, defaults to strike_price (a straddle); the call is at strike_price
+    put_ratio is the number of puts sold per call sold
+
     Returns: List[OptionPosition]
     """
+    put_strike_price = strike_price if put_strike_price is None else put_strike_price
+    call_vol, call_vol_final = _leg_vols(vol_surface, spot_price, strike_price, days, vol_initial, vol_final)
+    put_vol, put_vol_final = _leg_vols(vol_surface, spot_price, put_strike_price, days, vol_initial, vol_final)
 
     short_call = OptionPosition(
         quantity=-1,
-        end_sigma=vol_final,
+        end_sigma=call_vol_final,
         option=Option(
             S=spot_price,
             K=strike_price,
             T=annualized_days(days),
             r=RATE_ZERO,
-            sigma=vol_initial,
+            sigma=call_vol,
             option_type="c",
+            algo=algo,
+            q=q,
         ),
     )
 
     short_put = OptionPosition(
-        quantity=-1,
-        end_sigma=vol_final,
+        quantity=-put_ratio,
+        end_sigma=put_vol_final,
         option=Option(
             S=spot_price,
-            K=strike_price,
+            K=put_strike_price,
             T=annualized_days(days),
             r=RATE_ZERO,
-            sigma=vol_initial,
+            sigma=put_vol,
             option_type="p",
+            algo=algo,
+            q=q,
         ),
     )
 
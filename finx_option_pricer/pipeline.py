@@ -0,0 +1,260 @@
+"""Streaming option chain enrichment, CSV or Parquet in, mid / implied vol / greeks out
+
+Chains are read, priced and written one chunk at a time, so memory use is set by chunksize rather than by the
+size of the file. Each chunk goes through a single vectorized bsm.implied_vol and bsm.bs_greeks call.
+
+    from finx_option_pricer.pipeline import run
+
+    run("chain.csv", "chain_greeks.parquet", chunksize=250_000, r=0.05, columns={"underlying_price": "S"})
+
+or from the shell,
+
+    python -m finx_option_pricer.pipeline chain.csv chain_greeks.parquet --chunksize 250000 --r 0.05 \\
+        --column underlying_price=S
+
+Input chunks need columns S (underlying price), K (strike), option_type ("c"/"p", "call"/"put" also accepted),
+bid, ask and either T (years) or days (days to expiration). r and q columns are used per row when present,
+otherwise the scalar r and q arguments apply. Parquet needs pyarrow.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+import finx_option_pricer.bsm as bsm
+
+DEFAULT_CHUNKSIZE = 100_000
+
+# columns added to every chunk, after the input columns
+GREEK_COLUMNS = [f for f in bsm.Greeks._fields if f != "value"]
+OUTPUT_COLUMNS = ["mid", "iv", "iv_converged"] + GREEK_COLUMNS
+
+
+# compressed CSV suffixes pyarrow can stream, each chunk is appended as its own compressed member (frame)
+_CSV_CODECS = {".gz": "gzip", ".bz2": "bz2", ".zst": "zstd"}
+# compressed CSV suffixes pandas infers but pyarrow has no output stream for, these are written with pandas
+_PANDAS_CSV_COMPRESSION = (".xz", ".zip", ".tar")
+
+
+def _is_parquet(path) -> bool:
+    return Path(path).suffix.lower() in (".parquet", ".pq")
+
+
+def _pyarrow_parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("reading and writing Parquet requires pyarrow, pip install pyarrow") from e
+    return pq
+
+
+# -----------------------------------------------------------------------------
+# readers
+
+
+def read_chunks(
+    path, chunksize: int = DEFAULT_CHUNKSIZE, columns: Optional[Dict[str, str]] = None
+) -> Iterator[pd.DataFrame]:
+    """Yield the chain in path as DataFrames of at most chunksize rows
+
+    Args:
+        path: .csv (optionally compressed, e.g. .csv.gz) or .parquet file
+        chunksize (int, optional): rows per chunk. Defaults to DEFAULT_CHUNKSIZE.
+        columns (Dict[str, str], optional): rename file columns to pipeline names, e.g. {"strike": "K"}
+    """
+    if _is_parquet(path):
+        batches = (
+            batch.to_pandas() for batch in _pyarrow_parquet().ParquetFile(path).iter_batches(batch_size=chunksize)
+        )
+    else:
+        batches = pd.read_csv(path, chunksize=chunksize)
+    for chunk in batches:
+        yield chunk.rename(columns=columns) if columns else chunk
+
+
+# -----------------------------------------------------------------------------
+# calculations
+
+
+def enrich(chunk: pd.DataFrame, r: float = 0.0, q: float = 0.0, market_days_year: int = 252) -> pd.DataFrame:
+    """Add mid, iv, iv_converged and greeks columns to a chain chunk
+
+    Quotes without a valid mid (missing side, crossed market) or outside the no-arbitrage bounds get nan iv
+    and greeks.
+
+    Args:
+        chunk (pd.DataFrame): columns S, K, option_type, bid, ask and T or days, optionally r and q
+        r (float, optional): risk free rate, used when chunk has no r column. Defaults to 0.0.
+        q (float, optional): continuous dividend yield, used when chunk has no q column. Defaults to 0.0.
+        market_days_year (int, optional): converts days to T. Defaults to 252.
+
+    Returns:
+        pd.DataFrame: chunk with OUTPUT_COLUMNS appended
+    """
+    S = chunk["S"].to_numpy(dtype=float)
+    K = chunk["K"].to_numpy(dtype=float)
+    if "T" in chunk:
+        T = chunk["T"].to_numpy(dtype=float)
+    else:
+        T = chunk["days"].to_numpy(dtype=float) / market_days_year
+    r = chunk["r"].to_numpy(dtype=float) if "r" in chunk else r
+    q = chunk["q"].to_numpy(dtype=float) if "q" in chunk else q
+    is_call = bsm.call_mask(chunk["option_type"].astype(str).str[0].str.lower().to_numpy())
+
+    bid = chunk["bid"].to_numpy(dtype=float)
+    ask = chunk["ask"].to_numpy(dtype=float)
+    mid = np.where(ask >= bid, (bid + ask) / 2.0, np.nan)
+
+    res = bsm.implied_vol(mid, S, K, T, r, is_call, q)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        greeks = bsm.bs_greeks(S, K, T, r, res.iv, is_call, q)
+
+    out = dict(mid=mid, iv=res.iv, iv_converged=res.converged)
+    out.update((name, np.broadcast_to(getattr(greeks, name), S.shape)) for name in GREEK_COLUMNS)
+    return chunk.assign(**out)
+
+
+def process(chunks: Iterable[pd.DataFrame], **kwargs) -> Iterator[pd.DataFrame]:
+    """Lazily enrich each chunk, kwargs are passed to enrich"""
+    for chunk in chunks:
+        yield enrich(chunk, **kwargs)
+
+
+# -----------------------------------------------------------------------------
+# writers
+
+
+class ChainWriter:
+    """Appends DataFrame chunks to a .csv or .parquet file, the file type is picked from the suffix
+
+    CSV is written with pyarrow when it is installed (roughly 10x faster than DataFrame.to_csv), otherwise with
+    pandas. A .gz, .bz2 or .zst suffix compresses the CSV, as DataFrame.to_csv would. Use as a context manager,
+    or call close() once every chunk is written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._parquet = _is_parquet(path)
+        self._writer = None  # pyarrow ParquetWriter, opened with the schema of the first chunk
+        self._started = False
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self._parquet:
+            self._write_parquet(chunk)
+        else:
+            self._write_csv(chunk)
+        self._started = True
+        self.rows += len(chunk)
+
+    def _write_parquet(self, chunk: pd.DataFrame) -> None:
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            self._writer = _pyarrow_parquet().ParquetWriter(self.path, table.schema)
+        elif table.schema != self._writer.schema:
+            # pandas infers dtypes per chunk, e.g. an int column comes back as float in a chunk with gaps
+            table = table.cast(self._writer.schema)
+        self._writer.write_table(table)
+
+    def _write_csv(self, chunk: pd.DataFrame) -> None:
+        mode = "a" if self._started else "w"
+        suffix = Path(self.path).suffix.lower()
+        try:
+            import pyarrow as pa
+            import pyarrow.csv as pa_csv
+        except ImportError:
+            pa = None
+        if pa is None or suffix in _PANDAS_CSV_COMPRESSION:
+            chunk.to_csv(self.path, mode=mode, header=not self._started, index=False)
+            return
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        options = pa_csv.WriteOptions(include_header=not self._started)
+        with open(self.path, mode + "b") as f:
+            if suffix in _CSV_CODECS:
+                with pa.CompressedOutputStream(f, _CSV_CODECS[suffix]) as stream:
+                    pa_csv.write_csv(table, stream, write_options=options)
+            else:
+                pa_csv.write_csv(table, f, write_options=options)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "ChainWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def run(
+    input_path,
+    output_path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    columns: Optional[Dict[str, str]] = None,
+    r: float = 0.0,
+    q: float = 0.0,
+    market_days_year: int = 252,
+) -> int:
+    """Stream input_path through enrich into output_path, returning the number of rows written"""
+    chunks = process(read_chunks(input_path, chunksize, columns), r=r, q=q, market_days_year=market_days_year)
+    with ChainWriter(output_path) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return writer.rows
+
+
+# -----------------------------------------------------------------------------
+# command line
+
+
+def _column_mapping(value: str):
+    source, _, target = value.partition("=")
+    if not source or not target:
+        raise argparse.ArgumentTypeError(f"expected FILE_COLUMN=NAME, got {value!r}")
+    return source, target
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="finx-chain",
+        description="Add mid, implied vol and greeks to an option chain, streaming it chunk by chunk",
+    )
+    parser.add_argument("input", help=".csv or .parquet chain")
+    parser.add_argument("output", help=".csv or .parquet destination, overwritten")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk")
+    parser.add_argument("--r", type=float, default=0.0, help="risk free rate, when the chain has no r column")
+    parser.add_argument("--q", type=float, default=0.0, help="dividend yield, when the chain has no q column")
+    parser.add_argument("--market-days-year", type=int, default=252, help="converts a days column to T")
+    parser.add_argument(
+        "--column",
+        type=_column_mapping,
+        action="append",
+        default=[],
+        metavar="FILE_COLUMN=NAME",
+        help="rename an input column, e.g. --column strike=K (repeatable)",
+    )
+    args = parser.parse_args(argv)
+
+    rows = run(
+        args.input,
+        args.output,
+        chunksize=args.chunksize,
+        columns=dict(args.column),
+        r=args.r,
+        q=args.q,
+        market_days_year=args.market_days_year,
+    )
+    print(f"wrote {rows} rows to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
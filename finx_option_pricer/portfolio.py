@@ -0,0 +1,318 @@
+"""Live book of option positions with incrementally maintained greeks
+
+Legs are grouped by underlying. Each group keeps its legs as an OptionBook next to the per contract value and
+greeks from the last pricing pass, and a leg is repriced only when something it depends on has changed:
+
+    quantity change     nothing is repriced, the group's totals are re-summed
+    new leg             only the new leg is priced
+    spot / vol tick     only the legs on that underlying, in one vectorized pass per pricing model
+
+Repricing is lazy, so a burst of updates between two reads costs a single pass.
+
+    from finx_option_pricer.portfolio import DOLLAR, Portfolio
+
+    book = Portfolio(multiplier=100)
+    leg = book.add("SPY", OptionPosition(option=Option(S=410, K=400, ...), quantity=-2))
+    book.update("SPY", S=412.5)
+    book.greeks(DOLLAR)  # PortfolioGreeks(value=..., delta=..., gamma=..., vega=..., theta=..., rho=...)
+    book.set_quantity(leg, -3)
+"""
+
+from dataclasses import fields
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+import finx_option_pricer.bsm as bsm
+from finx_option_pricer import profiling
+from finx_option_pricer.option_book import OptionBook
+from finx_option_pricer.option_plot import MARKET_DAYS_PER_YEAR
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# units greeks are reported in
+# RAW: model units, delta in shares, gamma per 1.00 of spot, vega per 1.00 of vol, theta per year, rho per 1.00 of rate
+# DOLLAR: delta * S (dollar delta), gamma * S^2 / 100 (change in dollar delta for a 1% move), vega per vol point,
+#   theta per day (of days_per_year), rho per 1% of rate
+# PERCENT: DOLLAR as a percent of the underlying notional, S * |quantity| * multiplier, e.g. 50 for a long ATM call
+RAW = "raw"
+DOLLAR = "dollar"
+PERCENT = "percent"
+UNITS = (RAW, DOLLAR, PERCENT)
+
+
+class PortfolioGreeks(NamedTuple):
+    value: float
+    delta: float
+    gamma: float
+    vega: float
+    theta: float
+    rho: float
+
+
+# rows of the per contract arrays, every bsm.Greeks field so vanna, volga and charm are at hand for a Taylor expansion
+# (see finx_option_pricer.repricer), the first len(_COLUMNS) rows are the ones reported
+_FIELDS = bsm.Greeks._fields
+_COLUMNS = PortfolioGreeks._fields
+
+
+def to_units(raw: np.ndarray, S, size, units: str, days_per_year: float = MARKET_DAYS_PER_YEAR) -> np.ndarray:
+    """Convert RAW (value, delta, gamma, vega, theta, rho) rows of positions to units
+
+    Args:
+        raw (np.ndarray): shape (len(_COLUMNS), ...), per contract values * quantity * multiplier.
+        S: spot of each position, broadcastable against raw[0].
+        size: |quantity| * multiplier of each position, only used for PERCENT.
+        units (str): RAW, DOLLAR or PERCENT.
+        days_per_year (float, optional): theta's DOLLAR unit is one day of these. Defaults to 252.
+    """
+    if units not in UNITS:
+        raise ValueError(f"units must be one of {UNITS}, units={units!r}")
+    if units == RAW:
+        return raw
+    out = np.array(raw, dtype=float)
+    out[1] *= S
+    out[2] *= np.square(S) / 100
+    out[3] /= 100
+    out[4] /= days_per_year
+    out[5] /= 100
+    if units == PERCENT:
+        notional = np.asarray(S * size, dtype=float)
+        out *= np.divide(100, notional, out=np.zeros_like(notional), where=notional > 0)
+    return out
+
+
+class _Group:
+    """Legs on one underlying and their per contract value and greeks, shape (len(_FIELDS), n_legs)"""
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.index: Dict[int, int] = {}
+        self.legs: Optional[OptionBook] = None
+        self.per_contract = np.empty((len(_FIELDS), 0))
+        self.stale = np.empty(0, dtype=bool)
+        self.totals: Optional[tuple] = None  # (raw, dollar, notional) summed over the legs, None when outdated
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _concat(books: Sequence[OptionBook]) -> OptionBook:
+    return OptionBook(**{f.name: np.concatenate([getattr(b, f.name) for b in books]) for f in fields(OptionBook)})
+
+
+class Portfolio:
+    """Option positions grouped by underlying, with per leg and aggregated value and greeks
+
+    Legs are identified by the int returned from add() / extend(). Every leg on an underlying shares its spot, set
+    with update().
+
+    Args:
+        multiplier (float, optional): contract multiplier applied to every quantity. Defaults to 1.0.
+        days_per_year (int, optional): days theta is spread over in DOLLAR and PERCENT units. Defaults to 252.
+    """
+
+    def __init__(self, multiplier: float = 1.0, days_per_year: int = MARKET_DAYS_PER_YEAR):
+        self.multiplier = multiplier
+        self.days_per_year = days_per_year
+        self._groups: Dict[str, _Group] = {}
+        self._underlying: Dict[int, str] = {}  # leg -> underlying
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._underlying)
+
+    def __contains__(self, leg: int) -> bool:
+        return leg in self._underlying
+
+    @property
+    def underlyings(self) -> List[str]:
+        return list(self._groups)
+
+    def legs(self, underlying: Optional[str] = None) -> List[int]:
+        """Leg ids, of one underlying or all of them"""
+        if underlying is not None:
+            return list(self._groups[underlying].ids)
+        return list(self._underlying)
+
+    # -------------------------------------------------------------------------
+    # updates
+
+    @classmethod
+    def from_positions(cls, positions: Dict[str, List], **kwargs) -> "Portfolio":
+        """Build from {underlying: [OptionPosition or FrozenOptionPosition, ...]}"""
+        portfolio = cls(**kwargs)
+        for underlying, legs in positions.items():
+            portfolio.extend(underlying, legs)
+        return portfolio
+
+    def add(self, underlying: str, position) -> int:
+        """Add an OptionPosition (or FrozenOptionPosition) on underlying, returning its leg id"""
+        return self.extend(underlying, [position])[0]
+
+    def extend(self, underlying: str, positions: List) -> List[int]:
+        """Add positions on underlying, returning their leg ids. Only the new legs are priced."""
+        if not positions:
+            return []
+        group = self._groups.setdefault(underlying, _Group())
+        new = OptionBook.from_positions(positions)
+        ids = list(range(self._next_id, self._next_id + len(new)))
+        self._next_id += len(new)
+
+        group.legs = new if group.legs is None else _concat([group.legs, new])
+        group.per_contract = np.concatenate([group.per_contract, np.full((len(_FIELDS), len(new)), np.nan)], axis=1)
+        group.stale = np.concatenate([group.stale, np.ones(len(new), dtype=bool)])
+        group.index.update((leg, i) for i, leg in enumerate(ids, start=len(group.ids)))
+        group.ids.extend(ids)
+        group.totals = None
+        self._underlying.update((leg, underlying) for leg in ids)
+        return ids
+
+    def remove(self, leg: int) -> None:
+        underlying = self._underlying.pop(leg)
+        group = self._groups[underlying]
+        if len(group) == 1:
+            del self._groups[underlying]
+            return
+        keep = np.ones(len(group), dtype=bool)
+        keep[group.index[leg]] = False
+        group.legs = group.legs[keep]
+        group.per_contract = group.per_contract[:, keep]
+        group.stale = group.stale[keep]
+        group.ids.remove(leg)
+        group.index = {leg: i for i, leg in enumerate(group.ids)}
+        group.totals = None
+
+    def set_quantity(self, leg: int, quantity: float) -> None:
+        """Change a leg's quantity, which re-sums its underlying's totals without repricing anything"""
+        group = self._groups[self._underlying[leg]]
+        quantities = group.legs.quantity.copy()
+        quantities[group.index[leg]] = quantity
+        group.legs.quantity = quantities
+        group.totals = None
+
+    def update(
+        self,
+        underlying: str,
+        S: Optional[float] = None,
+        sigma=None,
+        vol_shift: Optional[float] = None,
+        days: Optional[float] = None,
+    ) -> None:
+        """Move the spot, vols and/or time of one underlying, its legs are repriced on the next read
+
+        Args:
+            underlying (str): the underlying that ticked, legs on other underlyings are untouched.
+            S (float, optional): new spot price. Defaults to None, unchanged.
+            sigma (float or array, optional): new vol, a scalar for every leg or one per leg in legs(underlying)
+                order. Defaults to None, unchanged.
+            vol_shift (float, optional): added to every leg's vol, after sigma is applied. Defaults to None.
+            days (float, optional): days (of days_per_year) that have passed, taken off every leg's T. Defaults to
+                None.
+        """
+        group = self._groups[underlying]
+        legs, n = group.legs, len(group)
+        if S is not None:
+            legs.S = np.full(n, float(S))
+        if sigma is not None:
+            legs.sigma = np.array(np.broadcast_to(np.asarray(sigma, dtype=float), (n,)))
+        if vol_shift is not None:
+            legs.sigma = legs.sigma + vol_shift
+        if days is not None:
+            legs.T = legs.T - days / self.days_per_year
+        if S is not None or sigma is not None or vol_shift is not None or days is not None:
+            group.stale[:] = True
+            group.totals = None
+
+    # -------------------------------------------------------------------------
+    # pricing
+
+    def _reprice(self, group: _Group) -> None:
+        """Price the group's stale legs in one pass per pricing model"""
+        if not group.stale.any():
+            return
+        with profiling.span("portfolio.reprice"):
+            if group.stale.all():
+                idx, legs = slice(None), group.legs
+            else:
+                idx = np.flatnonzero(group.stale)
+                legs = group.legs[idx]
+            greeks = legs.greeks()
+            group.per_contract[:, idx] = greeks
+            group.stale[:] = False
+        group.totals = None
+
+    def _positions(self, group: _Group, units: str) -> np.ndarray:
+        """Per leg value and greeks of the group's positions in units, shape (len(_COLUMNS), n_legs)"""
+        self._reprice(group)
+        legs = group.legs
+        raw = group.per_contract[: len(_COLUMNS)] * (legs.quantity * self.multiplier)
+        return to_units(raw, legs.S, self._size(legs), units, self.days_per_year)
+
+    def _size(self, legs: OptionBook) -> np.ndarray:
+        return np.abs(legs.quantity) * self.multiplier
+
+    def _totals(self, group: _Group) -> tuple:
+        self._reprice(group)
+        if group.totals is None:
+            raw, dollar = self._positions(group, RAW), self._positions(group, DOLLAR)
+            group.totals = (raw.sum(axis=1), dollar.sum(axis=1), (group.legs.S * self._size(group.legs)).sum())
+        return group.totals
+
+    # -------------------------------------------------------------------------
+    # results
+
+    def spot(self, underlying: str) -> float:
+        """Spot of the underlying's first leg, after update(S=...) every leg's"""
+        return float(self._groups[underlying].legs.S[0])
+
+    def position_greeks(self, underlying: str) -> bsm.Greeks:
+        """Every bsm.Greeks field (vanna, volga and charm too) summed over the underlying's positions, RAW units"""
+        group = self._groups[underlying]
+        self._reprice(group)
+        totals = group.per_contract @ (group.legs.quantity * self.multiplier)
+        return bsm.Greeks(*totals.tolist())
+
+    def notional(self, underlying: Optional[str] = None) -> float:
+        """Sum of S * |quantity| * multiplier, what PERCENT units are relative to"""
+        groups = self._groups.values() if underlying is None else [self._groups[underlying]]
+        return float(sum((group.legs.S * self._size(group.legs)).sum() for group in groups))
+
+    def greeks(self, units: str = RAW, underlying: Optional[str] = None) -> PortfolioGreeks:
+        """Value and greeks summed over every leg, or over one underlying's legs
+
+        Only underlyings with changes since the last read are repriced / re-summed.
+        """
+        if units not in UNITS:
+            raise ValueError(f"units must be one of {UNITS}, units={units!r}")
+        groups = self._groups.values() if underlying is None else [self._groups[underlying]]
+        raw, dollar, notional = np.zeros(len(_COLUMNS)), np.zeros(len(_COLUMNS)), 0.0
+        for group in groups:
+            group_raw, group_dollar, group_notional = self._totals(group)
+            raw, dollar, notional = raw + group_raw, dollar + group_dollar, notional + group_notional
+        if units == RAW:
+            totals = raw
+        elif units == DOLLAR:
+            totals = dollar
+        else:
+            totals = dollar * 100 / notional if notional else np.zeros(len(_COLUMNS))
+        return PortfolioGreeks(*totals.tolist())
+
+    def leg_greeks(self, leg: int, units: str = RAW) -> PortfolioGreeks:
+        """Value and greeks of one leg's position (per contract values * quantity * multiplier in RAW units)"""
+        group = self._groups[self._underlying[leg]]
+        return PortfolioGreeks(*self._positions(group, units)[:, group.index[leg]].tolist())
+
+    def to_frame(self, units: str = RAW) -> "pd.DataFrame":
+        """One row per leg, indexed by leg id, with its underlying, quantity, value and greeks in units"""
+        import pandas as pd
+
+        frames = []
+        for underlying, group in self._groups.items():
+            columns = dict(underlying=underlying, quantity=group.legs.quantity)
+            columns.update(zip(_COLUMNS, self._positions(group, units)))
+            frames.append(pd.DataFrame(columns, index=pd.Index(group.ids, name="leg")))
+        if not frames:
+            return pd.DataFrame(columns=["underlying", "quantity", *_COLUMNS], index=pd.Index([], name="leg"))
+        return pd.concat(frames)
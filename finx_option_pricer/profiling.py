@@ -0,0 +1,221 @@
+"""Opt-in instrumentation of the pricing hot paths
+
+When a profile is active, bsm counts kernel calls and the elements they price, OptionsPlot and calc_straddle_iv
+time their phases as spans and the implied vol solvers record how many iterations each quote took. With no
+profile active every hook returns after a single check, so the instrumentation can stay in the hot paths.
+
+    import finx_option_pricer
+
+    with finx_option_pricer.profile() as p:
+        op_plot.gen_value_df_timeincrementing(30)
+    print(p.summary())
+    p.export_chrome_trace("trace.json")  # open in chrome://tracing or https://ui.perfetto.dev
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+
+class KernelStats(NamedTuple):
+    calls: int
+    elements: int  # total elements priced over all calls, the broadcast size of the inputs
+
+
+class SpanStats(NamedTuple):
+    calls: int
+    total: float  # seconds
+    max: float  # seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+
+class Span(NamedTuple):
+    name: str
+    start: int  # ns since the profile began
+    duration: int  # ns
+    thread: int
+
+
+class Profiler:
+    """Counters, spans and iteration histograms collected while a profile is active
+
+    Args:
+        max_spans (int, optional): individual spans kept for the trace export, later ones still count towards
+            span_stats. Defaults to 1_000_000.
+    """
+
+    def __init__(self, max_spans: int = 1_000_000):
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped_spans = 0
+        self._kernels: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        self._span_stats: Dict[str, List] = {}
+        self._iterations: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self.elapsed = 0.0  # seconds the profile was active, set when it ends
+
+    def count(self, kernel: str, elements: int) -> None:
+        with self._lock:
+            counter = self._kernels[kernel]
+            counter[0] += 1
+            counter[1] += elements
+
+    def record_span(self, name: str, start: int, end: int) -> None:
+        """Record a span from perf_counter_ns timestamps"""
+        duration = end - start
+        with self._lock:
+            stats = self._span_stats.setdefault(name, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+            if len(self.spans) < self.max_spans:
+                self.spans.append(Span(name, start - self._origin, duration, threading.get_ident()))
+            else:
+                self.dropped_spans += 1
+
+    def record_iterations(self, solver: str, iterations: np.ndarray) -> None:
+        """Add solver iteration counts (one per quote, 0 for quotes that weren't iterated on) to a histogram"""
+        counts = np.bincount(np.ravel(iterations).astype(np.int64))
+        with self._lock:
+            hist = self._iterations.get(solver)
+            if hist is None:
+                self._iterations[solver] = counts
+            else:
+                size = max(hist.size, counts.size)
+                self._iterations[solver] = np.pad(hist, (0, size - hist.size)) + np.pad(counts, (0, size - counts.size))
+
+    def kernel_stats(self) -> Dict[str, KernelStats]:
+        with self._lock:
+            return {name: KernelStats(*counter) for name, counter in self._kernels.items()}
+
+    def span_stats(self) -> Dict[str, SpanStats]:
+        with self._lock:
+            return {
+                name: SpanStats(calls, total / 1e9, peak / 1e9)
+                for name, (calls, total, peak) in self._span_stats.items()
+            }
+
+    def iteration_histograms(self) -> Dict[str, np.ndarray]:
+        """{solver: counts}, counts[i] is the number of quotes that took i iterations"""
+        with self._lock:
+            return {name: hist.copy() for name, hist in self._iterations.items()}
+
+    def summary(self) -> str:
+        """Human readable tables of the spans, kernels and iteration histograms"""
+        lines = [f"profile: {self.elapsed * 1e3:.3f} ms"]
+
+        spans = sorted(self.span_stats().items(), key=lambda item: -item[1].total)
+        if spans:
+            lines += ["", f"{'span':<40} {'calls':>8} {'total ms':>10} {'mean ms':>10} {'max ms':>10}"]
+            for name, s in spans:
+                lines.append(
+                    f"{name:<40} {s.calls:>8} {s.total * 1e3:>10.3f} {s.mean * 1e3:>10.3f} {s.max * 1e3:>10.3f}"
+                )
+
+        kernels = sorted(self.kernel_stats().items(), key=lambda item: -item[1].elements)
+        if kernels:
+            lines += ["", f"{'kernel':<40} {'calls':>8} {'elements':>12}"]
+            for name, k in kernels:
+                lines.append(f"{name:<40} {k.calls:>8} {k.elements:>12}")
+
+        for name, hist in self.iteration_histograms().items():
+            total = int(hist.sum())
+            mean = float(np.arange(hist.size) @ hist) / total if total else 0.0
+            lines += ["", f"{name} iterations: {total} quotes, mean {mean:.2f}, max {hist.size - 1}"]
+            for i in np.flatnonzero(hist):
+                lines.append(f"{i:>6} {hist[i]:>10}")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> Dict:
+        """Spans as complete ("X") events of the Chrome trace event format, counters and histograms as metadata"""
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                dict(
+                    name=s.name,
+                    cat=s.name.split(".")[0],
+                    ph="X",
+                    ts=s.start / 1e3,
+                    dur=s.duration / 1e3,
+                    pid=pid,
+                    tid=s.thread,
+                )
+                for s in self.spans
+            ]
+        kernels = {name: k._asdict() for name, k in self.kernel_stats().items()}
+        iterations = {name: hist.tolist() for name, hist in self.iteration_histograms().items()}
+        return dict(
+            traceEvents=events,
+            displayTimeUnit="ms",
+            otherData=dict(kernels=kernels, iterations=iterations, dropped_spans=self.dropped_spans),
+        )
+
+    def export_chrome_trace(self, path) -> None:
+        import json
+
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+_profiler: Optional[Profiler] = None
+_NO_SPAN = nullcontext()
+
+
+@contextmanager
+def profile(max_spans: int = 1_000_000):
+    """Collect counters, spans and iteration histograms for the duration of the block
+
+    Profiles don't nest: an inner profile collects on its own and the outer one resumes when it ends.
+    """
+    global _profiler
+    outer, profiler = _profiler, Profiler(max_spans=max_spans)
+    _profiler = profiler
+    try:
+        yield profiler
+    finally:
+        profiler.elapsed = (time.perf_counter_ns() - profiler._origin) / 1e9
+        _profiler = outer
+
+
+def get_profiler() -> Optional[Profiler]:
+    """The active profiler, or None"""
+    return _profiler
+
+
+def count(kernel: str, *terms) -> None:
+    """Count a call to kernel over the broadcast of terms"""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.count(kernel, np.broadcast(*terms).size if terms else 1)
+
+
+def record_iterations(solver: str, iterations) -> None:
+    profiler = _profiler
+    if profiler is not None:
+        profiler.record_iterations(solver, iterations)
+
+
+@contextmanager
+def _timed(profiler: Profiler, name: str):
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        profiler.record_span(name, start, time.perf_counter_ns())
+
+
+def span(name: str):
+    """Context manager timing its block as `name`, a shared no-op when no profile is active"""
+    profiler = _profiler
+    if profiler is None:
+        return _NO_SPAN
+    return _timed(profiler, name)
@@ -0,0 +1,215 @@
+"""Tick driven repricing of a Portfolio: a Taylor expansion for small moves, a full reprice past an error bound
+
+Each underlying is anchored at its last full reprice, where its positions' value and greeks (vanna, volga and
+charm included) are summed. A tick moving spot, vol and time by dS, dv and dt is then answered from the anchor
+
+    value = V + delta dS + gamma dS^2 / 2 + vega dv + vanna dS dv + volga dv^2 / 2 + theta dt + charm dS dt
+    delta = delta + gamma dS + vanna dv + charm dt
+    vega = vega + vanna dS + volga dv
+
+which is a handful of float operations, however many legs the underlying has. Once the move away from the anchor
+goes past max_spot_move, max_vol_move or max_days the underlying's legs are fully repriced (one vectorized pass,
+see Portfolio) and it is re-anchored there. Other underlyings are never touched by a tick.
+
+    repricer = Repricer(book, units=DOLLAR, max_spot_move=0.005)
+    for result in repricer.run(feed):  # Tick(underlying, S, sigma, days) or plain tuples
+        result.pnl, result.greeks, result.full, result.latency
+
+    async for result in repricer.stream(async_feed):
+        ...
+
+    repricer.stats()  # RepricerStats(ticks=..., full_reprices=..., mean=..., p50=..., p99=..., max=...)
+"""
+
+import time
+from collections import deque
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+)
+
+import numpy as np
+
+import finx_option_pricer.bsm as bsm
+from finx_option_pricer.portfolio import (
+    DOLLAR,
+    PERCENT,
+    RAW,
+    UNITS,
+    Portfolio,
+    PortfolioGreeks,
+    to_units,
+)
+
+
+class Tick(NamedTuple):
+    underlying: str
+    S: float
+    # reference vol of the underlying, e.g. its ATM vol. Every leg's vol moves by its change (a parallel shift), the
+    # first tick with a sigma only sets the reference. None leaves vols where they are.
+    sigma: Optional[float] = None
+    days: Optional[float] = None  # days since the repricer started (or was reset), None leaves time where it is
+
+
+class TickResult(NamedTuple):
+    tick: Tick
+    pnl: float  # book value minus its value when the repricer started (or was reset)
+    greeks: PortfolioGreeks  # the whole book, in the repricer's units
+    full: bool  # True when the tick fully repriced its underlying
+    latency: float  # seconds spent on the tick
+
+
+class RepricerStats(NamedTuple):
+    ticks: int
+    full_reprices: int
+    # seconds per tick, over the last latency_window ticks
+    mean: float
+    p50: float
+    p99: float
+    max: float
+
+
+class _Anchor:
+    """An underlying at its last full reprice"""
+
+    __slots__ = ("S", "sigma", "days", "greeks", "size")
+
+    def __init__(self, S: float, sigma: Optional[float], days: float, greeks: bsm.Greeks, size: float):
+        self.S = S
+        self.sigma = sigma
+        self.days = days
+        self.greeks = greeks  # RAW position greeks summed over the underlying's legs
+        self.size = size  # sum of |quantity| * multiplier, the notional is size * S
+
+
+class Repricer:
+    """Streams ticks through a Portfolio, see the module docstring
+
+    Args:
+        portfolio (Portfolio): the book. Add legs or change quantities through it, then call reset().
+        units (str, optional): RAW, DOLLAR or PERCENT, see finx_option_pricer.portfolio. Defaults to RAW.
+        max_spot_move (float, optional): relative spot move from the anchor past which the underlying is fully
+            repriced. Defaults to 0.01.
+        max_vol_move (float, optional): vol move (0.01 => 1 vol point) past which it is fully repriced. Defaults
+            to 0.01.
+        max_days (float, optional): days past which it is fully repriced. Defaults to 1.0.
+        latency_window (int, optional): latest ticks kept for stats(). Defaults to 100_000.
+    """
+
+    def __init__(
+        self,
+        portfolio: Portfolio,
+        units: str = RAW,
+        max_spot_move: float = 0.01,
+        max_vol_move: float = 0.01,
+        max_days: float = 1.0,
+        latency_window: int = 100_000,
+    ):
+        if units not in UNITS:
+            raise ValueError(f"units must be one of {UNITS}, units={units!r}")
+        self.portfolio = portfolio
+        self.units = units
+        self.max_spot_move = max_spot_move
+        self.max_vol_move = max_vol_move
+        self.max_days = max_days
+        self._latencies = deque(maxlen=latency_window)
+        self.ticks = 0
+        self.full_reprices = 0
+        self.reset()
+
+    def reset(self) -> None:
+        """Anchor every underlying at the portfolio as it is now, P&L starts again from zero"""
+        self._anchors: Dict[str, _Anchor] = {}
+        self._raw: Dict[str, np.ndarray] = {}  # latest RAW (value, delta, gamma, vega, theta, rho) per underlying
+        self._dollar: Dict[str, np.ndarray] = {}
+        self._notional: Dict[str, float] = {}
+        for underlying in self.portfolio.underlyings:
+            self._anchor(underlying, self.portfolio.spot(underlying), None, 0.0)
+        self._start_value = sum(raw[0] for raw in self._raw.values())
+
+    def _anchor(self, underlying: str, S: float, sigma: Optional[float], days: float) -> None:
+        """Take the underlying's position greeks, as priced by the portfolio, as its new expansion point"""
+        greeks = self.portfolio.position_greeks(underlying)
+        size = self.portfolio.notional(underlying) / S
+        self._anchors[underlying] = anchor = _Anchor(S, sigma, days, greeks, size)
+        self._store(underlying, anchor, np.array(greeks[: len(PortfolioGreeks._fields)]), S)
+
+    def _store(self, underlying: str, anchor: _Anchor, raw: np.ndarray, S: float) -> None:
+        self._raw[underlying] = raw
+        if self.units != RAW:
+            self._dollar[underlying] = to_units(raw, S, 1.0, DOLLAR, self.portfolio.days_per_year)
+            self._notional[underlying] = anchor.size * S
+
+    # -------------------------------------------------------------------------
+    # ticks
+
+    def on_tick(self, underlying: str, S: float, sigma: Optional[float] = None, days: Optional[float] = None):
+        """Apply one update, returning the book's P&L and greeks as a TickResult"""
+        start = time.perf_counter()
+        tick = Tick(underlying, S, sigma, days)
+        anchor = self._anchors[underlying]
+        if sigma is not None and anchor.sigma is None:
+            anchor.sigma = sigma
+
+        dS = S - anchor.S
+        dv = 0.0 if sigma is None else sigma - anchor.sigma
+        dt = 0.0 if days is None else days - anchor.days
+        full = abs(dS) > self.max_spot_move * anchor.S or abs(dv) > self.max_vol_move or abs(dt) > self.max_days
+        if full:
+            self._reprice(underlying, tick, dv, dt)
+        else:
+            g, dt = anchor.greeks, dt / self.portfolio.days_per_year
+            spot_term = (g.delta + 0.5 * g.gamma * dS + g.charm * dt) * dS
+            vol_term = (g.vega + g.vanna * dS + 0.5 * g.volga * dv) * dv
+            delta = g.delta + g.gamma * dS + g.vanna * dv + g.charm * dt
+            vega = g.vega + g.vanna * dS + g.volga * dv
+            raw = np.array([g.value + spot_term + vol_term + g.theta * dt, delta, g.gamma, vega, g.theta, g.rho])
+            self._store(underlying, anchor, raw, S)
+
+        pnl, greeks = self._book()
+        latency = time.perf_counter() - start
+        self._latencies.append(latency)
+        self.ticks += 1
+        return TickResult(tick=tick, pnl=pnl, greeks=greeks, full=full, latency=latency)
+
+    def _reprice(self, underlying: str, tick: Tick, dv: float, dt: float) -> None:
+        anchor = self._anchors[underlying]
+        self.portfolio.update(underlying, S=tick.S, vol_shift=dv or None, days=dt or None)
+        sigma = anchor.sigma if tick.sigma is None else tick.sigma
+        days = anchor.days if tick.days is None else tick.days
+        self._anchor(underlying, tick.S, sigma, days)
+        self.full_reprices += 1
+
+    def _book(self):
+        """(P&L, greeks) of the whole book from the latest per underlying values"""
+        raw = sum(self._raw.values())
+        pnl = float(raw[0]) - self._start_value
+        if self.units == RAW:
+            return pnl, PortfolioGreeks(*raw.tolist())
+        dollar = sum(self._dollar.values())
+        if self.units == PERCENT:
+            notional = sum(self._notional.values())
+            dollar = dollar * 100 / notional if notional else np.zeros_like(dollar)
+        return pnl, PortfolioGreeks(*dollar.tolist())
+
+    def run(self, ticks: Iterable) -> Iterator[TickResult]:
+        """on_tick() over an iterable of Tick (or (underlying, S, sigma, days) tuples)"""
+        for tick in ticks:
+            yield self.on_tick(*tick)
+
+    async def stream(self, ticks: AsyncIterable) -> AsyncIterator[TickResult]:
+        """on_tick() over an async iterable of Tick (or (underlying, S, sigma, days) tuples)"""
+        async for tick in ticks:
+            yield self.on_tick(*tick)
+
+    def stats(self) -> RepricerStats:
+        latencies = np.array(self._latencies)
+        if not latencies.size:
+            return RepricerStats(self.ticks, self.full_reprices, 0.0, 0.0, 0.0, 0.0)
+        p50, p99 = np.percentile(latencies, [50, 99]).tolist()
+        return RepricerStats(self.ticks, self.full_reprices, float(latencies.mean()), p50, p99, float(latencies.max()))
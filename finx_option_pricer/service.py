@@ -0,0 +1,440 @@
+"""Local asyncio HTTP/JSON pricing service with request micro-batching
+
+One process prices for every tool on the machine (Dash apps, notebooks, risk scripts), so they share a pricing
+cache and their requests are batched together. Contract requests (price, greeks, implied vol) that arrive within
+`window` seconds of each other are concatenated into one vectorized kernel call per pricing model, and the
+results are split back per request. At most `max_pending` requests are in flight; past that the service answers
+503 with a Retry-After header rather than queueing without bound.
+
+    POST /price   {"S": 100, "K": [95, 105], "T": 0.1, "r": 0.01, "sigma": 0.25, "option_type": ["p", "c"]}
+                  -> {"value": [...]}
+    POST /greeks  same fields -> {"value": [...], "delta": [...], ...every bsm.Greeks field}
+    POST /iv      "price" in place of "sigma" -> {"iv": [...], "converged": [...], "iterations": [...]}
+    POST /grid    {"positions": [{"S", "K", "T", "r", "sigma", "quantity", ...}], "spot_range": [90, 110],
+                   "days": 10, ...} -> {"spots": [...], "labels": [...], "values": [[...], ...]}
+    GET  /health, /stats
+
+Contract fields are scalars or lists broadcast against each other, option_type ("c"/"p"), q and algo are optional.
+NaN results (e.g. an unsolvable implied vol) are returned as null. Start it with
+
+    finx-serve --port 8711                  # or python -m finx_option_pricer.service, --unix /tmp/finx.sock
+
+and talk to it with finx_option_pricer.client.PricingClient. In process, e.g. in tests,
+
+    with background(PricingService(), port=0) as (host, port):
+        PricingClient(host, port).price(...)
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import finx_option_pricer.bsm as bsm
+import finx_option_pricer.models as models
+from finx_option_pricer import cache
+from finx_option_pricer.client import DEFAULT_HOST, DEFAULT_PORT, ServiceError
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_plot import OptionPosition, OptionsPlot
+
+# requests with more contracts than this skip the response cache, their keys would cost more than they save
+CACHE_MAX_CONTRACTS = 1_000
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class MicroBatcher:
+    """Merges the requests for one kernel that arrive within `window` seconds into a single call
+
+    compute(columns) takes {name: 1-d array} with every request's arrays concatenated and returns a tuple of
+    arrays (or one array) of the same length, which is split back per request. Calls run one at a time on
+    executor, so requests arriving while a batch is computed form the next batch.
+    """
+
+    def __init__(self, compute: Callable, executor, window: float = 0.002, max_batch: int = 100_000):
+        self.compute = compute
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.requests = 0
+        self.contracts = 0
+        self._pending: List[Tuple[Dict[str, np.ndarray], int, asyncio.Future]] = []
+        self._size = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, columns: Dict[str, np.ndarray]):
+        loop = asyncio.get_running_loop()
+        n = len(next(iter(columns.values())))
+        future = loop.create_future()
+        self._pending.append((columns, n, future))
+        self._size += n
+        if self._size >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._size = self._pending, [], 0
+        if pending:
+            asyncio.ensure_future(self._run(pending))
+
+    async def _run(self, pending) -> None:
+        columns = {name: np.concatenate([c[name] for c, _, _ in pending]) for name in pending[0][0]}
+        self.batches += 1
+        self.requests += len(pending)
+        self.contracts += len(next(iter(columns.values())))
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, self.compute, columns)
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        end = 0
+        for _, n, future in pending:
+            start, end = end, end + n
+            if not future.done():
+                if isinstance(result, tuple):
+                    future.set_result(type(result)(*[x[start:end] for x in result]))
+                else:
+                    future.set_result(result[start:end])
+
+    def stats(self) -> Dict:
+        return dict(batches=self.batches, requests=self.requests, contracts=self.contracts)
+
+
+# -----------------------------------------------------------------------------
+# request parsing and kernels
+
+
+def _contracts(request: Dict, fields: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+    """Broadcast the request's contract fields to 1-d arrays, plus is_call and algo_code"""
+    if not isinstance(request, dict):
+        raise ServiceError(400, "the request body must be a JSON object")
+    missing = [f for f in fields if f not in request]
+    if missing:
+        raise ServiceError(400, f"missing fields: {', '.join(missing)}")
+    try:
+        columns = {f: np.asarray(request[f], dtype=float) for f in fields}
+        columns["q"] = np.asarray(request.get("q", 0.0), dtype=float)
+        columns["is_call"] = bsm.call_mask(request.get("option_type", "c"))
+        algo = np.asarray(request.get("algo", "bsm"))
+        codes = {a: models.model_code(a) for a in np.unique(algo).tolist()}
+        columns["algo_code"] = np.vectorize(codes.__getitem__, otypes=[np.uint8])(algo)
+        shape = np.broadcast(*columns.values()).shape
+    except (TypeError, ValueError) as e:
+        raise ServiceError(400, str(e)) from None
+    if len(shape) > 1:
+        raise ServiceError(400, f"contract fields must be scalars or lists, got shape {shape}")
+    n = shape[0] if shape else 1
+    return {name: np.ascontiguousarray(np.broadcast_to(a, (n,))) for name, a in columns.items()}
+
+
+_CONTRACT = ("S", "K", "T", "r", "sigma")
+_QUOTE = ("price", "S", "K", "T", "r")
+
+
+def _value(c: Dict[str, np.ndarray]) -> np.ndarray:
+    args = (c["S"], c["K"], c["T"], c["r"], c["sigma"], c["is_call"], c["q"])
+    return models.evaluate(c["algo_code"], "value", *args)
+
+
+def _greeks(c: Dict[str, np.ndarray]) -> bsm.Greeks:
+    args = (c["S"], c["K"], c["T"], c["r"], c["sigma"], c["is_call"], c["q"])
+    return models.evaluate(c["algo_code"], "greeks", *args)
+
+
+def _implied_vol(c: Dict[str, np.ndarray]):
+    args = (c["price"], c["S"], c["K"], c["T"], c["r"], c["is_call"], c["q"])
+    return models.evaluate(c["algo_code"], "implied_vol", *args)
+
+
+def _json_list(x: np.ndarray) -> List:
+    """tolist() with NaN as None, JSON has no NaN"""
+    values = np.asarray(x).tolist()
+    if np.asarray(x).dtype.kind == "f":
+        return [None if v != v else v for v in values]
+    return values
+
+
+def _plot(request: Dict) -> Tuple[OptionsPlot, tuple]:
+    """The OptionsPlot and value_grid arguments of a /grid request"""
+    try:
+        positions = [
+            OptionPosition(
+                option=Option(**{k: v for k, v in p.items() if k not in ("quantity", "end_sigma")}),
+                quantity=p["quantity"],
+                end_sigma=p.get("end_sigma"),
+            )
+            for p in request["positions"]
+        ]
+        plot = OptionsPlot(
+            option_positions=positions,
+            spot_range=list(request["spot_range"]),
+            strike_interval=request.get("strike_interval", 0.5),
+        )
+        args = (
+            int(request["days"]),
+            int(request.get("step", 1)),
+            bool(request.get("show_final", True)),
+            int(request.get("market_days_year", 252)),
+            bool(request.get("value_relative", True)),
+        )
+    except KeyError as e:
+        raise ServiceError(400, f"missing field: {e.args[0]}") from None
+    except (TypeError, ValueError, AttributeError) as e:
+        raise ServiceError(400, str(e)) from None
+    return plot, args
+
+
+# -----------------------------------------------------------------------------
+# service
+
+
+class PricingService:
+    """The request handlers, micro-batchers and HTTP transport
+
+    Args:
+        window (float, optional): seconds a batch stays open for more requests. Defaults to 0.002.
+        max_batch (int, optional): contracts that close a batch early. Defaults to 100_000.
+        max_pending (int, optional): requests in flight past which new ones get a 503. Defaults to 1_000.
+        max_body (int, optional): largest request body accepted, in bytes. Defaults to 64 MB.
+        cache_size (int, optional): entries of the pricing cache enabled for the process (shared by every
+            client, see finx_option_pricer.cache), None to leave the cache as it is. Defaults to 50_000.
+        cache_ttl (float, optional): seconds cache entries live. Defaults to None.
+    """
+
+    def __init__(
+        self,
+        window: float = 0.002,
+        max_batch: int = 100_000,
+        max_pending: int = 1_000,
+        max_body: int = 64 << 20,
+        cache_size: Optional[int] = 50_000,
+        cache_ttl: Optional[float] = None,
+    ):
+        self.max_pending = max_pending
+        self.max_body = max_body
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.pending = 0
+        self.rejected = 0
+        # one worker, kernels run one batch at a time and the event loop stays free to accept requests
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="finx-pricing")
+        self.batchers = {
+            "value": MicroBatcher(_value, self._executor, window, max_batch),
+            "greeks": MicroBatcher(_greeks, self._executor, window, max_batch),
+            "implied_vol": MicroBatcher(_implied_vol, self._executor, window, max_batch),
+        }
+        self._routes = {
+            ("POST", "/price"): self.price,
+            ("POST", "/greeks"): self.greeks,
+            ("POST", "/iv"): self.implied_vol,
+            ("POST", "/grid"): self.grid,
+            ("GET", "/health"): self.health,
+            ("GET", "/stats"): self.stats,
+        }
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # -------------------------------------------------------------------------
+    # handlers, each takes the decoded JSON request and returns the JSON response
+
+    async def _submit(self, kernel: str, columns: Dict[str, np.ndarray]):
+        """The batched kernel result for columns, served from the pricing cache when it has it"""
+        pricing_cache = cache.get_cache()
+        n = len(columns["S"])
+        if pricing_cache is None or n > CACHE_MAX_CONTRACTS:
+            return await self.batchers[kernel].submit(columns)
+        key = ("service." + kernel,) + pricing_cache.key(*[tuple(a.tolist()) for a in columns.values()])
+        missing = object()
+        result = pricing_cache.get(key, missing)
+        if result is missing:
+            result = await self.batchers[kernel].submit(columns)
+            pricing_cache.put(key, result)
+        return result
+
+    async def price(self, request: Dict) -> Dict:
+        return dict(value=_json_list(await self._submit("value", _contracts(request, _CONTRACT))))
+
+    async def greeks(self, request: Dict) -> Dict:
+        greeks = await self._submit("greeks", _contracts(request, _CONTRACT))
+        return {name: _json_list(x) for name, x in zip(greeks._fields, greeks)}
+
+    async def implied_vol(self, request: Dict) -> Dict:
+        res = await self._submit("implied_vol", _contracts(request, _QUOTE))
+        return dict(iv=_json_list(res.iv), converged=_json_list(res.converged), iterations=_json_list(res.iterations))
+
+    async def grid(self, request: Dict) -> Dict:
+        if not isinstance(request, dict):
+            raise ServiceError(400, "the request body must be a JSON object")
+        plot, args = _plot(request)
+        loop = asyncio.get_running_loop()
+        try:
+            spots, labels, values = await loop.run_in_executor(self._executor, plot.value_grid, *args)
+        except (TypeError, ValueError) as e:
+            raise ServiceError(400, str(e)) from None
+        return dict(spots=_json_list(spots), labels=list(labels), values=[_json_list(row) for row in values])
+
+    async def health(self, request: Dict) -> Dict:
+        return dict(status="ok")
+
+    async def stats(self, request: Dict) -> Dict:
+        pricing_cache = cache.get_cache()
+        return dict(
+            pending=self.pending,
+            rejected=self.rejected,
+            batches={name: batcher.stats() for name, batcher in self.batchers.items()},
+            cache=None if pricing_cache is None else pricing_cache.stats()._asdict(),
+        )
+
+    async def handle(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        """(status, JSON response) for one request, independent of the transport"""
+        handler = self._routes.get((method, path.split("?", 1)[0]))
+        if handler is None:
+            return 404, dict(error=f"no route for {method} {path}")
+        if method == "POST" and self.pending >= self.max_pending:
+            self.rejected += 1
+            return 503, dict(error=f"overloaded, {self.pending} requests in flight")
+        self.pending += 1
+        try:
+            request = json.loads(body) if body else {}
+            return 200, await handler(request)
+        except ServiceError as e:
+            return e.status, dict(error=e.message)
+        except ValueError as e:  # malformed JSON
+            return 400, dict(error=str(e))
+        finally:
+            self.pending -= 1
+
+    # -------------------------------------------------------------------------
+    # HTTP/1.1 transport, keep-alive, JSON bodies with a Content-Length
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str]]]:
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        method, target = request_line.decode("latin-1").split()[:2]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return method, target, headers
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    def _response(self, status: int, payload: Dict, keep_alive: bool) -> bytes:
+        body = json.dumps(payload).encode()
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 503:
+            lines.append("Retry-After: 0.1")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers = request
+                length = int(headers.get("content-length", 0))
+                if length > self.max_body:
+                    writer.write(self._response(413, dict(error=f"body over {self.max_body} bytes"), False))
+                    break
+                status, payload = await self.handle(method, target, await reader.readexactly(length))
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None):
+        """Start listening on host:port (port=0 picks a free one), or on the Unix socket path"""
+        if self.cache_size is not None:
+            cache.enable_cache(maxsize=self.cache_size, ttl=self.cache_ttl)
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._connection, path=path)
+        else:
+            self._server = await asyncio.start_server(self._connection, host=host, port=port)
+        return self._server
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None):
+        server = await self.start(host, port, path)
+        async with server:
+            await server.serve_forever()
+
+
+@contextmanager
+def background(service: PricingService, host: str = DEFAULT_HOST, port: int = 0, path: Optional[str] = None):
+    """Run service on an event loop in a daemon thread for the duration of the block
+
+    Yields the (host, port) it listens on, or path for a Unix socket.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="finx-service", daemon=True)
+    thread.start()
+    try:
+        server = asyncio.run_coroutine_threadsafe(service.start(host, port, path), loop).result()
+        yield path if path is not None else server.sockets[0].getsockname()[:2]
+    finally:
+        asyncio.run_coroutine_threadsafe(service.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="finx-serve", description="Local HTTP/JSON pricing service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="listen on a Unix socket instead of host:port")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="milliseconds a batch waits for requests")
+    parser.add_argument("--max-batch", type=int, default=100_000, help="contracts that close a batch early")
+    parser.add_argument("--max-pending", type=int, default=1_000, help="requests in flight before answering 503")
+    parser.add_argument("--cache-size", type=int, default=50_000, help="pricing cache entries, 0 disables it")
+    parser.add_argument("--cache-ttl", type=float, default=None, help="seconds a cache entry lives")
+    args = parser.parse_args(argv)
+
+    service = PricingService(
+        window=args.window_ms / 1e3,
+        max_batch=args.max_batch,
+        max_pending=args.max_pending,
+        cache_size=args.cache_size or None,
+        cache_ttl=args.cache_ttl,
+    )
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"finx pricing service on {where}", file=sys.stderr)
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
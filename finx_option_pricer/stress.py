@@ -0,0 +1,225 @@
+"""Spot x vol x horizon stress cubes for a list of option positions
+
+Every (spot shock, vol shock, horizon) scenario is valued in one broadcasted pass per pricing model and summed
+over the legs, giving the P&L cube with labeled axes
+
+    spot_shocks  (n_spot,)  relative spot moves, S = S0 * (1 + shock)
+    vol_shocks   (n_vol,)   parallel vol shifts, 0.05 => +5 vol points
+    skew_shocks  (n_vol,)   vol shift per unit of log moneyness, paired with vol_shocks. A leg struck at K moves by
+                            vol_shock + skew_shock * log(K / S0), so a negative skew shock lifts the puts' wing
+    days         (n_days,)  horizons, days passed (of market_days_year)
+
+    from finx_option_pricer.stress import stress_cube
+
+    cube = stress_cube(positions, spot_shocks=np.linspace(-0.2, 0.2, 201), vol_shocks=np.linspace(-0.1, 0.1, 21),
+                       days=range(0, 30, 5))
+    cube.pnl.shape          # (201, 21, 6)
+    cube.sel(spot=-0.1, vol=0.05, days=10)
+    cube.worst()            # worst P&L per horizon
+    cube.var(0.99)          # 99% VaR per horizon over the spot x vol scenarios
+"""
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Sequence, Union
+
+import numpy as np
+
+import finx_option_pricer.models as models
+from finx_option_pricer import profiling
+from finx_option_pricer.option_book import OptionBook
+from finx_option_pricer.vol_surface import VolSurface
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# vols a shock can't push a leg below
+MIN_SIGMA = 1e-4
+# legs that expire by a horizon are valued at this T before their payoff replaces the value
+MIN_T = 1e-10
+# cells valued per chunk of horizons, 8 MB of float64 values
+CHUNK_CELLS = 1_000_000
+
+
+@dataclass
+class StressCube:
+    pnl: np.ndarray  # (n_spot, n_vol, n_days) structure P&L (value - initial_value unless built with relative=False)
+    spot_shocks: np.ndarray  # (n_spot,)
+    vol_shocks: np.ndarray  # (n_vol,)
+    skew_shocks: np.ndarray  # (n_vol,)
+    days: np.ndarray  # (n_days,)
+    initial_value: float
+
+    @property
+    def shape(self):
+        return self.pnl.shape
+
+    def _index(self, axis: str, label) -> Union[int, slice]:
+        """Position of the label nearest to `label` on axis ("spot", "vol" by parallel shock, or "days")"""
+        if label is None:
+            return slice(None)
+        labels = {"spot": self.spot_shocks, "vol": self.vol_shocks, "days": self.days}[axis]
+        return int(np.abs(labels - label).argmin())
+
+    def sel(self, spot: Optional[float] = None, vol: Optional[float] = None, days: Optional[float] = None):
+        """Slice by the nearest labels, axes left as None are kept whole"""
+        return self.pnl[self._index("spot", spot), self._index("vol", vol), self._index("days", days)]
+
+    def _scenarios(self) -> np.ndarray:
+        """(n_spot * n_vol, n_days), the spot x vol scenarios of each horizon"""
+        return self.pnl.reshape(-1, self.pnl.shape[2])
+
+    def worst(self) -> np.ndarray:
+        """Worst P&L over the spot x vol scenarios, per horizon"""
+        return self._scenarios().min(axis=0)
+
+    def worst_scenario(self, days: Optional[float] = None):
+        """(spot_shock, vol_shock, skew_shock, days, pnl) of the worst scenario, of one horizon or of all of them"""
+        d = self._index("days", days)
+        pnl = self.pnl[:, :, d] if days is not None else self.pnl
+        idx = np.unravel_index(pnl.argmin(), pnl.shape)
+        d = d if days is not None else idx[2]
+        i, j = idx[:2]
+        return self.spot_shocks[i], self.vol_shocks[j], self.skew_shocks[j], self.days[d], pnl[idx]
+
+    def quantile(self, q, weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """P&L quantile(s) over the spot x vol scenarios, per horizon, shape (n_days,) or (len(q), n_days)
+
+        Scenarios are equally likely unless weights, shaped (n_spot, n_vol) e.g. from a lognormal density of the
+        spot shocks, are given.
+        """
+        scenarios = self._scenarios()
+        if weights is None:
+            return np.quantile(scenarios, q, axis=0)
+        order = scenarios.argsort(axis=0)
+        w = np.broadcast_to(np.asarray(weights, dtype=float), self.pnl.shape[:2]).ravel()[order]
+        cdf = (np.cumsum(w, axis=0) - 0.5 * w) / w.sum(axis=0)
+        sorted_pnl = np.take_along_axis(scenarios, order, axis=0)
+        q = np.asarray(q, dtype=float)
+        out = np.array([np.interp(q, cdf[:, d], sorted_pnl[:, d]) for d in range(scenarios.shape[1])])
+        return out.T
+
+    def var(self, level: float = 0.95, weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """Value at risk per horizon, the loss not exceeded in `level` of the scenarios (positive is a loss)"""
+        return -self.quantile(1 - level, weights=weights)
+
+    def to_frame(self) -> "pd.DataFrame":
+        """Long format, one row per scenario with columns spot_shock, vol_shock, skew_shock, days and pnl"""
+        import pandas as pd
+
+        i, j, d = np.indices(self.pnl.shape).reshape(3, -1)
+        return pd.DataFrame(
+            dict(
+                spot_shock=self.spot_shocks[i],
+                vol_shock=self.vol_shocks[j],
+                skew_shock=self.skew_shocks[j],
+                days=self.days[d],
+                pnl=self.pnl.ravel(),
+            )
+        )
+
+
+def _leg_sigma(legs: OptionBook, T: np.ndarray, vol_surface: Optional[VolSurface], S: np.ndarray) -> np.ndarray:
+    """Unshocked vol per (horizon, leg, 1, 1 or n_spot): the surface's, or sigma drifting to end_sigma"""
+    if vol_surface is not None:
+        return vol_surface.sigma(legs.K[None, :, None, None], T[:, :, None, None], S)
+    # as OptionsPlot.value_grid, a leg with an end_sigma moves linearly to it over its life
+    fraction = (legs.T - T) / legs.T
+    interpolated = legs.sigma - (legs.sigma - legs.end_sigma) * fraction
+    return np.where(np.isnan(legs.end_sigma), legs.sigma, interpolated)[:, :, None, None]
+
+
+def _leg_values(
+    legs: OptionBook,
+    S: np.ndarray,
+    T: np.ndarray,
+    vol_shocks: np.ndarray,
+    skew_shocks: np.ndarray,
+    vol_surface: Optional[VolSurface],
+) -> np.ndarray:
+    """Value per (horizon, leg, vol, spot) cell, one call per pricing model. Expired legs are worth their payoff.
+
+    Args:
+        S (np.ndarray): shocked spots, shape (1, n_legs, 1, n_spot)
+        T (np.ndarray): time to maturity at each horizon, shape (n_horizons, n_legs)
+    """
+    moneyness = np.log(legs.K / legs.S)[None, :, None, None]
+    sigma = _leg_sigma(legs, T, vol_surface, S)
+    sigma = np.maximum(sigma + vol_shocks[:, None] + skew_shocks[:, None] * moneyness, MIN_SIGMA)
+
+    values = np.empty((T.shape[0], len(legs), vol_shocks.size, S.shape[-1]))
+    for model, idx in models.by_model(legs.algo_code):
+        values[:, idx] = model.value(
+            S[:, idx],
+            legs.K[idx][None, :, None, None],
+            np.maximum(T[:, idx], MIN_T)[:, :, None, None],
+            legs.r[idx][None, :, None, None],
+            sigma[:, idx],
+            legs.is_call[idx][None, :, None, None],
+            legs.q[idx][None, :, None, None],
+        )
+    expired = T <= 0
+    if expired.any():
+        spots, K = S[0, :, 0], legs.K[:, None]
+        payoff = np.where(legs.is_call[:, None], np.maximum(spots - K, 0.0), np.maximum(K - spots, 0.0))
+        values[expired] = payoff[np.nonzero(expired)[1]][:, None, :]
+    return values
+
+
+def stress_cube(
+    option_positions: List,
+    spot_shocks: Sequence[float],
+    vol_shocks: Sequence[float] = (0.0,),
+    days: Sequence[float] = (0,),
+    skew_shocks: Union[float, Sequence[float]] = 0.0,
+    relative: bool = True,
+    market_days_year: int = 252,
+    vol_surface: Optional[VolSurface] = None,
+) -> StressCube:
+    """Value option_positions over every spot x vol x horizon scenario
+
+    Args:
+        option_positions (List): OptionPosition or FrozenOptionPosition legs.
+        spot_shocks (Sequence[float]): relative spot moves, -0.1 => spot 10% lower.
+        vol_shocks (Sequence[float], optional): parallel vol shifts. Defaults to (0.0,).
+        days (Sequence[float], optional): horizons, days passed. Legs expiring by a horizon are worth their
+            payoff. Defaults to (0,).
+        skew_shocks (float or Sequence[float], optional): per vol scenario, the shift per unit of log(K / S0).
+            Defaults to 0.0.
+        relative (bool, optional): P&L against the initial value rather than the value. Defaults to True.
+        market_days_year (int, optional): converts days to years. Defaults to 252.
+        vol_surface (VolSurface, optional): revalue each leg off the surface at the shocked spot and horizon, as
+            OptionsPlot does, before the vol shocks. Defaults to None, sigma (drifting to end_sigma).
+
+    Returns:
+        StressCube: pnl shaped (len(spot_shocks), len(vol_shocks), len(days))
+    """
+    spot_shocks = np.asarray(spot_shocks, dtype=float)
+    vol_shocks = np.asarray(vol_shocks, dtype=float)
+    skew_shocks = np.broadcast_to(np.asarray(skew_shocks, dtype=float), vol_shocks.shape).copy()
+    days = np.asarray(days, dtype=float)
+
+    with profiling.span("stress.cube"):
+        legs = OptionBook.from_positions(option_positions)
+        initial_value = float(legs.position_value.sum())
+        S = (legs.S[:, None] * (1 + spot_shocks))[None, :, None, :]
+
+        # horizons are valued in chunks of about CHUNK_CELLS (horizon, leg, vol, spot) cells, which bounds the
+        # memory of the pass without changing its cost
+        pnl = np.empty((spot_shocks.size, vol_shocks.size, days.size))
+        step = max(1, CHUNK_CELLS // (len(legs) * vol_shocks.size * spot_shocks.size))
+        for start in range(0, days.size, step):
+            chunk = slice(start, start + step)
+            T = legs.T[None, :] - days[chunk, None] / market_days_year
+            values = _leg_values(legs, S, T, vol_shocks, skew_shocks, vol_surface)
+            pnl[:, :, chunk] = np.einsum("dlvs,l->svd", values, legs.quantity)
+        if relative:
+            pnl -= initial_value
+
+    return StressCube(
+        pnl=pnl,
+        spot_shocks=spot_shocks,
+        vol_shocks=vol_shocks,
+        skew_shocks=skew_shocks,
+        days=days,
+        initial_value=initial_value,
+    )
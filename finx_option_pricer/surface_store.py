@@ -0,0 +1,225 @@
+"""On-disk, memory-mapped store for value (and greek) surfaces
+
+A store is a directory holding one .npy file per named surface, each shaped (n_structures, n_rows, n_spots),
+plus the shared axes:
+
+    spots.npy    (n_spots,) underlying prices
+    labels.npy   (n_structures, n_rows) remaining days for each row, NO_LABEL where padded
+    meta.json    structure ids, surface names and (optionally) the parameters each structure was built from
+
+Surfaces are opened with numpy memory maps, so they can be larger than memory, written to concurrently by
+worker processes (each structure is one contiguous block) and reopened by another process, e.g. a Dash
+worker, without recomputing anything.
+
+    from finx_option_pricer.surface_store import SurfaceStore
+
+    store = SurfaceStore.create("surfaces/strangles", spots=np.arange(80, 120.5, 0.5), structures=["a", "b"],
+                                n_rows=31)
+    store.write_plot("a", OptionsPlot(option_positions=..., spot_range=[80, 120]), days=30)
+
+    # elsewhere, later
+    SurfaceStore("surfaces/strangles").frame("a")  # same layout as OptionsPlot.gen_value_df_timeincrementing
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+
+import finx_option_pricer.bsm as bsm
+
+# labels entry for padded rows, real labels are remaining days (>= 0)
+NO_LABEL = -1
+
+VALUE = "value"
+
+_META = "meta.json"
+_SPOTS = "spots.npy"
+_LABELS = "labels.npy"
+
+
+class SurfaceStore:
+    """Labeled, memory-mapped surfaces on disk, see the module docstring for the layout
+
+    Args:
+        path: store directory, created by SurfaceStore.create
+        mode (str, optional): "r" to read, "r+" to also write. Defaults to "r".
+    """
+
+    def __init__(self, path, mode: str = "r"):
+        if mode not in ("r", "r+"):
+            raise ValueError(f"mode must be 'r' or 'r+', mode={mode}")
+        self.path = Path(path)
+        self.mode = mode
+        with open(self.path / _META) as f:
+            meta = json.load(f)
+        self.structures: List[str] = meta["structures"]
+        self.surface_names: List[str] = meta["surfaces"]
+        self._params: Optional[List[Dict]] = meta.get("params")
+        self._index = {s: i for i, s in enumerate(self.structures)}
+
+        self.spots: np.ndarray = np.load(self.path / _SPOTS, mmap_mode="r")
+        self.labels: np.ndarray = np.load(self.path / _LABELS, mmap_mode=mode)
+        self._surfaces = {name: np.load(self._surface_path(name), mmap_mode=mode) for name in self.surface_names}
+
+    @classmethod
+    def create(
+        cls,
+        path,
+        spots: Sequence[float],
+        structures: Sequence,
+        n_rows: int,
+        surfaces: Sequence[str] = (VALUE,),
+        params: Optional[pd.DataFrame] = None,
+        overwrite: bool = False,
+    ) -> "SurfaceStore":
+        """Lay out an empty store (values nan, labels NO_LABEL) and open it for writing
+
+        Args:
+            path: store directory, created if missing
+            spots (Sequence[float]): underlying prices, shared by every structure
+            structures (Sequence): structure ids, converted to str
+            n_rows (int): rows (time steps) per structure, shorter grids are padded
+            surfaces (Sequence[str], optional): names of the surfaces to store. Defaults to ("value",).
+            params (pd.DataFrame, optional): one row per structure, e.g. SweepResult.params. Defaults to None.
+            overwrite (bool, optional): replace an existing store at path. Defaults to False.
+
+        Raises:
+            FileExistsError: if path already holds a store and overwrite is False
+        """
+        path = Path(path)
+        if (path / _META).exists() and not overwrite:
+            raise FileExistsError(f"a surface store already exists at {path}")
+        path.mkdir(parents=True, exist_ok=True)
+
+        structures = [str(s) for s in structures]
+        if len(set(structures)) != len(structures):
+            raise ValueError("structure ids must be unique")
+        spots = np.asarray(spots, dtype=float)
+        shape = (len(structures), n_rows, spots.size)
+
+        np.save(path / _SPOTS, spots)
+        labels = open_memmap(path / _LABELS, mode="w+", dtype=np.int64, shape=shape[:2])
+        labels[:] = NO_LABEL
+        labels.flush()
+        for name in surfaces:
+            values = open_memmap(path / f"{name}.npy", mode="w+", dtype=float, shape=shape)
+            values[:] = np.nan
+            values.flush()
+
+        meta = dict(structures=structures, surfaces=list(surfaces))
+        if params is not None:
+            meta["params"] = json.loads(params.to_json(orient="records"))
+        # meta.json is written last, so a store is only ever opened once its arrays exist
+        tmp = path / f".{_META}.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, path / _META)
+        return cls(path, mode="r+")
+
+    def _surface_path(self, name: str) -> Path:
+        return self.path / f"{name}.npy"
+
+    def __len__(self) -> int:
+        return len(self.structures)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Memory map of a whole surface, shape (n_structures, n_rows, n_spots)"""
+        return self._surfaces[name]
+
+    @property
+    def shape(self) -> tuple:
+        return self.labels.shape + self.spots.shape
+
+    @property
+    def params(self) -> Optional[pd.DataFrame]:
+        """Parameters each structure was built from, when the store was created with them"""
+        if self._params is None:
+            return None
+        return pd.DataFrame(self._params, index=pd.Index(self.structures, name="structure"))
+
+    def index(self, structure) -> int:
+        """Position of a structure id (or a position passed through) along the structure axis"""
+        if isinstance(structure, (int, np.integer)):
+            return int(structure)
+        return self._index[str(structure)]
+
+    def _n_labels(self, i: int) -> int:
+        # rows are filled from the top, padding is always at the end
+        return int(np.count_nonzero(self.labels[i] != NO_LABEL))
+
+    # -------------------------------------------------------------------------
+    # writing
+
+    def write(self, structure, labels: Sequence[int], values: Optional[np.ndarray] = None, **surfaces) -> None:
+        """Store the grid of one structure, labels are shared by every surface of the structure
+
+        Args:
+            structure: structure id or position
+            labels (Sequence[int]): remaining days for each row
+            values (np.ndarray, optional): value surface, shape (len(labels), n_spots)
+            **surfaces: other surfaces by name, e.g. delta=np.ndarray
+        """
+        if values is not None:
+            surfaces[VALUE] = values
+        i = self.index(structure)
+        n = len(labels)
+        for name, grid in surfaces.items():
+            self._surfaces[name][i, :n] = grid
+            self._surfaces[name][i, n:] = np.nan
+        self.labels[i, :n] = labels
+        self.labels[i, n:] = NO_LABEL
+
+    def write_plot(self, structure, op_plot, **grid_kwargs) -> None:
+        """Store OptionsPlot.value_grid(**grid_kwargs) for one structure
+
+        Surfaces named after bsm.Greeks fields (e.g. a store created with surfaces=("value", "delta", "gamma"))
+        are filled from the same pass with OptionsPlot.greek_grid.
+        """
+        greeks = [name for name in self.surface_names if name in bsm.Greeks._fields and name != VALUE]
+        if greeks:
+            strike_range, labels, surfaces = op_plot.greek_grid(greeks=greeks, **grid_kwargs)
+        else:
+            strike_range, labels, values = op_plot.value_grid(**grid_kwargs)
+            surfaces = {VALUE: values}
+        if strike_range.shape != self.spots.shape or not np.allclose(strike_range, self.spots):
+            raise ValueError("the plot's spot_range and strike_interval don't match the store's spots")
+        self.write(structure, labels, **{name: surfaces[name] for name in self.surface_names if name in surfaces})
+
+    def flush(self) -> None:
+        """Push pending writes to disk"""
+        if self.mode == "r+":
+            self.labels.flush()
+            for values in self._surfaces.values():
+                values.flush()
+
+    # -------------------------------------------------------------------------
+    # reading
+
+    def frame(self, structure, surface: str = VALUE, spot_range: Optional[Sequence[float]] = None) -> pd.DataFrame:
+        """One structure's surface as a DataFrame with columns [strikes, days-step1, ..., expiration]
+
+        Same layout as OptionsPlot.gen_value_df_timeincrementing and SweepResult.frame. The label columns are a
+        view onto the memory map, nothing is copied or read until it's used.
+
+        Args:
+            structure: structure id or position
+            surface (str, optional): surface name. Defaults to "value".
+            spot_range (Sequence[float], optional): [low, high] spots to keep. Defaults to all of them.
+        """
+        i = self.index(structure)
+        n = self._n_labels(i)
+        lo, hi = 0, self.spots.size
+        if spot_range is not None:
+            lo = np.searchsorted(self.spots, spot_range[0], "left")
+            hi = np.searchsorted(self.spots, spot_range[1], "right")
+        values = self._surfaces[surface][i, :n, lo:hi]
+        return pd.DataFrame(
+            values.T,
+            index=pd.Index(self.spots[lo:hi], name="strikes", copy=False),
+            columns=self.labels[i, :n].tolist(),
+            copy=False,
+        ).reset_index()
@@ -0,0 +1,271 @@
+"""Scenario sweeps over parameter grids, spread across a process pool
+
+Every combination of the grid is turned into option positions by a structure generator (gen_strangle,
+gen_calendar or any picklable function returning List[OptionPosition]) and valued with OptionsPlot.value_grid.
+Workers write their grids straight into a shared memory array, so nothing but chunk indices is pickled back.
+
+    from finx_option_pricer.option_structures import gen_strangle
+    from finx_option_pricer.sweep import sweep
+
+    result = sweep(
+        gen_strangle,
+        grid=dict(strike_price=range(90, 111), days=[10, 20, 30], vol_initial=[0.15, 0.2], vol_final=[0.15]),
+        base=dict(spot_price=100.0),
+        spot_range=[80, 120],
+        days=30,
+    )
+    result.frame(0)  # same layout as OptionsPlot.gen_value_df_timeincrementing
+"""
+
+import itertools
+import math
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from multiprocessing import get_all_start_methods, get_context, shared_memory
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from finx_option_pricer.option_plot import OptionsPlot
+from finx_option_pricer.surface_store import NO_LABEL, VALUE, SurfaceStore
+
+
+@dataclass
+class SweepResult:
+    params: pd.DataFrame  # one row per combination, in grid order
+    strikes: np.ndarray  # (n_spots,) underlying prices shared by every grid
+    labels: np.ndarray  # (n_combos, n_rows) remaining days for each row of values, NO_LABEL where padded
+    values: np.ndarray  # (n_combos, n_rows, n_spots), nan where padded or not computed
+    completed: np.ndarray  # (n_combos,) bool, False for combinations skipped by cancellation
+    cancelled: bool = False
+    store: Optional[SurfaceStore] = None  # set when the sweep was written to a store, values/labels map onto it
+
+    def frame(self, i: int) -> pd.DataFrame:
+        """Combination i as a DataFrame with columns [strikes, days-step1, ..., expiration]"""
+        rows = self.labels[i] != NO_LABEL
+        results = {"strikes": self.strikes}
+        for label, row in zip(self.labels[i][rows].tolist(), self.values[i][rows]):
+            results[label] = row
+        return pd.DataFrame(results)
+
+
+@dataclass
+class _SweepJob:
+    """Everything a worker needs to value a combination, sent once per worker"""
+
+    generator: Callable
+    base: Dict
+    spot_range: Sequence[float]
+    strike_interval: float
+    grid_kwargs: Dict = field(default_factory=dict)
+
+    def fill(self, values: np.ndarray, labels: np.ndarray, start: int, combos: List[Dict]) -> None:
+        for i, combo in enumerate(combos, start):
+            positions = self.generator(**self.base, **combo)
+            op_plot = OptionsPlot(
+                option_positions=positions, spot_range=self.spot_range, strike_interval=self.strike_interval
+            )
+            _, row_labels, grid = op_plot.value_grid(**self.grid_kwargs)
+            values[i, : len(row_labels)] = grid
+            labels[i, : len(row_labels)] = row_labels
+
+
+@dataclass
+class _SharedBuffers:
+    """values and labels in shared memory blocks, attached to by name"""
+
+    values_name: str
+    labels_name: str
+    shape: Tuple[int, ...]
+
+    def attach(self):
+        values_shm = shared_memory.SharedMemory(name=self.values_name)
+        labels_shm = shared_memory.SharedMemory(name=self.labels_name)
+        values = np.ndarray(self.shape, dtype=float, buffer=values_shm.buf)
+        labels = np.ndarray(self.shape[:2], dtype=np.int64, buffer=labels_shm.buf)
+        return values, labels, (values_shm, labels_shm)
+
+
+@dataclass
+class _StoreBuffers:
+    """values and labels memory mapped from a SurfaceStore"""
+
+    path: str
+
+    def attach(self):
+        store = SurfaceStore(self.path, mode="r+")
+        return store[VALUE], store.labels, store
+
+
+# per worker state, set by _init_worker
+_worker = {}
+
+
+def _init_worker(job: _SweepJob, buffers) -> None:
+    values, labels, handles = buffers.attach()
+    # handles keep the shared memory / memory maps open for the life of the worker
+    _worker.update(job=job, values=values, labels=labels, handles=handles)
+
+
+def _run_chunk(task: Tuple[int, List[Dict]]) -> Tuple[int, int]:
+    start, combos = task
+    _worker["job"].fill(_worker["values"], _worker["labels"], start, combos)
+    return start, len(combos)
+
+
+def sweep(
+    generator: Callable,
+    grid: Dict[str, Sequence],
+    spot_range: Sequence[float],
+    days: int,
+    base: Optional[Dict] = None,
+    step: int = 1,
+    strike_interval: float = 0.5,
+    show_final: bool = True,
+    market_days_year: int = 252,
+    value_relative: bool = True,
+    processes: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+    cancel=None,
+    store=None,
+) -> SweepResult:
+    """Value every combination of a parameter grid
+
+    Args:
+        generator (Callable): builds List[OptionPosition] from keyword arguments, e.g. gen_strangle
+        grid (Dict[str, Sequence]): generator arguments to sweep, every combination (cartesian product) is run
+        spot_range (Sequence[float]): [low, high] underlying prices, shared by every combination
+        days (int): number days to increment over, see OptionsPlot.gen_value_df_timeincrementing
+        base (Dict, optional): generator arguments held fixed across the sweep. Defaults to None.
+        step, strike_interval, show_final, market_days_year, value_relative: as for OptionsPlot
+        processes (int, optional): worker processes, 1 runs in this process. Defaults to os.cpu_count().
+        chunksize (int, optional): combinations per task. Defaults to ~4 tasks per worker.
+        progress (Callable, optional): progress(completed, total) called as chunks finish. Defaults to None.
+        cancel (optional): object with is_set(), e.g. threading.Event; remaining chunks are abandoned once set
+        store (optional): directory to create a SurfaceStore in. Workers then write straight to its memory
+            maps, structure ids are the combination numbers and SweepResult.values/labels are views onto it.
+            Defaults to None, results are held in memory.
+
+    Returns:
+        SweepResult
+    """
+    base = base or {}
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*grid.values())]
+    n = len(combos)
+
+    strikes = np.arange(spot_range[0], spot_range[1] + strike_interval, strike_interval)
+    n_rows = len(range(0, days + 1, step)) + int(show_final)
+    shape = (n, n_rows, strikes.size)
+
+    job = _SweepJob(
+        generator=generator,
+        base=base,
+        spot_range=spot_range,
+        strike_interval=strike_interval,
+        grid_kwargs=dict(
+            days=days,
+            step=step,
+            show_final=show_final,
+            market_days_year=market_days_year,
+            value_relative=value_relative,
+        ),
+    )
+
+    processes = processes or os.cpu_count() or 1
+    chunksize = chunksize or max(1, math.ceil(n / (processes * 4)))
+    tasks = [(start, combos[start:][:chunksize]) for start in range(0, n, chunksize)]
+    completed = np.zeros(n, dtype=bool)
+
+    def finished(start, count):
+        completed[start:][:count] = True
+        if progress is not None:
+            progress(int(completed.sum()), n)
+
+    params = pd.DataFrame(combos, columns=names)
+    surface_store = None
+    if store is not None:
+        surface_store = SurfaceStore.create(store, strikes, structures=range(n), n_rows=n_rows, params=params)
+
+    if processes == 1 or n == 0:
+        if surface_store is not None:
+            values, labels = surface_store[VALUE], surface_store.labels
+        else:
+            values = np.full(shape, np.nan)
+            labels = np.full(shape[:2], NO_LABEL, dtype=np.int64)
+        for start, chunk in tasks:
+            if cancel is not None and cancel.is_set():
+                break
+            job.fill(values, labels, start, chunk)
+            finished(start, len(chunk))
+    elif surface_store is not None:
+        _run_pool(job, tasks, _StoreBuffers(str(surface_store.path)), processes, finished, cancel)
+        values, labels = surface_store[VALUE], surface_store.labels
+    else:
+        with _shared_buffers(shape) as (buffers, values, labels):
+            _run_pool(job, tasks, buffers, processes, finished, cancel)
+            values, labels = values.copy(), labels.copy()
+
+    if surface_store is not None:
+        surface_store.flush()
+
+    return SweepResult(
+        params=params,
+        strikes=strikes,
+        labels=labels,
+        values=values,
+        completed=completed,
+        cancelled=bool(cancel is not None and cancel.is_set() and not completed.all()),
+        store=surface_store,
+    )
+
+
+def _context():
+    """Workers are never forked from this process directly, which may already be running threads (e.g. numba's
+    parallel kernels) that a plain fork would copy in an inconsistent state"""
+    if "forkserver" not in get_all_start_methods():
+        return get_context("spawn")
+    ctx = get_context("forkserver")
+    # import the pricing modules once in the server rather than in every worker
+    ctx.set_forkserver_preload([__name__])
+    return ctx
+
+
+@contextmanager
+def _shared_buffers(shape: Tuple[int, ...]):
+    """(buffers, values, labels) in shared memory, filled with nan / NO_LABEL and released on exit"""
+    values_shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+    labels_shm = shared_memory.SharedMemory(create=True, size=max(1, shape[0] * shape[1] * 8))
+    try:
+        values = np.ndarray(shape, dtype=float, buffer=values_shm.buf)
+        labels = np.ndarray(shape[:2], dtype=np.int64, buffer=labels_shm.buf)
+        values.fill(np.nan)
+        labels.fill(NO_LABEL)
+        yield _SharedBuffers(values_shm.name, labels_shm.name, shape), values, labels
+    finally:
+        # drop the views before the buffers are released
+        values = labels = None
+        for shm in (values_shm, labels_shm):
+            shm.close()
+            shm.unlink()
+
+
+def _run_pool(job, tasks, buffers, processes, finished, cancel) -> None:
+    """Run tasks on a process pool whose workers write into buffers"""
+    pool = _context().Pool(min(processes, len(tasks)), initializer=_init_worker, initargs=(job, buffers))
+    try:
+        for start, count in pool.imap_unordered(_run_chunk, tasks):
+            finished(start, count)
+            if cancel is not None and cancel.is_set():
+                pool.terminate()
+                break
+        else:
+            pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
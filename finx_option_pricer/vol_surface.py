@@ -0,0 +1,323 @@
+"""Parametric implied volatility surfaces
+
+A VolSurface is fitted to implied vols (e.g. the iv column of pipeline.enrich output) with either
+
+- SVI, one raw SVI slice per expiry: w(k) = a + b * (rho * (k - m) + sqrt((k - m) ** 2 + s ** 2)), or
+- SSVI, one surface across expiries: w(k, theta) = theta / 2 * (1 + rho * phi * k + sqrt((phi * k + rho) ** 2
+  + 1 - rho ** 2)) with phi = eta * theta ** -gamma and theta the ATM total variance of each expiry,
+
+where w = sigma ** 2 * T is total variance and k = log(K / F) is log moneyness against the forward F.
+
+The fitted slices are evaluated once on a dense log moneyness grid, so a lookup is a bilinear interpolation (in k,
+and in total variance across expiries) with no fitting or root finding, and millions of (K, T) points take
+milliseconds.
+
+    surface = VolSurface.fit(K, T, iv, spot=100.0, method="ssvi")
+    surface.sigma(K=[90, 100, 110], T=30 / 252)
+    surface.sigma(K=[90, 100, 110], T=30 / 252, S=95.0)  # moves with spot when sticky="moneyness"
+"""
+
+import math
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+import finx_option_pricer.bsm as bsm
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+SVI = "svi"
+SSVI = "ssvi"
+
+# sticky strike: vol is a function of (K, T) only, spot moves don't change it
+STICKY_STRIKE = "strike"
+# sticky moneyness: vol is a function of (K / F, T), it moves with spot
+STICKY_MONEYNESS = "moneyness"
+
+MIN_SLICE_QUOTES = 5  # raw SVI has five parameters
+
+
+def svi_total_variance(k, a, b, rho, m, s) -> np.ndarray:
+    """Raw SVI total variance"""
+    return a + b * (rho * (k - m) + np.sqrt((k - m) ** 2 + s ** 2))
+
+
+def ssvi_total_variance(k, theta, rho, eta, gamma) -> np.ndarray:
+    """SSVI total variance with the power law phi(theta) = eta * theta ** -gamma"""
+    phi = eta * theta ** -gamma
+    return theta / 2 * (1 + rho * phi * k + np.sqrt((phi * k + rho) ** 2 + 1 - rho ** 2))
+
+
+def _fit_svi_slice(k: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """(a, b, rho, m, s) least squares fit of one slice's total variance"""
+    w_scale = w.max()
+    span = max(k.max() - k.min(), 1e-3)
+    i_min = np.argmin(w)
+    x0 = [w[i_min] * 0.9, 0.1 * w_scale / span, -0.3, k[i_min], 0.1 * span]
+    lower = [-w_scale, 0.0, -0.999, k.min() - span, 1e-4]
+    upper = [w_scale, 10 * w_scale / span + 1.0, 0.999, k.max() + span, 2 * span]
+    x0 = np.clip(x0, lower, upper)
+
+    def residuals(p):
+        return (svi_total_variance(k, *p) - w) / w_scale
+
+    from scipy.optimize import least_squares
+
+    return least_squares(residuals, x0, bounds=(lower, upper), method="trf").x
+
+
+def _atm_total_variance(k: np.ndarray, w: np.ndarray) -> float:
+    order = np.argsort(k)
+    return float(np.interp(0.0, k[order], w[order]))
+
+
+@dataclass
+class VolSurface:
+    """Fitted surface, build with VolSurface.fit or VolSurface.from_frame
+
+    Args:
+        spot (float): underlying price at the fit, the reference for sticky strike lookups
+        r (float): risk free rate used for forwards
+        q (float): continuous dividend yield used for forwards
+        expiries (np.ndarray): fitted expiries (years), ascending
+        method (str): SVI or SSVI
+        params (np.ndarray): SVI (n_expiries, 5) rows of (a, b, rho, m, s), SSVI (n_expiries + 3,) thetas then
+            (rho, eta, gamma)
+        sticky (str, optional): STICKY_STRIKE or STICKY_MONEYNESS. Defaults to STICKY_STRIKE.
+        k_range (tuple, optional): (low, high) log moneyness of the lookup grid, flat beyond it
+        n_k (int, optional): lookup grid points along log moneyness. Defaults to 1001.
+    """
+
+    spot: float
+    r: float
+    q: float
+    expiries: np.ndarray
+    method: str
+    params: np.ndarray
+    sticky: str = STICKY_STRIKE
+    k_range: tuple = (-1.0, 1.0)
+    n_k: int = 1001
+
+    _k0: float = field(init=False, repr=False)
+    _dk: float = field(init=False, repr=False)
+    _T_nodes: np.ndarray = field(init=False, repr=False)
+    _w_grid: np.ndarray = field(init=False, repr=False)  # (n_nodes, n_k) total variance, flattened
+
+    def __post_init__(self):
+        if self.method not in (SVI, SSVI):
+            raise ValueError(f"method must be {SVI} or {SSVI}, method={self.method}")
+        if self.sticky not in (STICKY_STRIKE, STICKY_MONEYNESS):
+            raise ValueError(f"sticky must be {STICKY_STRIKE} or {STICKY_MONEYNESS}, sticky={self.sticky}")
+        self.expiries = np.asarray(self.expiries, dtype=float)
+        self.params = np.asarray(self.params, dtype=float)
+
+        k_grid = np.linspace(self.k_range[0], self.k_range[1], self.n_k)
+        self._k0 = k_grid[0]
+        self._dk = k_grid[1] - k_grid[0]
+        w = np.maximum(np.stack([self.slice_total_variance(k_grid, i) for i in range(self.expiries.size)]), 0.0)
+        # nodes: total variance 0 at T = 0, the fitted expiries, then a virtual node at twice the last expiry
+        # holding twice its variance, so linear extrapolation past the last expiry keeps its variance rate
+        T_last = self.expiries[-1]
+        self._T_nodes = np.concatenate([[0.0], self.expiries, [2 * T_last]])
+        self._w_grid = np.vstack([np.zeros(self.n_k), w, 2 * w[-1]]).ravel()
+
+    # -------------------------------------------------------------------------
+    # fitting
+
+    @classmethod
+    def fit(
+        cls,
+        K,
+        T,
+        iv,
+        spot: float,
+        r: float = 0.0,
+        q: float = 0.0,
+        method: str = SVI,
+        sticky: str = STICKY_STRIKE,
+        n_k: int = 1001,
+        k_range: Optional[Sequence[float]] = None,
+    ) -> "VolSurface":
+        """Fit a surface to implied vols, one expiry per distinct T
+
+        Args:
+            K, T, iv: strikes, times to maturity (years) and implied vols, broadcast against each other. Quotes
+                with a nan iv are dropped.
+            spot (float): underlying price the ivs were solved at
+            r (float, optional): risk free rate. Defaults to 0.0.
+            q (float, optional): continuous dividend yield. Defaults to 0.0.
+            method (str, optional): SVI or SSVI. Defaults to SVI.
+            sticky (str, optional): STICKY_STRIKE or STICKY_MONEYNESS. Defaults to STICKY_STRIKE.
+            n_k (int, optional): lookup grid points along log moneyness. Defaults to 1001.
+            k_range (Sequence[float], optional): lookup grid log moneyness range. Defaults to the quoted range
+                padded by half its width on each side.
+
+        Raises:
+            ValueError: if an SVI expiry has fewer than MIN_SLICE_QUOTES quotes
+        """
+        K, T, iv = [np.asarray(x, dtype=float).ravel() for x in np.broadcast_arrays(K, T, iv)]
+        keep = np.isfinite(iv) & (iv > 0) & (T > 0)
+        K, T, iv = K[keep], T[keep], iv[keep]
+
+        k = np.log(K / (spot * np.exp((r - q) * T)))
+        w = iv ** 2 * T
+        expiries = np.unique(T)
+        slices = [T == t for t in expiries]
+
+        if method == SVI:
+            for t, in_slice in zip(expiries, slices):
+                if in_slice.sum() < MIN_SLICE_QUOTES:
+                    raise ValueError(f"SVI needs at least {MIN_SLICE_QUOTES} quotes per expiry, T={t}")
+            params = np.stack([_fit_svi_slice(k[s], w[s]) for s in slices])
+        elif method == SSVI:
+            from scipy.optimize import least_squares
+
+            # ATM total variances, interpolated from the quotes, start the joint fit of (thetas, rho, eta, gamma)
+            theta0 = np.maximum([_atm_total_variance(k[s], w[s]) for s in slices], 1e-8)
+            expiry = np.searchsorted(expiries, T)
+            n = expiries.size
+
+            def residuals(p):
+                return (ssvi_total_variance(k, p[:n][expiry], *p[n:]) - w) / w.max()
+
+            x0 = np.concatenate([theta0, [-0.3, 1.0, 0.5]])
+            lower = np.concatenate([np.full(n, 1e-8), [-0.999, 1e-4, 0.0]])
+            upper = np.concatenate([np.full(n, np.inf), [0.999, 10.0, 1.0]])
+            params = least_squares(residuals, x0, bounds=(lower, upper), method="trf").x
+            # theta is increasing for an arbitrage free term structure
+            params[:n] = np.maximum.accumulate(params[:n])
+        else:
+            raise ValueError(f"method must be {SVI} or {SSVI}, method={method}")
+
+        if k_range is None:
+            pad = max((k.max() - k.min()) / 2, 0.05)
+            k_range = (k.min() - pad, k.max() + pad)
+        return cls(
+            spot=spot,
+            r=r,
+            q=q,
+            expiries=expiries,
+            method=method,
+            params=params,
+            sticky=sticky,
+            k_range=tuple(float(x) for x in k_range),
+            n_k=n_k,
+        )
+
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame", market_days_year: int = 252, **kwargs) -> "VolSurface":
+        """Fit to a chain with columns K, iv, T (or days) and S, e.g. pipeline.enrich output
+
+        The median S is used as the fit's spot, rows with iv_converged False are dropped. kwargs are passed to
+        VolSurface.fit (r, q, method, sticky, ...).
+        """
+        if "iv_converged" in df:
+            df = df[df["iv_converged"].to_numpy(dtype=bool)]
+        T = df["T"].to_numpy(dtype=float) if "T" in df else df["days"].to_numpy(dtype=float) / market_days_year
+        kwargs.setdefault("spot", float(df["S"].median()))
+        return cls.fit(df["K"].to_numpy(dtype=float), T, df["iv"].to_numpy(dtype=float), **kwargs)
+
+    def with_sticky(self, sticky: str) -> "VolSurface":
+        """Same fit, different sticky rule"""
+        return replace(self, sticky=sticky)
+
+    @property
+    def cache_key(self) -> tuple:
+        """Fit and lookup settings, used to key the pricing cache (see finx_option_pricer.cache)"""
+        expiries, params = self.expiries.tobytes(), self.params.tobytes()
+        return (self.spot, self.r, self.q, expiries, self.method, params, self.sticky, self.k_range, self.n_k)
+
+    # -------------------------------------------------------------------------
+    # lookups
+
+    def slice_total_variance(self, k, i: int) -> np.ndarray:
+        """Total variance of fitted expiry i straight from its parameters (no grid)"""
+        if self.method == SVI:
+            return svi_total_variance(k, *self.params[i])
+        theta = self.params[: self.expiries.size]
+        return ssvi_total_variance(k, theta[i], *self.params[-3:])
+
+    def log_moneyness(self, K, T, S=None) -> np.ndarray:
+        """log(K / F) with the forward off S, or off the fit's spot for sticky strike surfaces or when S is None"""
+        if S is None or self.sticky == STICKY_STRIKE:
+            S = self.spot
+        return np.log(K / (S * np.exp((self.r - self.q) * T)))
+
+    def total_variance(self, k, T) -> np.ndarray:
+        """Total variance at log moneyness k and time T from the lookup grid
+
+        Linear in k between grid points (flat beyond k_range) and linear in total variance between expiries.
+        Before the first expiry the first slice's variance rate is kept, past the last expiry the last slice's.
+        """
+        k, T = np.broadcast_arrays(np.asarray(k, dtype=float), np.asarray(T, dtype=float))
+
+        x = np.clip((k - self._k0) / self._dk, 0.0, self.n_k - 1)
+        i = np.minimum(x.astype(np.intp), self.n_k - 2)
+        a = x - i
+
+        T_nodes = self._T_nodes
+        j = np.searchsorted(T_nodes[1:-1], T, side="right")  # interval [T_nodes[j], T_nodes[j + 1]]
+        lo = j * self.n_k + i
+        hi = lo + self.n_k
+        w_grid = self._w_grid
+        w_lo = w_grid.take(lo) * (1 - a) + w_grid.take(lo + 1) * a
+        w_hi = w_grid.take(hi) * (1 - a) + w_grid.take(hi + 1) * a
+        T_lo = T_nodes.take(j)
+        b = (T - T_lo) / (T_nodes.take(j + 1) - T_lo)
+        return w_lo + (w_hi - w_lo) * b
+
+    def sigma(self, K, T, S=None) -> np.ndarray:
+        """Implied vol at strikes K and times T (years), all inputs broadcast against each other
+
+        Runs as one fused loop when numba is installed, the bsm backend is numba (see bsm.set_backend) and the
+        lookup has at least bsm.NUMBA_MIN_SIZE elements.
+
+        Args:
+            K: strikes
+            T: times to maturity (years)
+            S (optional): current spot, only used by sticky moneyness surfaces. Defaults to the fit's spot.
+        """
+        if S is None or self.sticky == STICKY_STRIKE:
+            S = self.spot
+        # T -> 0 keeps the first slice's variance rate
+        T_min = self.expiries[0] * 1e-12
+        if bsm._use_numba(K, T, S):
+            arrays = np.broadcast_arrays(K, T, S)
+            K, T, S = [np.ascontiguousarray(a, dtype=float).ravel() for a in arrays]
+            out = np.empty(K.size)
+            grid = (self._k0, self._dk, self.n_k, self._T_nodes, self._w_grid)
+            _lookup_numba()(K, T, S, self.r - self.q, T_min, *grid, out)
+            return out.reshape(arrays[0].shape)[()]
+        T = np.maximum(np.asarray(T, dtype=float), T_min)
+        return np.sqrt(self.total_variance(self.log_moneyness(K, T, S), T) / T)
+
+
+def _lookup_kernel(K, T, S, carry, T_min, k0, dk, n_k, T_nodes, w_grid, out):
+    """VolSurface.sigma fused into one loop, used by the numba backend"""
+    n_intervals = T_nodes.size - 1
+    for p in range(K.size):
+        t = max(T[p], T_min)
+        x = min(max((math.log(K[p] / (S[p] * math.exp(carry * t))) - k0) / dk, 0.0), n_k - 1.0)
+        i = min(int(x), n_k - 2)
+        a = x - i
+        # last interval also covers extrapolation past the virtual node
+        j = 0
+        while j < n_intervals - 1 and t >= T_nodes[j + 1]:
+            j += 1
+        lo = j * n_k + i
+        hi = lo + n_k
+        w_lo = w_grid[lo] * (1 - a) + w_grid[lo + 1] * a
+        w_hi = w_grid[hi] * (1 - a) + w_grid[hi + 1] * a
+        b = (t - T_nodes[j]) / (T_nodes[j + 1] - T_nodes[j])
+        out[p] = math.sqrt((w_lo + (w_hi - w_lo) * b) / t)
+
+
+@lru_cache(maxsize=None)
+def _lookup_numba():
+    """_lookup_kernel JIT compiled, numba is imported on first use of the numba backend"""
+    import numba
+
+    return numba.njit(nogil=True, error_model="numpy", cache=True)(_lookup_kernel)
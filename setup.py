@@ -12,6 +12,9 @@ dependencies = [
     "scipy",
 ]
 test_dependencies = ["pytest"]
+# optional, bsm runs on JIT compiled kernels when numba is installed, the chain pipeline reads/writes Parquet
+# with pyarrow
+extra_dependencies = {"numba": ["numba"], "parquet": ["pyarrow"]}
 
 url = f"https://github.com/westonplatter/{package_name_url}"
 
@@ -44,6 +47,13 @@ setuptools.setup(
     packages=[package_name],
     install_requires=dependencies,
     tests_require=test_dependencies,
+    extras_require=extra_dependencies,
+    entry_points={
+        "console_scripts": [
+            "finx-chain=finx_option_pricer.pipeline:main",
+            "finx-serve=finx_option_pricer.service:main",
+        ]
+    },
     project_urls={
         "Issue Tracker": f"{project_url}/issues",
         "Source Code": f"{project_url}",
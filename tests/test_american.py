@@ -0,0 +1,93 @@
+import numpy as np
+from scipy.stats import multivariate_normal
+
+from finx_option_pricer import american, bsm, lattice
+from finx_option_pricer.option import Option
+
+K = np.array([80.0, 90.0, 100.0, 110.0, 120.0])
+
+
+def test_bivariate_normal_cdf():
+    a = np.array([-1.5, 0.0, 0.3, 2.0, 0.5])
+    b = np.array([0.5, 0.0, -0.7, 1.0, 0.4])
+    for rho in [-0.99, -0.5, 0.0, 0.6, 0.95]:
+        expected = [multivariate_normal(cov=[[1.0, rho], [rho, 1.0]], abseps=1e-12).cdf([x, y]) for x, y in zip(a, b)]
+        np.testing.assert_allclose(american.bivariate_normal_cdf(a, b, rho), expected, atol=1e-8)
+
+
+def test_published_values():
+    # Haug, The Complete Guide to Option Pricing Formulas, with cost of carry b
+    call = american._bs2002(*[np.array([x]) for x in (42.0, 40.0, 0.75, 0.04, -0.04, 0.35)], np.array([True]))
+    np.testing.assert_allclose(call, 5.2869, atol=1e-4)
+    call = american._baw(*[np.array([x]) for x in (100.0, 100.0, 0.1, 0.1, 0.0, 0.15)], np.array([True]))
+    np.testing.assert_allclose(call, 1.8770, atol=1e-3)
+
+
+def test_american_approximations_match_lattice():
+    european = bsm.bs_value(100.0, K, 1.0, 0.05, 0.3, "p")
+    reference = lattice.lattice_value(100.0, K, 1.0, 0.05, 0.3, "p", steps=2000)
+    for value_func in [american.baw_value, american.bs2002_value]:
+        # without dividends an american call is never exercised early
+        calls = value_func(100.0, K, 1.0, 0.05, 0.3, "c")
+        np.testing.assert_allclose(calls, bsm.bs_value(100.0, K, 1.0, 0.05, 0.3, "c"), atol=1e-10)
+
+        puts = value_func(100.0, K, 1.0, 0.05, 0.3, "p")
+        assert (puts >= european).all()
+        np.testing.assert_allclose(puts, reference, atol=0.15)
+
+        # past the boundary the put is worth its intrinsic value
+        np.testing.assert_allclose(value_func(50.0, 100.0, 1.0, 0.05, 0.2, "p"), 50.0)
+        np.testing.assert_allclose(value_func(100.0, 110.0, 0.0, 0.05, 0.2, "p"), 10.0)
+
+
+def test_american_puts_never_below_european():
+    # near r = 0 the approximations fall below the european value unless floored by it
+    rng = np.random.default_rng(0)
+    S, K_, T, sigma = 100.0, rng.uniform(80, 120, 400), rng.uniform(0.05, 1.5, 400), rng.uniform(0.1, 0.6, 400)
+    for r in [0.0, 0.0007, 0.005, 0.02, 0.08]:
+        european = bsm.bs_value(S, K_, T, r, sigma, "p")
+        for value_func in [american.baw_value, american.bs2002_value]:
+            assert (value_func(S, K_, T, r, sigma, "p") >= european - 1e-12).all()
+
+    np.testing.assert_allclose(american.bs2002_value(100.0, 118.5, 1.4, 0.0007, 0.49, "p"), 35.114, atol=1e-3)
+    sigma = american.BS2002.implied_vol(35.2, 100.0, 118.5, 1.4, 0.0007, "p")
+    assert sigma.converged and sigma.iv > 0.49
+
+
+def test_american_greeks():
+    reference = lattice.lattice_greeks(100.0, K, 1.0, 0.05, 0.3, "p", method="lr", steps=501)
+    for greeks_func in [american.baw_greeks, american.bs2002_greeks]:
+        greeks = greeks_func(100.0, K, 1.0, 0.05, 0.3, "p")
+        np.testing.assert_allclose(greeks.delta, reference.delta, atol=0.02)
+        np.testing.assert_allclose(greeks.vega, reference.vega, rtol=0.05)
+        assert (greeks.gamma > 0).all()
+
+
+def test_american_implied_vol_round_trip():
+    sigma = np.array([0.2, 0.3, 0.4, 0.5, 0.6])
+    for model in [american.BAW, american.BS2002]:
+        price = model.value(100.0, K, 0.5, 0.05, sigma, "p")
+        res = model.implied_vol(price, 100.0, K, 0.5, 0.05, "p")
+        assert res.converged.all()
+        np.testing.assert_allclose(res.iv, sigma, atol=1e-6)
+
+
+def test_american_option_algo():
+    for algo in ["baw", "bs2002"]:
+        option = Option(S=100, K=110, T=1.0, r=0.05, sigma=0.3, option_type="p", algo=algo)
+        lr = Option(S=100, K=110, T=1.0, r=0.05, sigma=0.3, option_type="p", algo="lr")
+        np.testing.assert_allclose(option.value, lr.value, atol=0.1)
+        assert -1 < option.delta < 0
+
+
+def test_american_dividend_yield():
+    reference = lattice.lattice_value(100.0, K, 1.0, 0.05, 0.3, "c", q=0.08, steps=2000)
+    for model in [american.BAW, american.BS2002]:
+        calls = model.value(100.0, K, 1.0, 0.05, 0.3, "c", 0.08)
+        assert (calls > bsm.bs_value(100.0, K, 1.0, 0.05, 0.3, "c", q=0.08)).all()
+        np.testing.assert_allclose(calls, reference, atol=0.15)
+
+        greeks = model.greeks(100.0, K, 1.0, 0.05, 0.3, "c", 0.08)
+        np.testing.assert_allclose(greeks.value, calls)
+        res = model.implied_vol(calls, 100.0, K, 1.0, 0.05, "c", 0.08)
+        np.testing.assert_allclose(res.iv, 0.3, atol=1e-6)
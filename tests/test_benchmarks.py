@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import finx_option_pricer.bsm as bsm
+from benchmarks import harness
+from benchmarks.__main__ import main
+from finx_option_pricer.cache import get_cache
+
+
+def results(**times):
+    return {name: dict(min=t, median=t) for name, t in times.items()}
+
+
+def test_compare():
+    baseline = results(a=1.0, b=1.0, c=1.0, gone=1.0)
+    current = results(a=1.05, b=1.2, c=0.8, added=1.0)
+
+    rows = {row.name: row for row in harness.compare(baseline, current, threshold=0.1)}
+    assert {name: row.status for name, row in rows.items()} == dict(
+        a=harness.OK, b=harness.REGRESSION, c=harness.IMPROVED, gone=harness.MISSING, added=harness.NEW
+    )
+    assert rows["b"].ratio == pytest.approx(1.2) and rows["gone"].ratio is None
+    assert harness.compare(baseline, current, threshold=0.25)[1].status == harness.OK
+
+
+def test_run_and_compare_cli(tmp_path, capsys):
+    backend, names = bsm.get_backend(), [b.name for b in harness.discover()]
+    assert len(names) == len(set(names))
+
+    out = tmp_path / "latest.json"
+    args = ["run", "-k", "bsm.bs_value[", "-k", "cache.", "--repeat", "2", "--min-time", "0.001", "-o", str(out)]
+    assert main(args) == 0
+    saved = json.loads(out.read_text())
+    assert saved["environment"]["seed"] == harness.SEED
+    assert all(name.startswith(("bsm.bs_value[", "cache.")) for name in saved["results"])
+    assert all(len(r["times"]) == 2 for r in saved["results"].values())
+    # setups switched the backend and enabled the cache, both put back
+    assert bsm.get_backend() == backend and get_cache() is None
+
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(dict(results={k: dict(v, min=v["min"] / 2) for k, v in saved["results"].items()})))
+    assert main(["compare", str(out), str(out)]) == 0
+    assert main(["compare", str(baseline), str(out)]) == 1
+    assert harness.REGRESSION in capsys.readouterr().out
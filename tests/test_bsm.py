@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+from finx_option_pricer import bsm
+
+
+def test_implied_vol_round_trip():
+    rng = np.random.default_rng(7)
+    n = 1000
+    S = 100.0
+    K = rng.uniform(85, 115, n)
+    T = rng.uniform(20 / 252, 1.0, n)
+    r = rng.uniform(0.0, 0.05, n)
+    sigma = rng.uniform(0.1, 0.8, n)
+    option_type = np.where(rng.random(n) < 0.5, "c", "p")
+    is_call = option_type == "c"
+    price = np.where(is_call, bsm.bs_call_value(S, K, T, r, sigma), bsm.bs_put_value(S, K, T, r, sigma))
+
+    res = bsm.implied_vol(price, S, K, T, r, option_type)
+
+    assert res.iv.shape == (n,)
+    assert res.converged.all()
+    assert np.median(res.iterations) <= 5
+    assert res.iterations.max() <= 20
+    np.testing.assert_allclose(res.iv, sigma, atol=1e-6)
+
+
+def test_implied_vol_flags_quotes_outside_no_arbitrage_bounds():
+    # below intrinsic (call), above S (call), above discounted K (put), valid
+    price = np.array([[4.0, 106.0], [99.8, 7.0]])
+    option_type = np.array([["c", "c"], ["p", "c"]])
+    res = bsm.implied_vol(price, 105.0, 100.0, 0.25, 0.02, option_type)
+
+    np.testing.assert_array_equal(res.converged, [[False, False], [False, True]])
+    np.testing.assert_array_equal(res.iterations[~res.converged], 0)
+    assert np.isnan(res.iv[~res.converged]).all()
+    np.testing.assert_almost_equal(bsm.bs_call_value(105.0, 100.0, 0.25, 0.02, res.iv[1, 1]), 7.0)
+
+
+def test_implied_vol_put_scalar():
+    price = bsm.bs_put_value(90, 100, 1 / 12, 0.01, 0.45)
+    np.testing.assert_almost_equal(bsm.implied_vol_put(price, 90, 100, 1 / 12, 0.01), 0.45, decimal=6)
+
+
+def test_scalar_normal_matches_array_normal():
+    x = np.linspace(-30, 30, 601)
+    np.testing.assert_allclose([bsm.N(v) for v in x.tolist()], bsm.N(x), rtol=1e-12)
+    np.testing.assert_allclose([bsm.N_prime(v) for v in x.tolist()], bsm.N_prime(x), rtol=1e-12)
+    assert isinstance(bsm.N(0.5), float) and isinstance(bsm.N(np.array([0.5])), np.ndarray)
+
+
+def test_bs_greeks_matches_single_greek_functions():
+    S = np.array([90.0, 100.0, 110.0])
+    K, T, r, sigma = 100.0, 0.25, 0.03, 0.35
+
+    calls = bsm.bs_greeks(S, K, T, r, sigma, "c")
+    np.testing.assert_allclose(calls.value, bsm.bs_call_value(S, K, T, r, sigma))
+    np.testing.assert_allclose(calls.delta, bsm.delta_call(S, K, T, r, sigma))
+    np.testing.assert_allclose(calls.gamma, bsm.gamma(S, K, T, r, sigma))
+    np.testing.assert_allclose(calls.vega, bsm.vega(S, K, T, r, sigma))
+    np.testing.assert_allclose(calls.theta, bsm.theta_call(S, K, T, r, sigma))
+    np.testing.assert_allclose(calls.rho, bsm.rho_call(S, K, T, r, sigma))
+
+    puts = bsm.bs_greeks(S, K, T, r, sigma, "p")
+    np.testing.assert_allclose(puts.value, bsm.bs_put_value(S, K, T, r, sigma))
+    np.testing.assert_allclose(puts.delta, bsm.delta_put(S, K, T, r, sigma))
+    np.testing.assert_allclose(puts.theta, bsm.theta_put(S, K, T, r, sigma))
+    np.testing.assert_allclose(puts.rho, bsm.rho_put(S, K, T, r, sigma))
+
+    mixed = bsm.bs_greeks(S, K, T, r, sigma, ["c", "p", "c"])
+    np.testing.assert_allclose(mixed.value, [calls.value[0], puts.value[1], calls.value[2]])
+
+
+def test_bs_greeks_second_order_against_finite_differences():
+    S, K, T, r, sigma, h = 100.0, 105.0, 0.5, 0.02, 0.3, 1e-5
+
+    for option_type in ["c", "p"]:
+        g = bsm.bs_greeks(S, K, T, r, sigma, option_type)
+        up = bsm.bs_greeks(S, K, T, r, sigma + h, option_type)
+        down = bsm.bs_greeks(S, K, T, r, sigma - h, option_type)
+        np.testing.assert_allclose(g.vanna, (up.delta - down.delta) / (2 * h), rtol=1e-5)
+        np.testing.assert_allclose(g.volga, (up.vega - down.vega) / (2 * h), rtol=1e-5)
+
+        later = bsm.bs_greeks(S, K, T - h, r, sigma, option_type)
+        earlier = bsm.bs_greeks(S, K, T + h, r, sigma, option_type)
+        np.testing.assert_allclose(g.charm, (later.delta - earlier.delta) / (2 * h), rtol=1e-5)
+        np.testing.assert_allclose(g.theta, (later.value - earlier.value) / (2 * h), rtol=1e-5)
+
+
+def test_dividend_yield():
+    S = np.array([90.0, 100.0, 110.0])
+    K, T, r, q, sigma, h = 100.0, 0.5, 0.03, 0.05, 0.3, 1e-5
+    np.testing.assert_allclose(bsm.bs_value(S, K, T, r, sigma, "c", q), bsm.bs_calldiv_value(S, K, T, r, q, sigma))
+    np.testing.assert_allclose(bsm.bs_value(S, K, T, r, sigma, "p", q), bsm.bs_putdiv_value(S, K, T, r, q, sigma))
+
+    for option_type in ["c", "p"]:
+        g = bsm.bs_greeks(S, K, T, r, sigma, option_type, q)
+        up = bsm.bs_greeks(S + h, K, T, r, sigma, option_type, q)
+        down = bsm.bs_greeks(S - h, K, T, r, sigma, option_type, q)
+        np.testing.assert_allclose(g.delta, (up.value - down.value) / (2 * h), rtol=1e-6)
+        np.testing.assert_allclose(g.gamma, (up.delta - down.delta) / (2 * h), rtol=1e-6)
+
+        vol_up = bsm.bs_greeks(S, K, T, r, sigma + h, option_type, q)
+        vol_down = bsm.bs_greeks(S, K, T, r, sigma - h, option_type, q)
+        np.testing.assert_allclose(g.vega, (vol_up.value - vol_down.value) / (2 * h), rtol=1e-6)
+        np.testing.assert_allclose(g.vanna, (vol_up.delta - vol_down.delta) / (2 * h), rtol=1e-5)
+
+        later = bsm.bs_greeks(S, K, T - h, r, sigma, option_type, q)
+        earlier = bsm.bs_greeks(S, K, T + h, r, sigma, option_type, q)
+        np.testing.assert_allclose(g.theta, (later.value - earlier.value) / (2 * h), rtol=1e-5)
+        np.testing.assert_allclose(g.charm, (later.delta - earlier.delta) / (2 * h), rtol=1e-5)
+
+        res = bsm.implied_vol(g.value, S, K, T, r, option_type, q)
+        assert res.converged.all()
+        np.testing.assert_allclose(res.iv, sigma, atol=1e-8)
+
+    # options on futures, q = r
+    price = bsm.bs_value(100.0, K, T, r, sigma, q=r)
+    np.testing.assert_allclose(bsm.implied_vol_call(price, 100.0, K, T, r, q=r), sigma)
+
+
+def test_set_backend():
+    with pytest.raises(ValueError, match="Unknown backend"):
+        bsm.set_backend("fortran")
+    if not bsm.HAS_NUMBA:
+        with pytest.raises(ImportError):
+            bsm.set_backend(bsm.NUMBA)
+        assert bsm.get_backend() == bsm.NUMPY
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("numba")
+
+from finx_option_pricer import bsm, bsm_numba  # noqa: E402
+from finx_option_pricer.profiling import profile  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def numba_for_any_size(monkeypatch):
+    monkeypatch.setattr(bsm, "NUMBA_MIN_SIZE", 0)
+
+
+@pytest.fixture
+def contracts():
+    rng = np.random.default_rng(11)
+    n = 2000
+    return dict(
+        S=100.0,
+        K=rng.uniform(60, 140, n),
+        T=rng.uniform(1 / 252, 2.0, n),
+        r=rng.uniform(0.0, 0.06, n),
+        sigma=rng.uniform(0.05, 1.0, n),
+        option_type=np.where(rng.random(n) < 0.5, "c", "p"),
+        q=np.where(rng.random(n) < 0.5, 0.0, rng.uniform(0.0, 0.05, n)),
+    )
+
+
+def _both_backends(func, *args, **kwargs):
+    try:
+        bsm.set_backend(bsm.NUMPY)
+        expected = func(*args, **kwargs)
+        bsm.set_backend(bsm.NUMBA)
+        return func(*args, **kwargs), expected
+    finally:
+        bsm.set_backend(bsm.NUMBA)
+
+
+def test_numba_is_default_backend():
+    assert bsm.HAS_NUMBA
+    assert bsm.get_backend() == bsm.NUMBA
+
+
+def test_value_and_greeks_match_numpy(contracts):
+    value, expected = _both_backends(bsm.bs_value, **contracts)
+    np.testing.assert_allclose(value, expected, rtol=1e-12, atol=1e-12)
+
+    greeks, expected = _both_backends(bsm.bs_greeks, **contracts)
+    for name in bsm.Greeks._fields:
+        np.testing.assert_allclose(getattr(greeks, name), getattr(expected, name), rtol=1e-10, atol=1e-10)
+
+
+def test_implied_vol_matches_numpy(contracts):
+    price = bsm.bs_value(**contracts)
+    price[:3] = [0.0, 1e6, np.nan]  # outside the no-arbitrage bounds
+    kwargs = {k: v for k, v in contracts.items() if k != "sigma"}
+    res, expected = _both_backends(bsm.implied_vol, price, **kwargs)
+
+    np.testing.assert_array_equal(res.converged, expected.converged)
+    # both meet the price tolerance, which allows slightly different vols where vega is tiny
+    np.testing.assert_allclose(res.iv, expected.iv, rtol=1e-5)
+    repriced = bsm.bs_value(**{**contracts, "sigma": res.iv})
+    np.testing.assert_allclose(repriced[res.converged], price[res.converged], atol=1e-9)
+    assert not res.converged[:3].any() and np.isnan(res.iv[:3]).all()
+
+
+def test_scalar_and_broadcast_shapes():
+    value, expected = _both_backends(bsm.bs_value, 100.0, 105.0, 0.25, 0.01, 0.3, "p")
+    assert type(value) is type(expected)
+    np.testing.assert_allclose(value, expected, rtol=1e-12)
+
+    S = np.linspace(80, 120, 5)[None, :]
+    T = np.array([0.1, 0.2, 0.3])[:, None]
+    greeks, expected = _both_backends(bsm.bs_greeks, S, 100.0, T, 0.01, 0.3, "c")
+    assert greeks.delta.shape == expected.delta.shape == (3, 5)
+
+    res, expected = _both_backends(bsm.implied_vol, np.full((3, 5), 4.0), S, 100.0, T, 0.01, "c")
+    assert res.iv.shape == expected.iv.shape == (3, 5)
+
+
+def test_parallel_kernels(contracts, monkeypatch):
+    serial = bsm.bs_greeks(**contracts)
+    monkeypatch.setattr(bsm_numba, "PARALLEL_THRESHOLD", 0)
+    parallel = bsm.bs_greeks(**contracts)
+    for x, y in zip(parallel, serial):
+        np.testing.assert_array_equal(x, y)
+
+
+def test_small_batches_run_on_numpy(contracts, monkeypatch):
+    monkeypatch.setattr(bsm, "NUMBA_MIN_SIZE", 256)
+    small = {k: v[:10] if np.ndim(v) else v for k, v in contracts.items()}
+    with profile() as p:
+        bsm.bs_value(**contracts)
+        bsm.bs_greeks(**small)
+        bsm.bs_value(100.0, 105.0, 0.1, 0.01, 0.25, "c")
+        bsm.implied_vol(2.0, 100.0, 105.0, 0.1, 0.01)
+    assert set(p.kernel_stats()) == {
+        "bsm.bs_value[numba]",
+        "bsm.bs_greeks[numpy]",
+        "bsm.bs_value[numpy]",
+        "bsm.implied_vol[numpy]",
+        "bsm.value_vega",
+    }
+
+
+def test_kernels_are_cached_on_disk():
+    assert all(kernel._cache.__class__.__name__ != "NullCache" for kernel in bsm_numba._serial.values())
+    names = {kernel.py_func.__qualname__ for kernel in [*bsm_numba._serial.values(), *bsm_numba._parallel.values()]}
+    assert len(names) == 6
@@ -0,0 +1,102 @@
+import threading
+
+import numpy as np
+import pytest
+
+from finx_option_pricer import cache
+from finx_option_pricer.cache import PricingCache, disable_cache, enable_cache
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_plot import OptionsPlot
+from finx_option_pricer.option_structures import gen_strangle
+
+
+@pytest.fixture
+def pricing_cache():
+    yield enable_cache()
+    disable_cache()
+
+
+def test_lru_eviction():
+    c = PricingCache(maxsize=2)
+    c.put("a", 1)
+    c.put("b", 2)
+    assert c.get("a") == 1
+    c.put("c", 3)  # "b" is least recently used
+
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    stats = c.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (3, 1, 1, 2)
+
+
+def test_ttl_expiry():
+    now = [0.0]
+    c = PricingCache(ttl=10.0, clock=lambda: now[0])
+    c.put("a", 1)
+    now[0] = 9.0
+    assert c.get("a") == 1
+    now[0] = 10.0
+    assert c.get("a") is None
+    assert c.stats().expirations == 1 and len(c) == 0
+
+
+def test_quantized_keys():
+    c = PricingCache(decimals=8)
+    assert c.key(15 / 252 - 10 / 252, "c") == c.key(5 / 252, "c")
+    assert c.key((np.float64(0.1 + 0.2),)) == c.key((0.3,))
+    assert c.key(0.1) != c.key(0.1 + 1e-6)
+
+
+def test_thread_safety():
+    c = PricingCache(maxsize=50)
+    calls = []
+
+    def work(offset):
+        for i in range(2000):
+            c.get_or_compute((i + offset) % 100, lambda: calls.append(1) or i)
+
+    threads = [threading.Thread(target=work, args=(k,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = c.stats()
+    assert stats.hits + stats.misses == 8 * 2000
+    assert stats.misses == len(calls)
+    # concurrent misses on the same key both compute, the second put replaces rather than adds an entry
+    assert stats.size == 50 and stats.evictions <= stats.misses - 50
+
+
+def test_option_uses_cache(pricing_cache):
+    option = Option(S=100, K=105, T=0.25, r=0.01, sigma=0.3)
+    value = option.value
+    assert option.value == value
+    assert option.delta == option.greeks().delta
+    assert pricing_cache.stats().hits == 2
+
+    # same contract up to float noise
+    assert Option(S=100, K=105, T=0.5 - 0.25, r=0.01, sigma=0.3).value == value
+    assert pricing_cache.stats().hits == 3
+
+    # changing any term misses
+    option.S = 101
+    assert option.value > value
+
+
+def test_options_plot_grid_uses_cache(pricing_cache):
+    positions = gen_strangle(spot_price=100.0, strike_price=100.0, days=20, vol_initial=0.2, vol_final=0.15)
+    op_plot = OptionsPlot(option_positions=positions, spot_range=[80, 120])
+    df = op_plot.gen_value_df_timeincrementing(20, 5)
+
+    hits = pricing_cache.stats().hits
+    again = OptionsPlot(option_positions=positions, spot_range=[80, 120]).gen_value_df_timeincrementing(20, 5)
+    assert pricing_cache.stats().hits == hits + 1
+    assert again.equals(df)
+
+    strike_range, labels, values = op_plot.value_grid(20, 5)
+    assert not values.flags.writeable and not strike_range.flags.writeable
+
+    disable_cache()
+    assert cache.get_cache() is None
+    assert OptionsPlot(option_positions=positions, spot_range=[80, 120]).gen_value_df_timeincrementing(20, 5).equals(df)
@@ -1,6 +1,7 @@
 import numpy as np
+import pytest
 
-from finx_option_pricer.calcs import calc_straddle_iv
+from finx_option_pricer.calcs import calc_straddle_iv, calc_straddle_iv_chain
 
 
 def test_calc_straddle_iv():
@@ -11,8 +12,36 @@ def test_calc_straddle_iv():
 
     expected_civ = 0.220535
     expected_piv = 0.222397
-    expected_fa = 42
+    # with r=0, parity puts the crossing at ((108.5 - 80.25) - (4095 - 4150)) / 2
+    expected_fa = 41.625
 
-    assert fa == expected_fa
+    np.testing.assert_almost_equal(fa, expected_fa, decimal=6)
     np.testing.assert_almost_equal(civ, expected_civ, decimal=3)
     np.testing.assert_almost_equal(piv, expected_piv, decimal=3)
+    np.testing.assert_almost_equal(civ, piv, decimal=8)
+
+
+def test_calc_straddle_iv_chain():
+    S = 4095.0
+    K = np.array([4100.0, 4150.0])
+    call_price = np.array([80.0, 108.5])
+    put_price = np.array([90.0, 80.25])
+    df = calc_straddle_iv_chain(S, K, call_price, put_price, time_days=16, r=0.01)
+
+    for row in df.itertuples():
+        i = row.Index
+        fa, civ, piv = calc_straddle_iv(
+            S=S, K=K[i], call_price=call_price[i], put_price=put_price[i], time_days=16, r=0.01
+        )
+        np.testing.assert_almost_equal(row.adjustment, fa, decimal=6)
+        np.testing.assert_almost_equal(row.call_iv, civ, decimal=6)
+        np.testing.assert_almost_equal(row.put_iv, piv, decimal=6)
+
+
+def test_calc_straddle_iv_no_crossing():
+    # combined premium is below the straddle's intrinsic value
+    with pytest.raises(ValueError):
+        calc_straddle_iv(S=4095.0, K=4150.0, call_price=10.0, put_price=20.0, time_days=16)
+
+    with pytest.raises(ValueError, match="4150.0"):
+        calc_straddle_iv_chain(4095.0, [4100.0, 4150.0], [80.0, 10.0], [90.0, 20.0], time_days=16)
@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+import pytest
+
+# heavy optional / secondary dependencies, loaded on first use rather than at import
+LAZY = ("pandas", "scipy", "numba", "pyarrow")
+
+
+def lazily_loaded_in_subprocess(module):
+    """Lazily loaded modules that got imported anyway by importing module in a fresh interpreter
+
+    Import time itself is tracked by the import.cold_import benchmarks, where a slow machine is not a failure.
+    """
+    code = f"import sys; import {module}; print(*[m for m in {LAZY!r} if m in sys.modules])"
+    return subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split()
+
+
+@pytest.mark.parametrize(
+    "module", ["finx_option_pricer.option", "finx_option_pricer.option_plot", "finx_option_pricer.calcs"]
+)
+def test_import_is_lazy(module):
+    assert lazily_loaded_in_subprocess(module) == []
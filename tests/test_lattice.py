@@ -0,0 +1,125 @@
+import numpy as np
+
+from finx_option_pricer import bsm, lattice
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_plot import OptionPosition, OptionsPlot
+
+K = np.array([80.0, 90.0, 100.0, 110.0, 120.0])
+
+
+def test_european_lattice_converges_to_bsm():
+    for option_type in ["c", "p"]:
+        expected = bsm.bs_value(100.0, K, 1.0, 0.05, 0.3, option_type)
+        lr = lattice.lattice_value(100.0, K, 1.0, 0.05, 0.3, option_type, method="lr", american=False)
+        np.testing.assert_allclose(lr, expected, atol=1e-4)
+        crr = lattice.lattice_value(100.0, K, 1.0, 0.05, 0.3, option_type, steps=500, american=False)
+        np.testing.assert_allclose(crr, expected, atol=1e-2)
+
+
+def test_american_values():
+    # without dividends an american call is never exercised early
+    calls = lattice.lattice_value(100.0, K, 1.0, 0.05, 0.3, "c", method="lr")
+    np.testing.assert_allclose(calls, bsm.bs_value(100.0, K, 1.0, 0.05, 0.3, "c"), atol=1e-4)
+
+    puts_crr = lattice.lattice_value(100.0, K, 1.0, 0.05, 0.3, "p", steps=2000)
+    puts_lr = lattice.lattice_value(100.0, K, 1.0, 0.05, 0.3, "p", method="lr")
+    assert (puts_crr > bsm.bs_value(100.0, K, 1.0, 0.05, 0.3, "p")).all()
+    np.testing.assert_allclose(puts_lr, puts_crr, atol=2e-2)
+
+    # deep in the money puts are exercised immediately
+    np.testing.assert_allclose(lattice.lattice_value(50.0, 100.0, 1.0, 0.05, 0.2, "p"), 50.0)
+
+
+def test_lattice_greeks_match_bsm_for_european():
+    greeks = lattice.lattice_greeks(100.0, K, 1.0, 0.05, 0.3, "p", method="lr", american=False)
+    expected = bsm.bs_greeks(100.0, K, 1.0, 0.05, 0.3, "p")
+    for name in ["value", "delta", "gamma", "vega", "theta", "rho"]:
+        np.testing.assert_allclose(getattr(greeks, name), getattr(expected, name), atol=2e-3)
+
+
+def test_lattice_implied_vol_round_trip():
+    sigma = np.array([0.2, 0.3, 0.4, 0.5, 0.6])
+    price = lattice.lattice_value(100.0, K, 0.5, 0.05, sigma, "p", method="lr", steps=51)
+    res = lattice.lattice_implied_vol(price, 100.0, K, 0.5, 0.05, "p", method="lr", steps=51)
+    assert res.converged.all()
+    np.testing.assert_allclose(res.iv, sigma, atol=1e-6)
+
+
+def test_crr_low_vol_falls_back_to_lr():
+    # r * sqrt(dt) > sigma pushes the CRR up probability above 1
+    for sigma in [1e-4, 1e-3]:
+        calls = lattice.lattice_value(100.0, K, 1.0, 0.1, sigma, "c", american=False)
+        np.testing.assert_allclose(calls, bsm.bs_value(100.0, K, 1.0, 0.1, sigma, "c"), atol=1e-6)
+        puts = lattice.lattice_value(100.0, K, 1.0, 0.1, sigma, "p")
+        np.testing.assert_allclose(puts, np.maximum(K - 100.0, 0.0), atol=1e-10)
+
+
+def test_exercise_boundary_scales_with_strike():
+    times, boundary = lattice.exercise_boundary([50.0, 100.0], 1.0, 0.05, 0.3, "p", steps=50)
+    assert times.shape == (50,) and boundary.shape == (2, 50)
+    np.testing.assert_allclose(boundary[1], 2 * boundary[0])
+    assert np.nanmax(boundary[1]) < 100.0
+
+
+def test_american_option_algo():
+    option = Option(S=100, K=110, T=1.0, r=0.05, sigma=0.3, option_type="p", algo="lr")
+    assert option.value > Option(S=100, K=110, T=1.0, r=0.05, sigma=0.3, option_type="p").value
+    assert -1 < option.delta < 0
+
+    op_plot = OptionsPlot(option_positions=[OptionPosition(option=option, quantity=1)], spot_range=[100, 100])
+    df = op_plot.gen_value_df_timeincrementing(0, show_final=False, value_relative=False)
+    np.testing.assert_allclose(df.iloc[0, 1], option.value)
+
+
+def test_lattice_dividend_yield():
+    expected = bsm.bs_value(100.0, K, 1.0, 0.05, 0.3, "c", q=0.04)
+    lr = lattice.lattice_value(100.0, K, 1.0, 0.05, 0.3, "c", q=0.04, method="lr", american=False)
+    np.testing.assert_allclose(lr, expected, atol=1e-4)
+
+    # with a dividend yield american calls are worth more than european ones
+    calls = lattice.lattice_value(100.0, K, 1.0, 0.05, 0.3, "c", q=0.08, method="lr")
+    assert (calls > bsm.bs_value(100.0, K, 1.0, 0.05, 0.3, "c", q=0.08) + 1e-3).all()
+
+    option = Option(S=100, K=90, T=1.0, r=0.05, sigma=0.3, option_type="c", algo="lr", q=0.08)
+    np.testing.assert_allclose(option.iv(option.value), 0.3, atol=1e-6)
+
+
+def test_crr_chain_shares_one_strike_lattice():
+    strikes = np.linspace(20.0, 400.0, 301)
+    T = np.where(np.arange(strikes.size) % 2, 0.5, 1.0)
+    option_type = np.where(np.arange(strikes.size) % 3, "p", "c")
+    chain = lattice.lattice_value(100.0, strikes, T, 0.05, 0.3, option_type, q=0.02, steps=100)
+
+    # priced alone or in a chain, a contract gets the same value
+    alone = [
+        lattice.lattice_value(100.0, k, t, 0.05, 0.3, o, q=0.02, steps=100) for k, t, o in zip(strikes, T, option_type)
+    ]
+    np.testing.assert_allclose(chain, alone, rtol=1e-12, atol=1e-12)
+
+    # about as close to a fine LR tree as a CRR tree of the same size per contract
+    lr = lattice.lattice_value(100.0, strikes, T, 0.05, 0.3, option_type, q=0.02, steps=1001, method="lr")
+    args = [np.broadcast_to(x, strikes.shape).astype(float) for x in (100.0, strikes, T, 0.05, 0.02, 0.3)]
+    per_contract = lattice._induct(*args, bsm.call_mask(option_type), 100, lattice.CRR, True)[0]
+    assert np.abs(chain - lr).max() < 1.5 * np.abs(per_contract - lr).max()
+
+    # at the money the contract sits on a node of the strike lattice, so the value is the CRR tree's exactly
+    one = np.ones(1)
+    tree = lattice._induct(one, one, one, one * 0.05, one * 0.02, one * 0.3, np.array([False]), 100, lattice.CRR, True)
+    atm = lattice.lattice_value(strikes, strikes, 1.0, 0.05, 0.3, "p", q=0.02, steps=100)
+    np.testing.assert_allclose(atm, strikes * tree[0], rtol=1e-12)
+
+    # delta and gamma likewise, against the first two steps of per-contract trees
+    greeks = lattice.lattice_greeks(100.0, strikes, T, 0.05, 0.3, option_type, q=0.02, steps=100)
+    crr = _tree_delta_gamma(*args, bsm.call_mask(option_type), 100, lattice.CRR)
+    lr = _tree_delta_gamma(*args, bsm.call_mask(option_type), 1001, lattice.LEISEN_REIMER)
+    for chain_greek, crr_greek, lr_greek in zip((greeks.delta, greeks.gamma), crr, lr):
+        assert np.abs(chain_greek - lr_greek).max() < 1.5 * np.abs(crr_greek - lr_greek).max()
+
+
+def _tree_delta_gamma(S, K, T, r, q, sigma, is_call, steps, method):
+    _, n1, v1, n2, v2, _ = lattice._induct(S, K, T, r, q, sigma, is_call, steps, method, True)
+    delta = (v1[:, 1] - v1[:, 0]) / (n1[:, 1] - n1[:, 0])
+    gamma = ((v2[:, 2] - v2[:, 1]) / (n2[:, 2] - n2[:, 1]) - (v2[:, 1] - v2[:, 0]) / (n2[:, 1] - n2[:, 0])) / (
+        0.5 * (n2[:, 2] - n2[:, 0])
+    )
+    return delta, gamma
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+import finx_option_pricer.bsm as bsm
+from finx_option_pricer.models import (
+    PricingModel,
+    available_models,
+    evaluate,
+    get_model,
+    model_code,
+    register_model,
+)
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_book import OptionBook
+from finx_option_pricer.option_plot import OptionPosition, OptionsPlot
+
+
+def _doubled_value(S, K, T, r, sigma, option_type, q=0.0):
+    return 2 * bsm.bs_value(S, K, T, r, sigma, option_type, q)
+
+
+register_model(
+    PricingModel(name="test-doubled", value=_doubled_value, greeks=bsm.bs_greeks, implied_vol=bsm.implied_vol),
+    overwrite=True,
+)
+
+
+def test_bsm_is_default():
+    assert "bsm" in available_models()
+    option = Option(S=90, K=100, T=1 / 12, r=0.0, sigma=0.3)
+    assert option.model is get_model("bsm")
+    # the numba backend's normal CDF can differ from scipy's in the last bit
+    np.testing.assert_allclose(option.value, bsm.bs_call_value(90, 100, 1 / 12, 0.0, 0.3), rtol=1e-12)
+
+
+def test_unknown_algo():
+    with pytest.raises(ValueError, match="Unknown pricing model"):
+        Option(S=90, K=100, T=1 / 12, r=0.0, sigma=0.3, algo="nope").value
+
+
+def test_dispatch_to_registered_model():
+    kwargs = dict(S=90, K=100, T=1 / 12, r=0.0, sigma=0.3, option_type="p")
+    bsm_option = Option(**kwargs)
+    doubled = Option(algo="test-doubled", **kwargs)
+    np.testing.assert_allclose(doubled.value, 2 * bsm_option.value)
+
+    book = OptionBook.from_options([bsm_option, doubled])
+    np.testing.assert_allclose(book.value, [bsm_option.value, 2 * bsm_option.value])
+    assert book.algo.tolist() == ["bsm", "test-doubled"]
+
+    positions = [OptionPosition(quantity=1, option=bsm_option), OptionPosition(quantity=1, option=doubled)]
+    df = OptionsPlot(option_positions=positions, spot_range=[90, 90]).gen_value_df_timeincrementing(
+        0, show_final=False, value_relative=False
+    )
+    np.testing.assert_allclose(df[21].values, [3 * bsm_option.value])
+
+
+def test_unknown_option_type():
+    for option_type in ["x", 5]:
+        with pytest.raises(ValueError, match="option_type must be c or p"):
+            Option(S=90, K=100, T=1 / 12, r=0.0, sigma=0.3, option_type=option_type).value
+    with pytest.raises(ValueError):
+        Option(S=90, K=100, T=1 / 12, r=0.0, sigma=0.3, option_type="x").freeze()
+    with pytest.raises(ValueError):
+        bsm.bs_value(90, 100, 1 / 12, 0.0, 0.3, ["c", "call"])
+
+
+def test_evaluate_keeps_output_dtypes():
+    algo_code = np.array([model_code("bsm"), model_code("test-doubled"), model_code("bsm")])
+    S, K, T, r, q = (np.full(3, x) for x in (90.0, 100.0, 1 / 12, 0.0, 0.0))
+    price = bsm.bs_value(S, K, T, r, 0.3, "c")
+    res = evaluate(algo_code, "implied_vol", price, S, K, T, r, np.ones(3, dtype=bool), q)
+    assert res.converged.dtype == bool and res.converged.all()
+    assert res.iterations.dtype.kind == "i"
+    np.testing.assert_allclose(res.iv, 0.3)
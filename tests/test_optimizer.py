@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from finx_option_pricer.optimizer import Empirical, Lognormal, optimize, pareto_mask
+from finx_option_pricer.option_plot import OptionsPlot
+from finx_option_pricer.option_structures import gen_calendar, gen_strangle
+
+BASE = dict(spot_price=100.0, vol_initial=0.25, vol_final=0.2)
+GRID = dict(strike_price=[102.0, 105.0, 110.0], put_strike_price=[90.0, 95.0, 98.0], days=[10, 20], put_ratio=[1, 2])
+
+
+def test_scores_match_options_plot():
+    candidate = dict(strike_price=105.0, put_strike_price=95.0, days=20, put_ratio=2)
+    positions = gen_strangle(**BASE, **candidate)
+    assert [(p.option.K, p.option.option_type, p.quantity) for p in positions] == [(105.0, "c", -1), (95.0, "p", -2)]
+
+    # at expiry, the spot grid of the plot
+    _, _, values = OptionsPlot(option_positions=positions, spot_range=[80, 120], strike_interval=1.0).value_grid(0)
+    final = values[-1]
+    spot_shocks = np.arange(80, 121) / 100.0 - 1
+
+    result = optimize(gen_strangle, [candidate], Empirical([-0.1, 0.0, 0.0, 0.07]), base=BASE, spot_shocks=spot_shocks)
+    row = result.frontier.iloc[0]
+    assert row["expected_pnl"] == pytest.approx((final[10] + 2 * final[20] + final[27]) / 4)
+    assert row["max_loss"] == pytest.approx(-final.min())
+    assert row["return_on_margin"] == pytest.approx(row["expected_pnl"] / row["max_loss"])
+
+    # lognormal weights are probabilities centered on the forward, while the grid holds the tails
+    years = np.array([5 / 252, 20 / 252])
+    weights = Lognormal(sigma=0.2, drift=0.5).weights(spot_shocks, years)
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+    np.testing.assert_allclose((weights * (1 + spot_shocks)).sum(axis=1), np.exp(0.5 * years), rtol=1e-3)
+
+
+def test_frontier_is_pareto_optimal():
+    scores = np.array([[1.0, 1.0], [2.0, 0.0], [0.5, 0.5], [1.0, 1.0], [0.0, 2.0]])
+    assert pareto_mask(scores).tolist() == [True, True, False, True, True]
+
+    kwargs = dict(base=BASE, distribution=Lognormal(sigma=0.2), objectives=["expected_pnl", "max_loss"])
+    full = optimize(gen_strangle, GRID, batch_size=100, **kwargs)
+    assert full.evaluated == full.feasible == 36
+    # batches pruned to their own frontiers merge into the same one
+    batched = optimize(gen_strangle, GRID, batch_size=5, **kwargs)
+    pooled = optimize(gen_strangle, GRID, batch_size=5, processes=2, **kwargs)
+    assert full.frontier.equals(batched.frontier) and full.frontier.equals(pooled.frontier)
+
+    # sorted by expected P&L, so along the frontier more P&L costs more max loss
+    assert (np.diff(full.frontier["expected_pnl"]) <= 0).all() and (np.diff(full.frontier["max_loss"]) <= 0).all()
+    best = full.best("max_loss")
+    assert best["max_loss"] == full.frontier["max_loss"].min()
+
+    capped = optimize(gen_strangle, GRID, max_loss=best["max_loss"] + 1.0, **kwargs)
+    assert capped.feasible < capped.evaluated and (capped.frontier["max_loss"] <= best["max_loss"] + 1.0).all()
+    assert capped.positions(0)[1].quantity == -capped.frontier["put_ratio"][0]
+
+
+def test_calendar_dte_pairs():
+    grid = [
+        dict(front_days=front, back_days=back, back_ratio=ratio)
+        for front in (5, 10, 20)
+        for back in (10, 20, 40)
+        for ratio in (1, 2)
+    ]
+    base = dict(
+        spot_price=100.0, strike_price=100.0, front_vol=0.3, front_vol_final=0.25, back_vol=0.27, back_vol_final=0.26
+    )
+    result = optimize(
+        gen_calendar, grid, Lognormal(sigma=0.2), base=base, where=lambda c: c["back_days"] > c["front_days"], horizon=3
+    )
+    assert result.evaluated == 12
+    assert (result.frontier["back_days"] > result.frontier["front_days"]).all()
+    assert list(result.frontier.columns) == ["front_days", "back_days", "back_ratio", *result.frontier.columns[3:]]
@@ -1,7 +1,11 @@
 import math
+import pickle
 from doctest import master
 
-from finx_option_pricer.option import Option
+import numpy as np
+import pytest
+
+from finx_option_pricer.option import FrozenOption, Option
 
 
 def test_intrinsic_value():
@@ -41,3 +45,54 @@ def test_iv():
     option = Option(S=90, K=100, T=1 / 12, r=0.0, sigma=None, option_type="c")
     expected_iv = 0.608
     assert math.isclose(option.iv(2.8), expected_iv, abs_tol=0.01)
+
+
+def test_greeks():
+    option = Option(S=90, K=100, T=1 / 12, r=0.01, sigma=0.3, option_type="p")
+    greeks = option.greeks()
+    assert math.isclose(greeks.value, option.value)
+    assert math.isclose(greeks.delta, option.delta)
+    assert math.isclose(greeks.gamma, option.gamma)
+    assert math.isclose(greeks.vega, option.vega)
+    assert math.isclose(greeks.theta, option.theta)
+    assert math.isclose(greeks.rho, option.rho)
+
+
+@pytest.mark.parametrize("algo", ["bsm", "baw", "crr"])
+@pytest.mark.parametrize("option_type", ["c", "p"])
+@pytest.mark.parametrize("q", [0.0, 0.03])
+def test_frozen_option_matches_option(algo, option_type, q):
+    option = Option(S=90.0, K=100.0, T=1 / 12, r=0.01, sigma=0.3, option_type=option_type, algo=algo, q=q)
+    frozen = option.freeze()
+
+    assert math.isclose(frozen.value, option.value, rel_tol=1e-12)
+    np.testing.assert_allclose(frozen.greeks(), option.greeks(), rtol=1e-10, atol=1e-14)
+    assert math.isclose(frozen.delta, option.delta, rel_tol=1e-10)
+    assert math.isclose(frozen.iv(option.value), 0.3, rel_tol=1e-6)
+    assert frozen.id == option.id and frozen.cache_key == option.cache_key
+    assert frozen.break_even_value == option.break_even_value
+    assert frozen.thaw() == option
+    # cached on first access
+    assert frozen.greeks() is frozen.greeks()
+    assert frozen.id is frozen.id and frozen.cache_key is frozen.cache_key
+
+
+def test_frozen_option_is_immutable_and_replaceable():
+    frozen = FrozenOption(S=100.0, K=105.0, T=30 / 252, r=0.02, sigma=0.25)
+    with pytest.raises(AttributeError):
+        frozen.S = 101.0
+    with pytest.raises(AttributeError):
+        frozen.__dict__
+    with pytest.raises(TypeError):
+        frozen.replace(spot=101.0)
+
+    frozen.value
+    bumped = frozen.replace(S=101.0)
+    assert bumped.time_terms is frozen.time_terms  # S doesn't move sqrt(T) or the discount factors
+    assert bumped.value == Option(S=101.0, K=105.0, T=30 / 252, r=0.02, sigma=0.25).freeze().value
+    decayed = frozen.replace(T=29 / 252)
+    assert decayed.time_terms != frozen.time_terms and decayed.value < frozen.value
+
+    assert frozen == frozen.replace() and hash(frozen) == hash(frozen.replace())
+    assert {frozen: 1}[pickle.loads(pickle.dumps(frozen))] == 1
+    assert math.isnan(frozen.replace(T=0.0).d1) and frozen.replace(T=0.0).value == 0.0
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_book import OptionBook
+from finx_option_pricer.option_plot import OptionPosition
+
+
+def _positions():
+    return [
+        OptionPosition(quantity=-1, option=Option(S=100, K=95, T=0.1, r=0.01, sigma=0.3, option_type="p")),
+        OptionPosition(quantity=2, option=Option(S=100, K=105, T=0.2, r=0.01, sigma=0.25), end_sigma=0.2),
+    ]
+
+
+def test_option_book_matches_options():
+    positions = _positions()
+    book = OptionBook.from_positions(positions)
+
+    assert len(book) == 2
+    assert book.nbytes == 2 * 66
+    np.testing.assert_allclose(book.value, [op.option.value for op in positions])
+    np.testing.assert_allclose(book.position_value, [op.initial_value for op in positions])
+    np.testing.assert_allclose(book.break_even_value, [op.option.break_even_value for op in positions])
+    np.testing.assert_allclose(book.greeks().delta, [op.option.delta for op in positions])
+    np.testing.assert_allclose(book.intrinsic_value, [0.0, 0.0])
+    np.testing.assert_allclose(book.final_value(90.0), [5.0, 0.0])
+
+
+def test_option_book_round_trips():
+    positions = _positions()
+    book = OptionBook.from_positions(positions)
+    assert book.to_positions() == positions
+    assert [type(op.quantity) for op in book.to_positions()] == [int, int]
+    # fractional quantities are kept, not truncated
+    fractional = OptionBook.from_options([op.option for op in positions], quantity=[0.5, -1.5]).to_positions()
+    assert [op.quantity for op in fractional] == [0.5, -1.5]
+
+    df = book.to_frame()
+    assert list(df.columns) == ["S", "K", "T", "r", "sigma", "is_call", "quantity", "end_sigma", "algo_code", "q"]
+    from_df = OptionBook.from_frame(df)
+    assert np.shares_memory(from_df.K, df["K"].to_numpy())
+    # every field is read-only, whether broadcast, converted or shared
+    assert not any(getattr(from_df, f).flags.writeable for f in df.columns)
+    assert not OptionBook(S=100.0, K=[90.0, 110.0], T=0.5, r=0.0, sigma=0.2, is_call=True).S.flags.writeable
+    assert from_df.to_positions() == positions
+
+    df = pd.DataFrame(dict(S=100.0, K=[90.0, 110.0], T=0.5, r=0.0, sigma=0.2, option_type=["c", "p"]))
+    np.testing.assert_allclose(OptionBook.from_frame(df).intrinsic_value, [10.0, 10.0])
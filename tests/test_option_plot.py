@@ -0,0 +1,163 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_plot import (
+    FrozenOptionPosition,
+    OptionPosition,
+    OptionsPlot,
+)
+from finx_option_pricer.option_structures import gen_calendar, gen_strangle
+
+
+def _reference_values(option_positions, strike_range, days, min_days):
+    """Per cell valuation, one Option at a time"""
+    rows = []
+    for day in range(0, days + 1):
+        if day >= min_days:
+            continue
+        row = np.zeros(len(strike_range))
+        for op in option_positions:
+            newT = op.option.T - day / 252
+            sigma = op.option.sigma
+            if op.end_sigma is not None:
+                sigma = op.interpolated_vol((op.option.T - newT) / op.option.T)
+            for i, price in enumerate(strike_range):
+                x = Option(
+                    S=price,
+                    K=op.option.K,
+                    T=newT,
+                    r=op.option.r,
+                    sigma=sigma,
+                    option_type=op.option.option_type,
+                    q=op.option.q,
+                )
+                row[i] += x.value * op.quantity
+        rows.append(row)
+    return np.array(rows)
+
+
+def test_gen_value_df_timeincrementing_matches_per_cell_values():
+    option_positions = gen_calendar(
+        spot_price=100.0,
+        strike_price=100.0,
+        front_days=10,
+        front_vol=0.30,
+        front_vol_final=0.20,
+        back_days=15,
+        back_vol=0.25,
+        back_vol_final=0.22,
+    )
+    op_plot = OptionsPlot(option_positions=option_positions, spot_range=[90, 110], strike_interval=1.0)
+    df = op_plot.gen_value_df_timeincrementing(10, value_relative=False)
+
+    strike_range = np.arange(90, 111, 1.0)
+    np.testing.assert_array_equal(df["strikes"].values, strike_range)
+
+    expected = _reference_values(option_positions, strike_range, 10, 10)
+    np.testing.assert_allclose(df.iloc[:, 1:-1].values.T, expected, rtol=1e-12, atol=1e-12)
+
+    # front month expires, back month has 5 days remaining at its initial vol
+    back = option_positions[1].option
+    expected_final = []
+    for price in strike_range:
+        front_value = option_positions[0].option.final_value(price) * -1
+        back_value = Option(S=price, K=back.K, T=back.T - 10 / 252, r=back.r, sigma=back.sigma).value
+        expected_final.append(front_value + back_value)
+    np.testing.assert_allclose(df[0].values, expected_final, rtol=1e-12)
+
+
+def test_greek_grid_matches_per_cell_greeks():
+    option_positions = gen_calendar(
+        spot_price=100.0,
+        strike_price=100.0,
+        front_days=10,
+        front_vol=0.30,
+        front_vol_final=0.20,
+        back_days=15,
+        back_vol=0.25,
+        back_vol_final=0.22,
+    )
+    op_plot = OptionsPlot(option_positions=option_positions, spot_range=[90, 110], strike_interval=1.0)
+    strike_range, labels, surfaces = op_plot.greek_grid(10, step=5, greeks=["delta", "gamma", "theta", "vega"])
+
+    # the value surface is value_grid's
+    _, value_labels, values = op_plot.value_grid(10, step=5)
+    assert labels == value_labels and list(surfaces) == ["value", "delta", "gamma", "theta", "vega"]
+    np.testing.assert_allclose(surfaces["value"], values, rtol=1e-12)
+
+    for row, day in enumerate([0, 5]):
+        for i, price in enumerate(strike_range):
+            expected = np.zeros(4)
+            for op in option_positions:
+                newT = op.option.T - day / 252
+                sigma = op.interpolated_vol((op.option.T - newT) / op.option.T)
+                x = replace(op.option, S=price, T=newT, sigma=sigma)
+                expected += np.array([x.delta, x.gamma, x.theta, x.vega]) * op.quantity
+            actual = [surfaces[greek][row, i] for greek in ("delta", "gamma", "theta", "vega")]
+            np.testing.assert_allclose(actual, expected, rtol=1e-10)
+
+    # front month expires: its delta is the quantity in the money, it has no gamma
+    back = option_positions[1].option
+    for i, price in enumerate(strike_range):
+        live = Option(S=price, K=back.K, T=back.T - 10 / 252, r=back.r, sigma=back.sigma)
+        front_delta = -1.0 * (price > 100.0)
+        assert surfaces["delta"][-1, i] == pytest.approx(front_delta + live.delta)
+        assert surfaces["gamma"][-1, i] == pytest.approx(live.gamma)
+
+    frames = op_plot.gen_greek_dfs_timeincrementing(10, step=5, greeks=["gamma"])
+    assert list(frames) == ["value", "gamma"] and list(frames["gamma"].columns) == ["strikes", *labels]
+    np.testing.assert_allclose(frames["gamma"].iloc[:, 1:].values.T, surfaces["gamma"])
+    with pytest.raises(ValueError):
+        op_plot.greek_grid(10, greeks=["speed"])
+
+
+def test_gen_value_df_timeincrementing_relative_value():
+    op = OptionPosition(quantity=1, option=Option(S=90, K=95, T=20 / 252, r=0.0, sigma=0.3, option_type="p"))
+    op_plot = OptionsPlot(option_positions=[op], spot_range=[80, 100])
+    df = op_plot.gen_value_df_timeincrementing(5, step=5)
+
+    assert list(df.columns) == ["strikes", 20, 15, 0]
+    at_spot = df.set_index("strikes").loc[90.0]
+    np.testing.assert_almost_equal(at_spot[20], 0.0)
+    np.testing.assert_almost_equal(at_spot[0], 5.0 - op.initial_value)
+
+
+def test_gen_value_df_timeincrementing_dividend_yield():
+    option_positions = gen_calendar(
+        spot_price=100.0,
+        strike_price=100.0,
+        front_days=10,
+        front_vol=0.30,
+        front_vol_final=0.20,
+        back_days=15,
+        back_vol=0.25,
+        back_vol_final=0.22,
+        q=0.04,
+    )
+    assert all(op.option.q == 0.04 for op in option_positions)
+    op_plot = OptionsPlot(option_positions=option_positions, spot_range=[90, 110], strike_interval=1.0)
+    df = op_plot.gen_value_df_timeincrementing(10, show_final=False, value_relative=False)
+
+    expected = _reference_values(option_positions, np.arange(90, 111, 1.0), 10, 10)
+    np.testing.assert_allclose(df.iloc[:, 1:].values.T, expected, rtol=1e-12, atol=1e-12)
+
+
+def test_frozen_positions():
+    positions = gen_strangle(spot_price=100.0, strike_price=105.0, days=30, vol_initial=0.25, vol_final=0.2)
+    frozen = [op.freeze() for op in positions]
+
+    assert [op.id for op in frozen] == [op.id for op in positions]
+    np.testing.assert_allclose([op.initial_value for op in frozen], [op.initial_value for op in positions])
+    expected = OptionsPlot(option_positions=positions, spot_range=[90, 110]).gen_value_df_timeincrementing(10)
+    df = OptionsPlot(option_positions=frozen, spot_range=[90, 110]).gen_value_df_timeincrementing(10)
+    np.testing.assert_allclose(df.to_numpy(), expected.to_numpy(), rtol=1e-12)
+
+    bumped = frozen[0].replace(S=101.0, quantity=2)
+    assert (bumped.option.S, bumped.quantity, bumped.end_sigma) == (101.0, 2, frozen[0].end_sigma)
+    assert bumped.thaw() == OptionPosition(
+        option=replace(positions[0].option, S=101.0), quantity=2, end_sigma=positions[0].end_sigma
+    )
+    assert FrozenOptionPosition(positions[0].option, -1) == FrozenOptionPosition(positions[0].option.freeze(), -1)
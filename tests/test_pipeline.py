@@ -0,0 +1,100 @@
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import finx_option_pricer.bsm as bsm
+from finx_option_pricer.pipeline import (
+    GREEK_COLUMNS,
+    OUTPUT_COLUMNS,
+    main,
+    read_chunks,
+    run,
+)
+
+
+@pytest.fixture
+def chain(tmp_path):
+    """Chain quoted off known vols, with file column names that need mapping and a few unusable quotes"""
+    rng = np.random.default_rng(0)
+    n = 1_000
+    df = pd.DataFrame(
+        dict(
+            underlying_price=100.0,
+            strike=rng.uniform(80, 120, n).round(1),
+            days=rng.integers(5, 120, n),
+            option_type=rng.choice(["call", "put"], n),
+            true_vol=rng.uniform(0.15, 0.5, n),
+        )
+    )
+    value = bsm.bs_value(100.0, df.strike, df.days / 252, 0.03, df.true_vol, df.option_type.str[0].to_numpy())
+    df["bid"] = value - 0.01
+    df["ask"] = value + 0.01
+    df.loc[:2, "ask"] = [np.nan, 0.0, df.bid[2] - 1]  # missing side, zero ask and crossed market
+
+    path = tmp_path / "chain.csv"
+    df.to_csv(path, index=False)
+    return path, df
+
+
+COLUMNS = dict(underlying_price="S", strike="K")
+
+
+def check_enriched(out: pd.DataFrame, df: pd.DataFrame):
+    assert len(out) == len(df) and list(out.columns) == list(df.rename(columns=COLUMNS).columns) + OUTPUT_COLUMNS
+    np.testing.assert_array_equal(out.K, df.strike)  # row order preserved across chunks
+
+    assert not out.iv_converged[:3].any() and out.iv[:3].isna().all() and out.delta[:3].isna().all()
+    good = out[3:]
+    assert good.iv_converged.all()
+    np.testing.assert_allclose(good.mid, (good.bid + good.ask) / 2)
+
+    expected = bsm.bs_greeks(good.S, good.K, good.days / 252, 0.03, good.iv, good.option_type.str[0].to_numpy())
+    for name in GREEK_COLUMNS:
+        np.testing.assert_allclose(good[name], getattr(expected, name), rtol=1e-9, atol=1e-12)
+    # the 1 cent half spread only moves iv by a little
+    np.testing.assert_allclose(good.iv, df.true_vol[3:], atol=5e-3)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".csv.gz", ".csv.bz2"])
+@pytest.mark.parametrize("pyarrow", [True, False])
+def test_run_csv_in_chunks(chain, tmp_path, monkeypatch, pyarrow, suffix):
+    if not pyarrow:
+        # CSV falls back to DataFrame.to_csv without pyarrow
+        monkeypatch.setitem(sys.modules, "pyarrow", None)
+    path, df = chain
+    out_path = tmp_path / f"out{suffix}"
+
+    assert [len(c) for c in read_chunks(path, chunksize=300)] == [300, 300, 300, 100]
+    rows = run(path, out_path, chunksize=300, columns=COLUMNS, r=0.03)
+
+    assert rows == len(df)
+    if suffix != ".csv":
+        # compressed as pandas would, one member per chunk
+        with open(out_path, "rb") as f:
+            assert f.read(3) in (b"\x1f\x8b\x08", b"BZh")
+    check_enriched(pd.read_csv(out_path), df)
+
+
+def test_run_parquet(chain, tmp_path):
+    pytest.importorskip("pyarrow")
+    path, df = chain
+    parquet_path = tmp_path / "chain.parquet"
+    df.to_parquet(parquet_path, index=False)
+
+    assert [len(c) for c in read_chunks(parquet_path, chunksize=400)] == [400, 400, 200]
+    run(parquet_path, tmp_path / "out.parquet", chunksize=400, columns=COLUMNS, r=0.03)
+    check_enriched(pd.read_parquet(tmp_path / "out.parquet"), df)
+
+
+def test_main(chain, tmp_path):
+    path, df = chain
+    out_path = tmp_path / "out.csv"
+
+    args = [str(path), str(out_path), "--chunksize", "256", "--r", "0.03"]
+    assert main(args + ["--column", "underlying_price=S", "--column", "strike=K"]) == 0
+    check_enriched(pd.read_csv(out_path), df)
+
+    with pytest.raises(SystemExit):
+        main(args + ["--column", "strike"])
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+import finx_option_pricer
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_plot import OptionPosition
+from finx_option_pricer.portfolio import DOLLAR, PERCENT, RAW, Portfolio
+
+
+def _positions(S, sigma):
+    return [
+        OptionPosition(quantity=-2, option=Option(S=S, K=S * 0.95, T=0.1, r=0.01, sigma=sigma, option_type="p")),
+        OptionPosition(quantity=1, option=Option(S=S, K=S * 1.05, T=0.2, r=0.01, sigma=sigma, algo="baw")),
+    ]
+
+
+def _expected(positions, multiplier=1.0):
+    return np.array(
+        [
+            [getattr(op.option, name) * op.quantity * multiplier for name in ("value", "delta", "gamma", "vega")]
+            for op in positions
+        ]
+    ).sum(axis=0)
+
+
+def _bumped(positions, **changes):
+    return [OptionPosition(quantity=op.quantity, option=op.option.freeze().replace(**changes)) for op in positions]
+
+
+def _bsm_greeks_priced(profiler):
+    return sum(k.elements for name, k in profiler.kernel_stats().items() if name.startswith("bsm.bs_greeks"))
+
+
+def test_portfolio_aggregates_and_reprices_only_what_changed():
+    spy, qqq = _positions(400.0, 0.2), _positions(300.0, 0.25)
+    book = Portfolio.from_positions(dict(SPY=spy, QQQ=qqq), multiplier=100)
+    assert len(book) == 4 and book.underlyings == ["SPY", "QQQ"]
+
+    np.testing.assert_allclose(book.greeks()[:4], _expected(spy + qqq, 100))
+    np.testing.assert_allclose(book.greeks(underlying="QQQ")[:4], _expected(qqq, 100))
+
+    # a tick on SPY reprices the SPY legs only, a quantity change reprices nothing
+    spy = _bumped(spy, S=410.0, sigma=0.21)
+    ticked = _expected(spy + qqq, 100)
+    qqq[0].quantity = 5
+    resized = _expected(spy + qqq, 100)
+    with finx_option_pricer.profile() as p:
+        book.update("SPY", S=410.0, vol_shift=0.01)
+        np.testing.assert_allclose(book.greeks()[:4], ticked)
+        book.set_quantity(book.legs("QQQ")[0], 5)
+        np.testing.assert_allclose(book.greeks()[:4], resized)
+    # the SPY put, its baw call is priced by american
+    assert _bsm_greeks_priced(p) == 1
+    assert p.span_stats()["portfolio.reprice"].calls == 1
+
+    # a new leg is priced on its own
+    new = OptionPosition(quantity=3, option=Option(S=300.0, K=310.0, T=0.15, r=0.01, sigma=0.25))
+    leg_expected, total_expected = _expected([new], 100), _expected(spy + qqq + [new], 100)
+    with finx_option_pricer.profile() as p:
+        leg = book.add("QQQ", new)
+        np.testing.assert_allclose(book.leg_greeks(leg)[:4], leg_expected)
+        np.testing.assert_allclose(book.greeks()[:4], total_expected)
+    assert _bsm_greeks_priced(p) == 1
+
+    book.remove(leg)
+    np.testing.assert_allclose(book.greeks()[:4], _expected(spy + qqq, 100))
+    frame = book.to_frame()
+    assert list(frame.index) == book.legs("SPY") + book.legs("QQQ")
+    np.testing.assert_allclose(frame["delta"].sum(), book.greeks().delta)
+
+
+def test_portfolio_units():
+    option = Option(S=100.0, K=100.0, T=0.25, r=0.02, sigma=0.3)
+    book = Portfolio(multiplier=100)
+    leg = book.add("XYZ", OptionPosition(option=option, quantity=-2))
+
+    raw, dollar, percent = (book.leg_greeks(leg, units) for units in (RAW, DOLLAR, PERCENT))
+    assert raw.delta == pytest.approx(-200 * option.delta)
+    assert dollar.delta == pytest.approx(raw.delta * 100.0)
+    assert dollar.gamma == pytest.approx(raw.gamma * 100.0 ** 2 / 100)
+    assert dollar.vega == pytest.approx(raw.vega / 100)
+    assert dollar.theta == pytest.approx(raw.theta / 252)
+    assert dollar.rho == pytest.approx(raw.rho / 100)
+    # relative to the 20_000 notional, a short ATM call is around -55 delta
+    assert percent.delta == pytest.approx(-100 * option.delta)
+    assert book.greeks(PERCENT) == pytest.approx(percent)
+
+    book.set_quantity(leg, 0)
+    assert book.greeks(PERCENT) == (0.0,) * 6
+    with pytest.raises(ValueError):
+        book.greeks("bps")
@@ -0,0 +1,90 @@
+import json
+
+import numpy as np
+import pytest
+
+import finx_option_pricer
+import finx_option_pricer.bsm as bsm
+from finx_option_pricer import profiling
+from finx_option_pricer.calcs import calc_straddle_iv
+from finx_option_pricer.option_plot import OptionsPlot
+from finx_option_pricer.option_structures import gen_strangle
+
+
+@pytest.fixture(params=[bsm.NUMPY, bsm.NUMBA])
+def backend(request, monkeypatch):
+    if request.param == bsm.NUMBA and not bsm.HAS_NUMBA:
+        pytest.skip("numba is not installed")
+    # the test batches are small, keep them on the selected backend's kernels
+    monkeypatch.setattr(bsm, "NUMBA_MIN_SIZE", 0)
+    previous = bsm.get_backend()
+    bsm.set_backend(request.param)
+    yield request.param
+    bsm.set_backend(previous)
+
+
+def test_kernel_counters_and_iterations(backend):
+    S = np.linspace(90, 110, 50)
+    price = bsm.bs_value(S, 100.0, 0.1, 0.01, 0.25, "c")
+
+    with finx_option_pricer.profile() as p:
+        bsm.bs_value(S, 100.0, 0.1, 0.01, 0.25, "c")
+        bsm.bs_greeks(S[:, None], 100.0, 0.1, 0.01, np.array([0.2, 0.3]))
+        res = bsm.implied_vol(price, S, 100.0, 0.1, 0.01, "c")
+
+    kernels = p.kernel_stats()
+    assert kernels[f"bsm.bs_value[{backend}]"] == (1, 50)
+    assert kernels[f"bsm.bs_greeks[{backend}]"] == (1, 100)
+    assert kernels[f"bsm.implied_vol[{backend}]"] == (1, 50)
+    if backend == bsm.NUMPY:
+        # the solver's per iteration evaluations, only the still active quotes
+        assert kernels["bsm.value_vega"] == (res.iterations.max(), res.iterations.sum())
+
+    hist = p.iteration_histograms()["bsm.implied_vol"]
+    assert hist.sum() == 50 and (np.arange(hist.size) * hist).sum() == res.iterations.sum()
+    assert "bsm.implied_vol iterations: 50 quotes" in p.summary()
+
+    # nothing is collected once the block has ended
+    bsm.bs_value(S, 100.0, 0.1, 0.01, 0.25, "c")
+    assert p.kernel_stats()[f"bsm.bs_value[{backend}]"].calls == 1
+    assert profiling.get_profiler() is None
+
+
+def test_spans_and_chrome_trace(tmp_path):
+    positions = gen_strangle(spot_price=100.0, strike_price=105.0, days=10, vol_initial=0.25, vol_final=0.2)
+    op_plot = OptionsPlot(option_positions=positions, spot_range=[90, 110])
+
+    with finx_option_pricer.profile() as p:
+        op_plot.gen_value_df_timeincrementing(10, step=5)
+        calc_straddle_iv(S=100.0, K=100.0, call_price=2.4, put_price=2.6, time_days=20)
+
+    spans = p.span_stats()
+    for name in ("value_grid", "legs", "sigma", "price", "payoff", "dataframe"):
+        assert spans[f"options_plot.{name}"].calls >= 1
+    assert spans["calcs.straddle_iv.scan"].calls == spans["calcs.straddle_iv.refine"].calls == 1
+    # phases run inside value_grid
+    assert spans["options_plot.price"].total <= spans["options_plot.value_grid"].total <= p.elapsed
+
+    p.export_chrome_trace(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    events = trace["traceEvents"]
+    assert len(events) == sum(s.calls for s in spans.values())
+    assert {e["ph"] for e in events} == {"X"} and all(e["dur"] >= 0 for e in events)
+    assert trace["otherData"]["kernels"]
+
+
+def test_disabled_and_nested():
+    assert profiling.span("x") is profiling.span("y")  # the shared no-op
+    assert profiling.count("x", np.ones(3)) is None
+
+    with profiling.profile(max_spans=1) as outer:
+        with profiling.span("a"):
+            with profiling.profile() as inner:
+                with profiling.span("b"):
+                    pass
+        with profiling.span("a"):
+            pass
+
+    assert set(inner.span_stats()) == {"b"}
+    assert outer.span_stats()["a"].calls == 2 and "b" not in outer.span_stats()
+    assert len(outer.spans) == 1 and outer.dropped_spans == 1
@@ -0,0 +1,84 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import finx_option_pricer
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_plot import OptionPosition
+from finx_option_pricer.portfolio import DOLLAR, Portfolio
+from finx_option_pricer.repricer import Repricer, Tick
+
+
+def _book():
+    def legs(S, sigma):
+        return [
+            OptionPosition(quantity=-2, option=Option(S=S, K=S * 0.97, T=30 / 252, r=0.01, sigma=sigma + 0.02)),
+            OptionPosition(quantity=1, option=Option(S=S, K=S, T=60 / 252, r=0.01, sigma=sigma, option_type="p")),
+            OptionPosition(quantity=3, option=Option(S=S, K=S * 1.05, T=90 / 252, r=0.01, sigma=sigma - 0.01)),
+        ]
+
+    return Portfolio.from_positions(dict(SPY=legs(400.0, 0.2), QQQ=legs(300.0, 0.25)), multiplier=100)
+
+
+def _exact(ticks, units):
+    """Full reprice of a fresh book after the same ticks"""
+    book, start = _book(), _book().greeks().value
+    for underlying, S, sigma, days in ticks:
+        book.update(underlying, S=S, vol_shift=None if sigma is None else sigma - 0.2, days=days)
+    return book.greeks().value - start, book.greeks(units)
+
+
+def test_small_moves_use_the_taylor_expansion():
+    repricer = Repricer(_book(), units=DOLLAR, max_spot_move=0.01, max_vol_move=0.01, max_days=1.0)
+    anchor = repricer.on_tick("SPY", 400.0, 0.2)
+    assert anchor.pnl == pytest.approx(0.0, abs=1e-9)
+
+    ticks = [("SPY", 401.5, 0.205, 0.2), ("SPY", 398.0, 0.196, 0.5)]
+    with finx_option_pricer.profile() as p:
+        results = list(repricer.run(ticks))
+    assert not p.kernel_stats()  # nothing was priced
+    assert not any(r.full for r in results)
+
+    pnl, greeks = _exact([("SPY", 398.0, 0.196, 0.5)], DOLLAR)
+    assert results[-1].pnl == pytest.approx(pnl, rel=0.01)
+    got = results[-1].greeks
+    assert (got.delta, got.vega) == pytest.approx((greeks.delta, greeks.vega), rel=0.02)
+    # theta and rho are held at the anchor's
+    assert got[4:] == anchor.greeks[4:]
+
+
+def test_large_moves_reprice_the_underlying_only():
+    book = _book()
+    repricer = Repricer(book, max_spot_move=0.01)
+
+    with finx_option_pricer.profile() as p:
+        result = repricer.on_tick("QQQ", 306.0)
+    assert result.full and repricer.full_reprices == 1
+    assert sum(k.elements for name, k in p.kernel_stats().items() if name.startswith("bsm.bs_greeks")) == 3
+
+    pnl, greeks = _exact([("QQQ", 306.0, None, None)], "raw")
+    assert result.pnl == pytest.approx(pnl) and result.greeks == pytest.approx(greeks)
+    # the next small move is measured from the new anchor
+    assert not repricer.on_tick("QQQ", 307.0).full
+    assert repricer.on_tick("QQQ", 300.0).full
+
+    stats = repricer.stats()
+    assert stats.ticks == 3 and stats.full_reprices == 2
+    assert 0 < stats.p50 <= stats.p99 <= stats.max
+
+
+def test_async_stream():
+    repricer = Repricer(_book())
+
+    async def feed():
+        for S in (400.0, 400.5, 401.0):
+            await asyncio.sleep(0)
+            yield Tick("SPY", S)
+
+    async def collect():
+        return [result async for result in repricer.stream(feed())]
+
+    results = asyncio.run(collect())
+    assert [r.tick.S for r in results] == [400.0, 400.5, 401.0]
+    assert results[-1].pnl == pytest.approx(_exact([("SPY", 401.0, None, None)], "raw")[0], rel=1e-3)
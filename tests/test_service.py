@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+import finx_option_pricer.bsm as bsm
+from finx_option_pricer import cache
+from finx_option_pricer.client import PricingClient, ServiceError
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_plot import OptionPosition, OptionsPlot
+from finx_option_pricer.service import PricingService, background
+
+
+@pytest.fixture(autouse=True)
+def restore_cache():
+    previous = cache.get_cache()
+    yield
+    cache._cache = previous
+
+
+def test_concurrent_requests_are_batched():
+    service = PricingService(window=0.01, cache_size=None)
+    requests = [
+        dict(S=100.0, K=[90.0 + i, 110.0 - i], T=0.1, r=0.01, sigma=0.25, option_type=["p", "c"]) for i in range(20)
+    ]
+
+    async def run():
+        return await asyncio.gather(*[service.handle("POST", "/price", json.dumps(r).encode()) for r in requests])
+
+    for (status, payload), r in zip(asyncio.run(run()), requests):
+        assert status == 200
+        np.testing.assert_allclose(payload["value"], bsm.bs_value(100.0, np.array(r["K"]), 0.1, 0.01, 0.25, ["p", "c"]))
+    assert service.batchers["value"].stats() == dict(batches=1, requests=20, contracts=40)
+
+
+def test_backpressure_and_errors():
+    service = PricingService(window=0.01, max_pending=3, cache_size=None)
+    body = json.dumps(dict(S=100.0, K=100.0, T=0.1, r=0.01, sigma=0.25)).encode()
+
+    async def run():
+        return await asyncio.gather(*[service.handle("POST", "/greeks", body) for _ in range(5)])
+
+    statuses = [status for status, _ in asyncio.run(run())]
+    assert statuses.count(200) == 3 and statuses.count(503) == 2 and service.rejected == 2
+
+    async def one(method, path, body):
+        return await service.handle(method, path, body)
+
+    assert asyncio.run(one("POST", "/price", b'{"S": 100}'))[0] == 400
+    assert asyncio.run(one("POST", "/price", b"not json"))[0] == 400
+    assert asyncio.run(one("POST", "/price", json.dumps(dict(json.loads(body), algo="nope")).encode()))[0] == 400
+    assert asyncio.run(one("GET", "/nope", b""))[0] == 404
+
+
+def test_mixed_model_implied_vol():
+    service = PricingService(cache_size=None)
+    K, algo = [95.0, 105.0], ["bsm", "baw"]
+    price = [Option(100.0, k, 0.5, 0.05, 0.3, "p", a).value for k, a in zip(K, algo)]
+    body = dict(price=price, S=100.0, K=K, T=0.5, r=0.05, option_type="p", algo=algo)
+
+    status, payload = asyncio.run(service.handle("POST", "/iv", json.dumps(body).encode()))
+    assert status == 200
+    np.testing.assert_allclose(payload["iv"], 0.3, atol=1e-6)
+    # the JSON keeps the solver's bool and int outputs
+    assert payload["converged"] == [True, True] and all(type(i) is int for i in payload["iterations"])
+
+
+@pytest.mark.parametrize("transport", ["tcp", "unix"])
+def test_client_round_trip(transport, tmp_path):
+    service = PricingService(cache_size=100)
+    path = str(tmp_path / "finx.sock") if transport == "unix" else None
+
+    with background(service, path=path) as address:
+        client = PricingClient(path=address) if path else PricingClient(*address)
+        with client:
+            assert client.health() == dict(status="ok")
+
+            contracts = dict(S=100.0, K=[95.0, 105.0], T=0.1, r=0.01, sigma=0.25, option_type=["p", "c"], q=0.01)
+            value = client.price(**contracts)
+            np.testing.assert_allclose(
+                value, bsm.bs_value(100.0, np.array([95.0, 105.0]), 0.1, 0.01, 0.25, ["p", "c"], 0.01)
+            )
+            greeks = client.greeks(**dict(contracts, algo=["bsm", "baw"]))
+            assert greeks["delta"][1] == pytest.approx(Option(100.0, 105.0, 0.1, 0.01, 0.25, "c", "baw", 0.01).delta)
+
+            quotes = dict(contracts, price=value)
+            del quotes["sigma"]
+            res = client.implied_vol(**quotes)
+            np.testing.assert_allclose(res["iv"], 0.25)
+            assert all(res["converged"])
+            assert client.implied_vol(**dict(quotes, price=[-1.0, 1.0]))["iv"][0] is None
+
+            # the same request again is served from the shared cache
+            client.price(**contracts)
+            stats = client.stats()
+            assert stats["cache"]["hits"] >= 1 and stats["batches"]["value"]["requests"] == 1
+
+            position = dict(S=100.0, K=105.0, T=20 / 252, r=0.01, sigma=0.25, quantity=-1, end_sigma=0.2)
+            grid = client.grid([position], spot_range=[90, 110], days=10, strike_interval=1.0, step=5)
+            option = Option(S=100.0, K=105.0, T=20 / 252, r=0.01, sigma=0.25)
+            plot = OptionsPlot([OptionPosition(option, -1, 0.2)], spot_range=[90, 110], strike_interval=1.0)
+            spots, labels, values = plot.value_grid(10, step=5)
+            assert grid["labels"] == list(labels)
+            np.testing.assert_allclose(grid["spots"], spots)
+            np.testing.assert_allclose(grid["values"], values)
+
+            with pytest.raises(ServiceError) as e:
+                client.price(S=100.0)
+            assert e.value.status == 400 and "missing fields" in e.value.message
@@ -0,0 +1,60 @@
+import math
+
+import numpy as np
+import pytest
+
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_plot import OptionPosition, OptionsPlot
+from finx_option_pricer.option_structures import gen_strangle
+from finx_option_pricer.stress import stress_cube
+
+
+def test_unshocked_vol_matches_value_grid():
+    positions = gen_strangle(spot_price=100.0, strike_price=105.0, days=30, vol_initial=0.25, vol_final=0.2)
+    op_plot = OptionsPlot(option_positions=positions, spot_range=[90, 110], strike_interval=1.0)
+    spots, labels, values = op_plot.value_grid(days=10, step=5, show_final=False)
+
+    cube = op_plot.stress_cube(spot_shocks=spots / 100.0 - 1, vol_shocks=[-0.05, 0.0, 0.05], days=[0, 5, 10])
+    assert cube.shape == (spots.size, 3, 3)
+    np.testing.assert_allclose(cube.sel(vol=0.0).T, values, atol=1e-10)
+    # gen_strangle is short, more vol is a loss
+    assert (np.diff(cube.pnl, axis=1) < 0).all()
+
+
+def test_skew_shocks_and_expiry():
+    option = Option(S=100.0, K=90.0, T=5 / 252, r=0.01, sigma=0.3, option_type="p")
+    cube = stress_cube(
+        [OptionPosition(option=option, quantity=-2)],
+        spot_shocks=[-0.15, 0.0, 0.1],
+        vol_shocks=[0.0, 0.02],
+        skew_shocks=[0.0, -0.1],
+        days=[2, 5, 10],
+        relative=False,
+    )
+    sigma = 0.3 + 0.02 - 0.1 * math.log(90.0 / 100.0)
+    shocked = Option(S=85.0, K=90.0, T=3 / 252, r=0.01, sigma=sigma, option_type="p").value
+    assert cube.sel(spot=-0.15, vol=0.02, days=2) == pytest.approx(-2 * shocked)
+    # expired by day 5, worth the payoff
+    payoff = -2 * np.maximum(90.0 - np.array([85.0, 100.0, 110.0]), 0.0)
+    np.testing.assert_allclose(cube.pnl[:, :, 1:], np.broadcast_to(payoff[:, None, None], (3, 2, 2)))
+
+
+def test_worst_case_and_quantiles():
+    positions = gen_strangle(spot_price=100.0, strike_price=105.0, days=30, vol_initial=0.25, vol_final=0.2)
+    cube = stress_cube(
+        positions, spot_shocks=np.linspace(-0.2, 0.2, 41), vol_shocks=np.linspace(-0.1, 0.1, 5), days=[0, 10]
+    )
+
+    np.testing.assert_allclose(cube.worst(), cube.pnl.min(axis=(0, 1)))
+    spot, vol, skew, days, pnl = cube.worst_scenario(days=10)
+    assert pnl == cube.worst()[1] and vol == 0.1 and abs(spot) == pytest.approx(0.2) and days == 10
+
+    var = cube.var(0.95)
+    assert var.shape == (2,) and (0 < var).all() and (var <= -cube.worst()).all()
+    # all the weight on the worst scenario makes it the whole distribution
+    weights = np.zeros(cube.shape[:2])
+    weights[np.unravel_index(cube.pnl[:, :, 1].argmin(), weights.shape)] = 1.0
+    assert cube.var(0.95, weights=weights)[1] == pytest.approx(-cube.worst()[1])
+
+    frame = cube.to_frame()
+    assert len(frame) == cube.pnl.size and frame["pnl"].min() == cube.pnl.min()
@@ -0,0 +1,87 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from finx_option_pricer.option_plot import OptionsPlot
+from finx_option_pricer.option_structures import gen_strangle
+from finx_option_pricer.surface_store import NO_LABEL, SurfaceStore
+from finx_option_pricer.sweep import sweep
+
+SPOT_RANGE = [90, 110]
+SPOTS = np.arange(90, 110.5, 0.5)
+
+
+def strangle_plot(strike_price, days):
+    positions = gen_strangle(spot_price=100.0, strike_price=strike_price, days=days, vol_initial=0.25, vol_final=0.2)
+    return OptionsPlot(option_positions=positions, spot_range=SPOT_RANGE)
+
+
+def test_write_and_frame(tmp_path):
+    store = SurfaceStore.create(tmp_path / "s", SPOTS, structures=["a", "b"], n_rows=12, surfaces=["value", "delta"])
+    store.write_plot("a", strangle_plot(100.0, 10), days=10)
+    store.write_plot("b", strangle_plot(95.0, 5), days=10)  # shorter horizon, padded
+    store.write(1, [5, 4, 3, 2, 1, 0], delta=np.ones((6, SPOTS.size)))
+
+    for structure, plot in (("a", strangle_plot(100.0, 10)), ("b", strangle_plot(95.0, 5))):
+        expected = plot.gen_value_df_timeincrementing(10)
+        df = store.frame(structure)
+        assert list(df.columns) == list(expected.columns)
+        np.testing.assert_allclose(df.to_numpy(), expected.to_numpy())
+        np.testing.assert_array_equal(df["strikes"], SPOTS)
+        # a view onto the memory map, not a copy
+        assert np.shares_memory(df[df.columns[1]].to_numpy(), store["value"])
+
+    # delta is filled by write_plot from the same pass as the values
+    np.testing.assert_allclose(
+        store["delta"][0, :11], strangle_plot(100.0, 10).greek_grid(10, greeks=["delta"])[2]["delta"]
+    )
+    assert store.labels[1, 6:].tolist() == [NO_LABEL] * 6 and np.isnan(store["value"][1, 6:]).all()
+    assert list(store.frame("b", surface="delta").columns) == ["strikes", 5, 4, 3, 2, 1, 0]
+    assert store.frame("a", spot_range=[99, 101])["strikes"].tolist() == [99.0, 99.5, 100.0, 100.5, 101.0]
+
+    with pytest.raises(FileExistsError):
+        SurfaceStore.create(tmp_path / "s", SPOTS, structures=["a"], n_rows=1)
+    with pytest.raises(ValueError):
+        store.write_plot(
+            "a", OptionsPlot(option_positions=strangle_plot(100.0, 10).option_positions, spot_range=[80, 90]), days=10
+        )
+
+
+def test_reopen_from_another_process(tmp_path):
+    store = SurfaceStore.create(tmp_path / "s", SPOTS, structures=["a"], n_rows=12)
+    store.write_plot("a", strangle_plot(100.0, 10), days=10)
+    store.flush()
+
+    code = (
+        "import sys; from finx_option_pricer.surface_store import SurfaceStore; "
+        "df = SurfaceStore(sys.argv[1]).frame('a'); print(repr(float(df.to_numpy().sum())), list(df.columns))"
+    )
+    out = subprocess.run([sys.executable, "-c", code, str(tmp_path / "s")], capture_output=True, text=True, check=True)
+    total, columns = out.stdout.split(" ", 1)
+    df = store.frame("a")
+    assert float(total) == df.to_numpy().sum() and columns.strip() == str(list(df.columns))
+
+    reader = SurfaceStore(tmp_path / "s")
+    with pytest.raises(ValueError):
+        reader["value"][0, 0, 0] = 1.0
+
+
+def test_sweep_into_store(tmp_path):
+    grid = dict(strike_price=[95.0, 100.0], days=[5, 10], vol_initial=[0.25], vol_final=[0.2])
+    kwargs = dict(base=dict(spot_price=100.0), spot_range=SPOT_RANGE, days=10)
+    expected = sweep(gen_strangle, grid, processes=1, **kwargs)
+
+    for processes in (1, 2):
+        path = tmp_path / f"sweep{processes}"
+        result = sweep(gen_strangle, grid, processes=processes, store=path, **kwargs)
+        assert result.store is not None and result.completed.all()
+
+        store = SurfaceStore(path)
+        np.testing.assert_array_equal(store["value"], expected.values)
+        np.testing.assert_array_equal(store.labels, expected.labels)
+        assert store.structures == ["0", "1", "2", "3"]
+        assert store.params.to_dict("records") == expected.params.to_dict("records")
+        for i in range(4):
+            np.testing.assert_array_equal(store.frame(i).to_numpy(), expected.frame(i).to_numpy())
@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+
+from finx_option_pricer.option_plot import OptionsPlot
+from finx_option_pricer.option_structures import gen_calendar, gen_strangle
+from finx_option_pricer.sweep import NO_LABEL, sweep
+
+GRID = dict(strike_price=[95.0, 100.0, 105.0], days=[5, 10], vol_initial=[0.2, 0.3], vol_final=[0.15])
+
+
+def test_sweep_matches_options_plot():
+    result = sweep(gen_strangle, GRID, base=dict(spot_price=100.0), spot_range=[90, 110], days=10, processes=2)
+
+    assert len(result.params) == 12 and result.completed.all() and not result.cancelled
+    assert result.values.shape == (12, 12, result.strikes.size)
+    for i, params in enumerate(result.params.to_dict("records")):
+        positions = gen_strangle(spot_price=100.0, **params)
+        expected = OptionsPlot(option_positions=positions, spot_range=[90, 110]).gen_value_df_timeincrementing(10)
+        df = result.frame(i)
+        assert list(df.columns) == list(expected.columns)
+        np.testing.assert_array_equal(df.values, expected.values)
+
+    # shorter dated combinations have fewer rows, the rest is padding
+    short = result.params["days"].values == 5
+    assert (result.labels[short][:, 6:] == NO_LABEL).all()
+    assert np.isnan(result.values[short][:, 6:]).all()
+
+
+def test_sweep_in_process_matches_pool():
+    grid = dict(front_days=[5, 8], back_days=[12, 15], strike_price=[100.0])
+    base = dict(spot_price=100.0, front_vol=0.3, front_vol_final=0.25, back_vol=0.25, back_vol_final=0.22)
+    kwargs = dict(base=base, spot_range=[90, 110], days=10, step=2, value_relative=False)
+    pooled = sweep(gen_calendar, grid, processes=2, chunksize=1, **kwargs)
+    inline = sweep(gen_calendar, grid, processes=1, **kwargs)
+    np.testing.assert_array_equal(pooled.labels, inline.labels)
+    np.testing.assert_array_equal(pooled.values, inline.values)
+
+
+def test_sweep_progress_and_cancel():
+    calls = []
+    cancel = threading.Event()
+
+    def progress(done, total):
+        calls.append((done, total))
+        cancel.set()
+
+    result = sweep(
+        gen_strangle,
+        GRID,
+        base=dict(spot_price=100.0),
+        spot_range=[90, 110],
+        days=10,
+        processes=1,
+        chunksize=4,
+        progress=progress,
+        cancel=cancel,
+    )
+    assert calls == [(4, 12)]
+    assert result.cancelled
+    assert result.completed.sum() == 4
+    assert np.isnan(result.values[~result.completed]).all()
+
+    calls.clear()
+    cancel.clear()
+    kwargs = dict(base=dict(spot_price=100.0), spot_range=[90, 110], days=10, processes=2, chunksize=5)
+    result = sweep(gen_strangle, GRID, progress=lambda done, total: calls.append((done, total)), **kwargs)
+    # chunks finish in any order
+    done = [d for d, _ in calls]
+    assert len(calls) == 3 and done == sorted(done) and calls[-1] == (12, 12)
+    assert result.completed.all() and not result.cancelled
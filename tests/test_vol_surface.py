@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import finx_option_pricer.bsm as bsm
+import finx_option_pricer.vol_surface as vol_surface
+from finx_option_pricer.option import Option
+from finx_option_pricer.option_plot import OptionsPlot
+from finx_option_pricer.option_structures import gen_strangle
+from finx_option_pricer.pipeline import enrich
+from finx_option_pricer.vol_surface import (
+    SSVI,
+    STICKY_MONEYNESS,
+    SVI,
+    VolSurface,
+    ssvi_total_variance,
+    svi_total_variance,
+)
+
+SPOT = 100.0
+EXPIRIES = np.array([10, 30, 60, 120]) / 252
+STRIKES = np.linspace(70, 130, 41)
+SSVI_PARAMS = (-0.4, 0.8, 0.4)  # rho, eta, gamma
+
+
+def theta(T):
+    return 0.04 * T + 0.002
+
+
+def ssvi_iv(K, T, S=SPOT):
+    return np.sqrt(ssvi_total_variance(np.log(K / S), theta(T), *SSVI_PARAMS) / T)
+
+
+@pytest.fixture(scope="module")
+def quotes():
+    K, T = np.meshgrid(STRIKES, EXPIRIES)
+    return K, T, ssvi_iv(K, T)
+
+
+@pytest.mark.parametrize("method", [SVI, SSVI])
+def test_fit_recovers_surface(quotes, method):
+    K, T, iv = quotes
+    surface = VolSurface.fit(K, T, iv, spot=SPOT, method=method)
+
+    np.testing.assert_array_equal(surface.expiries, EXPIRIES)
+    np.testing.assert_allclose(surface.sigma(K, T), iv, atol=1e-5)
+    if method == SSVI:
+        np.testing.assert_allclose(surface.params[-3:], SSVI_PARAMS, atol=1e-6)
+    else:
+        for i in range(EXPIRIES.size):
+            k = np.log(STRIKES / SPOT)
+            np.testing.assert_allclose(svi_total_variance(k, *surface.params[i]), iv[i] ** 2 * EXPIRIES[i], atol=1e-6)
+
+    # between expiries total variance is interpolated, close to the true surface
+    np.testing.assert_allclose(surface.sigma(STRIKES, 45 / 252), ssvi_iv(STRIKES, 45 / 252), atol=2e-3)
+
+
+def test_extrapolation(quotes):
+    surface = VolSurface.fit(*quotes, spot=SPOT, method=SSVI)
+    first, last = EXPIRIES[0], EXPIRIES[-1]
+
+    # variance rate of the first / last slice is kept before / after them
+    np.testing.assert_allclose(surface.sigma(STRIKES, [[0.0], [first / 2]]), [ssvi_iv(STRIKES, first)] * 2, atol=1e-5)
+    np.testing.assert_allclose(surface.sigma(STRIKES, 3 * last), ssvi_iv(STRIKES, last), atol=1e-5)
+    # flat beyond the grid's log moneyness range
+    k_lo, k_hi = surface.k_range
+    far = SPOT * np.exp([k_lo - 1, k_lo, k_hi, k_hi + 1])
+    out = surface.sigma(far, last)
+    np.testing.assert_allclose(out[[0, 2]], out[[1, 3]], rtol=1e-12)
+
+
+def test_numba_lookup_matches_numpy(quotes):
+    pytest.importorskip("numba")
+    surface = VolSurface.fit(*quotes, spot=SPOT, method=SSVI, sticky=STICKY_MONEYNESS)
+    rng = np.random.default_rng(0)
+    K, T, S = rng.uniform(50, 150, 10_000), rng.uniform(0, 2, 10_000), rng.uniform(90, 110, 10_000)
+
+    backend = bsm.get_backend()
+    try:
+        bsm.set_backend(bsm.NUMBA)
+        # small lookups stay on NumPy and don't compile the kernel
+        vol_surface._lookup_numba.cache_clear()
+        surface.sigma(100.0, 0.1)
+        assert vol_surface._lookup_numba.cache_info().currsize == 0
+        jit = surface.sigma(K, T, S)
+        bsm.set_backend(bsm.NUMPY)
+        np.testing.assert_allclose(jit, surface.sigma(K, T, S), rtol=1e-12)
+        assert np.ndim(surface.sigma(100.0, 0.1)) == 0
+    finally:
+        bsm.set_backend(backend)
+
+
+def test_sticky_strike_and_moneyness(quotes):
+    surface = VolSurface.fit(*quotes, spot=SPOT, method=SSVI)
+    moneyness = surface.with_sticky(STICKY_MONEYNESS)
+    T = 30 / 252
+
+    np.testing.assert_array_equal(surface.sigma(STRIKES, T, S=90.0), surface.sigma(STRIKES, T))
+    # moneyness surfaces move with spot, r = q = 0 so K / S is all that matters
+    np.testing.assert_allclose(moneyness.sigma(STRIKES * 0.9, T, S=90.0), surface.sigma(STRIKES, T), rtol=1e-12)
+
+    with pytest.raises(ValueError):
+        surface.with_sticky("delta")
+
+
+def test_from_enriched_chain(quotes):
+    K, T, _ = [x.ravel() for x in quotes]
+    iv = ssvi_iv(K, T, S=SPOT * np.exp(0.02 * T))  # SSVI in log moneyness against the forward
+    chain = pd.DataFrame(dict(S=SPOT, K=K, T=T, option_type=np.where(K >= SPOT, "c", "p")))
+    value = bsm.bs_value(SPOT, K, T, 0.02, iv, chain.option_type.to_numpy())
+    chain = enrich(chain.assign(bid=value, ask=value), r=0.02)
+
+    surface = VolSurface.from_frame(chain, r=0.02, method=SSVI)
+    np.testing.assert_allclose(surface.params[-3:], SSVI_PARAMS, atol=1e-5)
+
+
+def reference_value(op, S, T, surface):
+    sigma = float(surface.sigma(op.option.K, T, S=S))
+    option = Option(S=S, K=op.option.K, T=T, r=0.0, sigma=sigma, option_type=op.option.option_type)
+    return op.quantity * option.value
+
+
+def test_options_plot_on_surface(quotes):
+    surface = VolSurface.fit(*quotes, spot=SPOT, method=SSVI)
+    positions = gen_strangle(
+        spot_price=SPOT, strike_price=105.0, days=30, vol_initial=None, vol_final=None, vol_surface=surface
+    )
+    assert positions[0].option.sigma == pytest.approx(float(surface.sigma(105.0, 30 / 252)))
+    assert positions[0].end_sigma is None
+
+    spot_range = [95, 105]
+    for sticky in (surface, surface.with_sticky(STICKY_MONEYNESS)):
+        op_plot = OptionsPlot(option_positions=positions, spot_range=spot_range, vol_surface=sticky)
+        df = op_plot.gen_value_df_timeincrementing(20, step=5, show_final=False, value_relative=False)
+
+        strikes = df["strikes"].to_numpy()
+        for days in (0, 5, 10, 15, 20):
+            T = (30 - days) / 252
+            expected = [sum(reference_value(op, s, T, sticky) for op in positions) for s in strikes]
+            np.testing.assert_allclose(df[30 - days], expected, rtol=1e-10)
+
+    # sticky moneyness and sticky strike only agree at the fit's spot
+    strike_plot = OptionsPlot(option_positions=positions, spot_range=spot_range, vol_surface=surface)
+    moneyness_plot = OptionsPlot(
+        option_positions=positions, spot_range=spot_range, vol_surface=surface.with_sticky(STICKY_MONEYNESS)
+    )
+    a = strike_plot.gen_value_df_timeincrementing(10).set_index("strikes")
+    b = moneyness_plot.gen_value_df_timeincrementing(10).set_index("strikes")
+    np.testing.assert_allclose(a.loc[SPOT], b.loc[SPOT], atol=1e-12)
+    assert not np.allclose(a.loc[95.0], b.loc[95.0])